@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Выполнение долгих операций вне UI-потока tkinter
+"""
+
+import queue
+import logging
+import threading
+import traceback
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.background')
+
+
+def run_in_background(widget, task, on_success=None, on_error=None, poll_ms=50):
+    """Выполняет task в фоновом потоке и передает результат в UI-поток.
+
+    Tk нельзя трогать из других потоков, поэтому результат забирается
+    периодическим опросом очереди через widget.after().
+    """
+    result_queue = queue.Queue()
+
+    def worker():
+        try:
+            result_queue.put((True, task()))
+        except Exception as e:
+            logger.error(f"Ошибка фоновой задачи: {str(e)}")
+            logger.error(f"Трассировка: {traceback.format_exc()}")
+            result_queue.put((False, e))
+
+    def poll():
+        try:
+            ok, value = result_queue.get_nowait()
+        except queue.Empty:
+            widget.after(poll_ms, poll)
+            return
+
+        if ok:
+            if on_success:
+                on_success(value)
+        elif on_error:
+            on_error(value)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    widget.after(poll_ms, poll)
+    return thread
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нагрузочные замеры SQLite Database Manager на синтетических базах
+
+Генератор детерминирован (фиксированный seed), поэтому результаты разных
+версий можно сравнивать между собой:
+
+    python3 benchmark.py --rows 10k --shapes narrow,wide --output bench_1.0.json
+    python3 benchmark.py --rows 1m --compare bench_1.0.json --output bench_1.1.json
+
+Замеряются операции слоя DatabaseService, который использует интерфейс:
+открытие, список таблиц, загрузка страницы, поиск, изменение, удаление,
+резервная копия, экспорт и импорт SQL.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+from datetime import datetime
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager, connect
+from db_service import DatabaseService, build_search_condition
+
+ROW_PRESETS = {'10k': 10000, '1m': 1000000, '10m': 10000000}
+
+SEED = 20240101
+BATCH_SIZE = 5000
+TABLE_NAME = 'bench'
+
+WORDS = ("альфа бета гамма дельта эпсилон дзета эта тета йота каппа лямбда мю "
+         "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda mu "
+         "заказ клиент счет платеж склад товар доставка order client invoice").split()
+
+
+# Генераторы строк для разных форм таблиц
+
+def narrow_schema():
+    return ("id INTEGER PRIMARY KEY, customer_id INTEGER, amount REAL, code TEXT",
+            ['customer_id', 'amount', 'code'])
+
+
+def narrow_row(rnd, i):
+    return (rnd.randint(1, 100000), round(rnd.uniform(0, 10000), 2), f"C{rnd.randint(0, 99999999):08d}")
+
+
+WIDE_COLUMNS = 30
+
+
+def wide_schema():
+    names = []
+    for i in range(WIDE_COLUMNS):
+        names.append(['int', 'real', 'text'][i % 3] + f"_{i}")
+    types = {'int': 'INTEGER', 'real': 'REAL', 'text': 'TEXT'}
+    columns = ", ".join(f"{name} {types[name.split('_')[0]]}" for name in names)
+    return f"id INTEGER PRIMARY KEY, {columns}", names
+
+
+def wide_row(rnd, i):
+    row = []
+    for j in range(WIDE_COLUMNS):
+        kind = j % 3
+        if kind == 0:
+            row.append(rnd.randint(0, 1000000))
+        elif kind == 1:
+            row.append(round(rnd.random() * 1000, 3))
+        else:
+            row.append(rnd.choice(WORDS) + str(rnd.randint(0, 999)))
+    return tuple(row)
+
+
+def blob_schema():
+    return "id INTEGER PRIMARY KEY, name TEXT, payload BLOB", ['name', 'payload']
+
+
+def blob_row(rnd, i):
+    size = rnd.randint(512, 4096)
+    # То же, что Random.randbytes (Python 3.9+), но работает и в старых версиях
+    return (f"file_{i}.bin", rnd.getrandbits(size * 8).to_bytes(size, 'little'))
+
+
+def text_schema():
+    return "id INTEGER PRIMARY KEY, title TEXT, body TEXT", ['title', 'body']
+
+
+def text_row(rnd, i):
+    title = " ".join(rnd.choice(WORDS) for _ in range(5))
+    body = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(50, 400)))
+    return (title, body)
+
+
+SHAPES = {
+    'narrow': (narrow_schema, narrow_row),
+    'wide': (wide_schema, wide_row),
+    'blob': (blob_schema, blob_row),
+    'text': (text_schema, text_row),
+}
+
+
+def generate_database(path, shape, rows, seed=SEED):
+    """Создает БД с одной таблицей заданной формы и числом строк"""
+    schema_func, row_func = SHAPES[shape]
+    schema, columns = schema_func()
+    rnd = random.Random(seed)
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = connect(path, 'bulk-load')
+    conn.execute(f"CREATE TABLE {TABLE_NAME} ({schema})")
+    placeholders = ", ".join("?" for _ in columns)
+    insert_sql = f"INSERT INTO {TABLE_NAME} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    for start in range(0, rows, BATCH_SIZE):
+        batch = [row_func(rnd, i) for i in range(start, min(start + BATCH_SIZE, rows))]
+        conn.executemany(insert_sql, batch)
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return path
+
+
+def target_rowid(rows):
+    """Строка из середины таблицы, которую замеры изменяют и удаляют"""
+    return max(rows // 2, 1)
+
+
+def database_intact(path, rows):
+    """Сохраненная БД (--keep-db) совпадает с только что сгенерированной:
+    все строки на месте, включая изменяемую замерами"""
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            max_id, target = conn.execute(
+                f"SELECT max(id), (SELECT COUNT(*) FROM {TABLE_NAME} WHERE id = ?) FROM {TABLE_NAME}",
+                (target_rowid(rows),)).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return max_id == rows and target == 1
+
+
+def timed(func):
+    """Время выполнения func в секундах и ее результат"""
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def benchmark_database(path, shape, rows, work_dir, repeat=3):
+    """Замеряет операции на готовой БД, возвращает {операция: [секунды]}"""
+    timings = {}
+
+    def record(name, func):
+        seconds, result = timed(func)
+        timings.setdefault(name, []).append(round(seconds, 6))
+        return result
+
+    for attempt in range(repeat):
+        manager = record('open', lambda: ConnectionManager(path))
+        service = DatabaseService(manager.writer, manager)
+        record('table_list', service.list_tables)
+
+        columns = [col.name for col in service.table_columns(TABLE_NAME)]
+        record('grid_load', lambda: service.fetch_page(TABLE_NAME, limit=1000, offset=0))
+        record('grid_load_deep', lambda: service.fetch_page(TABLE_NAME, limit=1000,
+                                                            offset=max(rows // 2, 0)))
+
+        search_columns = [c for c in columns if c != 'payload']
+        where, params = build_search_condition(search_columns, WORDS[attempt % len(WORDS)])
+        record('search', lambda: service.fetch_page(TABLE_NAME, where, params, limit=1000))
+
+        # Изменение и удаление строки из середины таблицы по rowid, как в гриде;
+        # после замера строка возвращается, чтобы БД оставалась прежней
+        target_id = target_rowid(rows)
+        original = service.fetch_row(TABLE_NAME, target_id)
+        if original is None:
+            raise RuntimeError(f"В {path} нет строки id={target_id}: замеры edit и delete невозможны")
+        new_values = dict(zip(columns, original))
+        record('edit', lambda: service.update_record_by_rowid(TABLE_NAME, target_id, new_values))
+        record('delete', lambda: service.delete_records_by_rowid(TABLE_NAME, [target_id]))
+        placeholders = ", ".join("?" for _ in columns)
+        manager.writer.execute(f"INSERT INTO {TABLE_NAME} ({', '.join(columns)}) VALUES ({placeholders})",
+                               original)
+        manager.writer.commit()
+
+        backup_path = os.path.join(work_dir, f"{shape}_backup.db")
+        record('backup', lambda: service.backup(path, backup_path))
+
+        sql_path = os.path.join(work_dir, f"{shape}_dump.sql")
+        record('export', lambda: service.export_sql(sql_path))
+
+        import_path = os.path.join(work_dir, f"{shape}_import.db")
+        if os.path.exists(import_path):
+            os.remove(import_path)
+        import_conn = connect(import_path, 'bulk-load')
+        record('import', lambda: DatabaseService(import_conn).import_sql(sql_path))
+        import_conn.close()
+
+        manager.close()
+        for leftover in (backup_path, sql_path, import_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return timings
+
+
+def run_benchmarks(row_counts, shapes, work_dir, repeat=3, keep_db=False):
+    """Генерирует базы и замеряет операции, возвращает отчет для JSON"""
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': SEED,
+            'repeat': repeat,
+        },
+        'results': [],
+    }
+
+    for rows in row_counts:
+        for shape in shapes:
+            path = os.path.join(work_dir, f"bench_{shape}_{rows}.db")
+            if keep_db and os.path.exists(path) and database_intact(path, rows):
+                gen_seconds = 0.0
+            else:
+                if keep_db and os.path.exists(path):
+                    print(f"⚠️ {path} изменена после генерации, создается заново", file=sys.stderr)
+                gen_seconds, _ = timed(lambda: generate_database(path, shape, rows))
+            print(f"📦 {shape} / {rows} строк: {os.path.getsize(path)} байт, генерация {gen_seconds:.2f} с",
+                  file=sys.stderr)
+
+            timings = benchmark_database(path, shape, rows, work_dir, repeat)
+            for operation, seconds in timings.items():
+                report['results'].append({
+                    'shape': shape,
+                    'rows': rows,
+                    'operation': operation,
+                    'seconds': seconds,
+                    'median': round(statistics.median(seconds), 6),
+                    'min': min(seconds),
+                })
+
+            if not keep_db:
+                os.remove(path)
+
+    return report
+
+
+def compare_reports(previous, current, threshold=0.2):
+    """Сравнивает медианы с предыдущим отчетом, возвращает строки сравнения"""
+    old = {(r['shape'], r['rows'], r['operation']): r['median'] for r in previous['results']}
+    lines = []
+    for result in current['results']:
+        key = (result['shape'], result['rows'], result['operation'])
+        if key not in old or not old[key]:
+            continue
+        change = (result['median'] - old[key]) / old[key]
+        mark = "⚠️ " if change > threshold else "  "
+        lines.append(f"{mark}{key[0]:<7} {key[1]:>9} {key[2]:<15} "
+                     f"{old[key]:.4f} -> {result['median']:.4f} с ({change:+.0%})")
+    return lines
+
+
+def parse_rows(value):
+    """Число строк: 10k, 1m, 10m или целое число"""
+    value = value.strip().lower()
+    return ROW_PRESETS[value] if value in ROW_PRESETS else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности на синтетических БД")
+    parser.add_argument('--rows', default='10k',
+                        help="размеры через запятую: 10k, 1m, 10m или число (по умолчанию 10k)")
+    parser.add_argument('--shapes', default=",".join(SHAPES),
+                        help=f"формы таблиц через запятую: {', '.join(SHAPES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="повторов каждой операции")
+    parser.add_argument('--work-dir', help="папка для баз (по умолчанию временная)")
+    parser.add_argument('--keep-db', action='store_true', help="не удалять и переиспользовать базы")
+    parser.add_argument('--output', help="файл JSON с результатами (по умолчанию stdout)")
+    parser.add_argument('--compare', help="предыдущий JSON для сравнения")
+    args = parser.parse_args(argv)
+
+    row_counts = [parse_rows(value) for value in args.rows.split(',')]
+    shapes = [shape.strip() for shape in args.shapes.split(',')]
+    for shape in shapes:
+        if shape not in SHAPES:
+            parser.error(f"неизвестная форма таблицы: {shape}")
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="db_manager_bench_")
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+
+    try:
+        report = run_benchmarks(row_counts, shapes, work_dir, args.repeat, args.keep_db)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"✅ Результаты сохранены в {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        for line in compare_reports(previous, report):
+            print(line, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Обнаружение изменений БД другими программами (PRAGMA data_version + mtime файла)
+"""
+
+import os
+import logging
+from collections import namedtuple
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.change_monitor')
+
+ChangeState = namedtuple('ChangeState', 'data schema')
+
+
+class ChangeMonitor:
+    """Дешевая проверка внешних изменений открытой БД.
+
+    В простое проверяются только mtime и размер файла БД и WAL (os.stat,
+    без чтения файла). Если они изменились, PRAGMA data_version писателя
+    показывает, была ли фиксация другим соединением: собственные записи
+    программы data_version не меняют и изменением не считаются.
+    """
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.filename = connections.filename
+        self._file_state = self.file_state()
+        self._versions = self.versions()
+
+    def file_state(self):
+        """mtime и размер файла БД и WAL"""
+        state = []
+        for suffix in ('', '-wal'):
+            try:
+                stat = os.stat(self.filename + suffix)
+                state.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                state.append(None)
+        return tuple(state)
+
+    def versions(self):
+        """data_version и schema_version писателя"""
+        writer = self.connections.writer
+        data_version = writer.execute("PRAGMA data_version").fetchone()[0]
+        schema_version = writer.execute("PRAGMA schema_version").fetchone()[0]
+        return data_version, schema_version
+
+    def acknowledge(self):
+        """Текущее состояние считается известным (запись самой программы
+        через отдельное соединение не должна выглядеть внешним изменением)"""
+        self._file_state = self.file_state()
+        self._versions = self.versions()
+    
+    def check(self):
+        """ChangeState, если БД изменена другим соединением, иначе None"""
+        file_state = self.file_state()
+        if file_state == self._file_state:
+            return None
+        self._file_state = file_state
+
+        data_version, schema_version = self.versions()
+        old_data_version, old_schema_version = self._versions
+        self._versions = (data_version, schema_version)
+        if data_version == old_data_version:
+            # Файл изменила сама программа (запись, checkpoint)
+            return None
+
+        state = ChangeState(True, schema_version != old_schema_version)
+        logger.info(f"Обнаружено внешнее изменение {self.filename} "
+                    f"(структура: {'да' if state.schema else 'нет'})")
+        return state
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Консольный режим SQLite Database Manager (без графического интерфейса)
+
+Примеры:
+    python3 run.py --headless backup company.db --backup-dir /srv/backups --keep 30
+    python3 run.py --headless backup company.db company_compact.db --compact
+    python3 run.py --headless export company.db company.sql
+    python3 run.py --headless import company.db changes.sql
+    python3 run.py --headless vacuum company.db
+    python3 run.py --headless analyze company.db
+
+Результат каждой команды выводится одной строкой JSON с временем выполнения.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+import db_service
+import maintenance
+from db_connection import connect, PRAGMA_PROFILES
+from settings_store import SettingsStore
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.cli')
+
+
+def build_parser():
+    """Описание аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        prog="run.py --headless",
+        description="Операции с базой SQLite без графического интерфейса")
+    parser.add_argument('--profile', choices=list(PRAGMA_PROFILES),
+                        help="профиль соединения (по умолчанию из настроек БД)")
+    parser.add_argument('--verbose', action='store_true', help="подробный вывод в stderr")
+
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    backup = commands.add_parser('backup', help="резервная копия БД")
+    backup.add_argument('database')
+    backup.add_argument('destination', nargs='?',
+                        help="файл копии (по умолчанию автобэкап в --backup-dir)")
+    backup.add_argument('--backup-dir', help="папка автобэкапов (по умолчанию из настроек)")
+    backup.add_argument('--keep', type=int, help="сколько автобэкапов хранить")
+    backup.add_argument('--compact', action='store_true',
+                        help="сжатая копия через VACUUM INTO (без пустых страниц)")
+
+    export = commands.add_parser('export', help="экспорт в SQL")
+    export.add_argument('database')
+    export.add_argument('output')
+
+    import_ = commands.add_parser('import', help="импорт SQL файла")
+    import_.add_argument('database')
+    import_.add_argument('input')
+
+    vacuum = commands.add_parser('vacuum', help="VACUUM базы")
+    vacuum.add_argument('database')
+    vacuum.add_argument('--force', action='store_true',
+                        help="не проверять свободное место на диске")
+
+    analyze = commands.add_parser('analyze', help="ANALYZE базы")
+    analyze.add_argument('database')
+
+    return parser
+
+
+def run_backup(args, service, settings):
+    if args.destination:
+        if args.compact:
+            size = service.compact_backup(args.destination)
+        else:
+            size = service.backup(args.database, args.destination)
+        return {'destination': args.destination, 'bytes': size, 'removed': 0, 'skipped': False}
+    
+    backup_dir = args.backup_dir or settings.get('backup_dir')
+    if not os.path.exists(backup_dir):
+        os.makedirs(backup_dir)
+    basename = os.path.splitext(os.path.basename(args.database))[0]
+    # Автобэкап пропускается, если БД не изменилась после последней копии
+    destination = service.auto_backup(args.database, backup_dir, args.compact)
+    if destination is None:
+        return {'destination': db_service.latest_auto_backup(backup_dir, basename),
+                'bytes': 0, 'removed': 0, 'skipped': True}
+    keep = args.keep or settings.get_db(args.database, 'backup_keep')
+    removed = db_service.cleanup_old_backups(backup_dir, basename, keep)
+    return {'destination': destination, 'bytes': os.path.getsize(destination),
+            'removed': len(removed), 'skipped': False}
+
+
+def run_export(args, service, settings):
+    lines = service.export_sql(args.output)
+    return {'output': args.output, 'lines': lines, 'bytes': os.path.getsize(args.output)}
+
+
+def run_import(args, service, settings):
+    size = service.import_sql(args.input)
+    return {'input': args.input, 'bytes': size}
+
+
+def run_vacuum(args, service, settings):
+    estimate = maintenance.estimate_vacuum(service.connection)
+    shortages = maintenance.check_disk_space(args.database, estimate)
+    if shortages and not args.force:
+        need = shortages[0]
+        raise OSError(f"Недостаточно места для VACUUM в {need.path}: "
+                      f"нужно {need.required}, свободно {need.available} байт")
+    result = maintenance.vacuum(service.connection, estimate=estimate)
+    return {'bytes_before': result.size_before, 'bytes_after': result.size_after,
+            'bytes_reclaimed': result.reclaimed, 'bytes_estimated': estimate.reclaimable}
+
+
+def run_analyze(args, service, settings):
+    return {'tables': service.analyze()}
+
+
+COMMANDS = {
+    'backup': run_backup,
+    'export': run_export,
+    'import': run_import,
+    'vacuum': run_vacuum,
+    'analyze': run_analyze,
+}
+
+
+def main(argv=None):
+    """Точка входа консольного режима, возвращает код завершения"""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    report = {'command': args.command, 'database': args.database}
+    started = time.perf_counter()
+    exit_code = 0
+
+    try:
+        if args.command != 'import' and not os.path.exists(args.database):
+            raise FileNotFoundError(f"Файл {args.database} не найден")
+
+        settings = SettingsStore()
+        profile = args.profile or settings.get_db(args.database, 'pragma_profile')
+        connection = connect(args.database, profile)
+        try:
+            service = db_service.DatabaseService(connection)
+            report.update(COMMANDS[args.command](args, service, settings))
+        finally:
+            connection.close()
+        report['status'] = 'ok'
+    except Exception as e:
+        logger.error(f"Ошибка команды {args.command}: {str(e)}")
+        report['status'] = 'error'
+        report['error'] = str(e)
+        exit_code = 1
+
+    report['seconds'] = round(time.perf_counter() - started, 4)
+    print(json.dumps(report, ensure_ascii=False))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
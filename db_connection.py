@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Подключение к SQLite с профилями настроек PRAGMA
+"""
+
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from sql_trace import TracedConnection
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.connection')
+
+
+# Профили соединения: порядок важен, journal_mode выставляется первым
+PRAGMA_PROFILES = {
+    'interactive': [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -16384),        # 16 МБ
+        ('mmap_size', 67108864),       # 64 МБ
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 5000),
+    ],
+    'bulk-load': [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'OFF'),
+        ('cache_size', -131072),       # 128 МБ
+        ('mmap_size', 268435456),      # 256 МБ
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 30000),
+    ],
+    'read-only analytics': [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -262144),       # 256 МБ
+        ('mmap_size', 1073741824),     # 1 ГБ
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', 10000),
+    ],
+}
+
+PROFILE_DESCRIPTIONS = {
+    'interactive': "Повседневная работа: WAL, умеренный кэш",
+    'bulk-load': "Массовая загрузка: без fsync, большой кэш",
+    'read-only analytics': "Анализ больших файлов: большой кэш и mmap",
+}
+
+DEFAULT_PROFILE = 'interactive'
+
+# PRAGMA, которые нельзя менять на соединении только для чтения
+WRITER_ONLY_PRAGMAS = ('journal_mode', 'synchronous')
+
+# Добавляются к любому профилю читателя: запись отклоняется, даже если
+# соединение открыто без URI mode=ro
+READER_PRAGMAS = [
+    ('query_only', 'ON'),
+]
+
+
+def apply_pragma_profile(connection, profile=DEFAULT_PROFILE, read_only=False):
+    """Применяет профиль PRAGMA к открытому соединению"""
+    if profile not in PRAGMA_PROFILES:
+        logger.warning(f"Неизвестный профиль '{profile}', используем '{DEFAULT_PROFILE}'")
+        profile = DEFAULT_PROFILE
+
+    cursor = connection.cursor()
+    pragmas = PRAGMA_PROFILES[profile] + (READER_PRAGMAS if read_only else [])
+    for name, value in pragmas:
+        if read_only and name in WRITER_ONLY_PRAGMAS:
+            continue
+        try:
+            cursor.execute(f"PRAGMA {name} = {value}")
+            # journal_mode и mmap_size возвращают фактическое значение
+            if cursor.description:
+                cursor.fetchall()
+        except sqlite3.Error as e:
+            # WAL недоступен для :memory: и файлов только для чтения
+            logger.warning(f"Не удалось применить PRAGMA {name}={value}: {e}")
+    logger.debug("Применен профиль соединения '%s'", profile)
+    return profile
+
+
+def connect(filename, profile=DEFAULT_PROFILE, tracer=None, label='writer'):
+    """Открывает соединение с БД и применяет профиль PRAGMA"""
+    connection = sqlite3.connect(filename, factory=TracedConnection)
+    # Трассировка подключается до PRAGMA, чтобы они тоже попали в журнал
+    if tracer:
+        tracer.attach(connection, label)
+    apply_pragma_profile(connection, profile)
+    return connection
+
+
+def checkpoint(connection):
+    """Переносит содержимое WAL в основной файл.
+    
+    Возвращает (busy, log, checkpointed) или None при ошибке; busy = 1
+    означает, что открытые читатели не дали перенести весь WAL.
+    """
+    try:
+        result = tuple(connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+    except sqlite3.Error as e:
+        logger.warning(f"Не удалось выполнить checkpoint WAL: {e}")
+        return None
+    if result[0]:
+        logger.info(f"Checkpoint WAL выполнен не полностью: {result}")
+    return result
+
+
+def connect_read_only(filename, profile=DEFAULT_PROFILE, tracer=None, label='reader'):
+    """Открывает соединение только для чтения (URI mode=ro)"""
+    # urllib.parse.quote вместо urllib.request.pathname2url: urllib.request
+    # тянет за собой http.client, email и ssl и замедляет запуск
+    path = os.path.abspath(filename).replace(os.sep, '/')
+    if not path.startswith('/'):
+        # Windows: C:/dir -> /C:/dir
+        path = '/' + path
+    uri = f"file:{quote(path, safe='/:')}?mode=ro"
+    # Соединение из пула может использоваться разными потоками поочередно
+    connection = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=TracedConnection)
+    if tracer:
+        tracer.attach(connection, label)
+    apply_pragma_profile(connection, profile, read_only=True)
+    return connection
+
+
+class ConnectionManager:
+    """Одно соединение для записи и пул соединений только для чтения.
+
+    Соединение для записи используется в UI-потоке (правка записей, DDL),
+    читатели выдаются фоновым задачам: загрузке таблиц, поиску, экспорту.
+    В режиме WAL читатели и писатель не блокируют друг друга.
+    """
+
+    def __init__(self, filename, profile=DEFAULT_PROFILE, pool_size=4, tracer=None):
+        self.filename = filename
+        self.profile = profile
+        self.pool_size = pool_size
+        self.tracer = tracer
+        self.writer = connect(filename, profile, tracer)
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire_reader(self, timeout=None):
+        """Берет читателя из пула, при необходимости открывает новое соединение"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Менеджер соединений закрыт")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.pool_size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                connection = connect_read_only(self.filename, self.profile, self.tracer,
+                                               f"reader-{self._created}")
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            logger.debug("Открыт читатель %s/%s", self._created, self.pool_size)
+            return connection
+
+        # Пул исчерпан - ждем освобождения читателя
+        return self._idle.get(timeout=timeout)
+
+    def release_reader(self, connection):
+        """Возвращает читателя в пул"""
+        if self._closed:
+            self._detach_tracer(connection)
+            connection.close()
+            return
+        try:
+            # Завершаем незакрытую транзакцию чтения, чтобы не держать снимок WAL
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            self._detach_tracer(connection)
+            connection.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(connection)
+
+    @contextmanager
+    def reader(self, timeout=None):
+        """Контекстный менеджер для временного получения читателя"""
+        connection = self.acquire_reader(timeout)
+        try:
+            yield connection
+        finally:
+            self.release_reader(connection)
+
+    @contextmanager
+    def background_writer(self, label='background'):
+        """Отдельное соединение для долгой записи в фоновом потоке.
+        
+        Писатель UI-потока остается свободным; пока фоновое соединение
+        держит транзакцию, другие записи ждут в пределах busy_timeout.
+        Соединение нужно открывать в том потоке, где оно используется.
+        """
+        connection = connect(self.filename, self.profile, self.tracer, label)
+        try:
+            yield connection
+        finally:
+            self._detach_tracer(connection)
+            connection.close()
+    
+    def data_version(self):
+        """Версия содержимого БД для сброса кэшей (вызывается из UI-потока).
+
+        PRAGMA data_version меняется при фиксации транзакций другими
+        соединениями, но не собственным писателем - поэтому к ней добавлены
+        total_changes писателя и schema_version (изменения структуры).
+        """
+        data_version = self.writer.execute("PRAGMA data_version").fetchone()[0]
+        schema_version = self.writer.execute("PRAGMA schema_version").fetchone()[0]
+        return (data_version, self.writer.total_changes, schema_version)
+
+    def set_profile(self, profile):
+        """Меняет профиль: писатель сразу, читатели при следующем открытии"""
+        self.profile = apply_pragma_profile(self.writer, profile)
+        self._close_idle_readers()
+
+    def set_tracer(self, tracer):
+        """Включает или отключает трассировку SQL: писатель сразу, читатели при следующем открытии"""
+        if self.tracer:
+            self.tracer.detach(self.writer)
+        self.tracer = tracer
+        if tracer:
+            tracer.attach(self.writer, 'writer')
+        self._close_idle_readers()
+
+    def _close_idle_readers(self):
+        """Закрывает простаивающих читателей"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._detach_tracer(connection)
+            connection.close()
+            with self._lock:
+                self._created -= 1
+
+    def _detach_tracer(self, connection):
+        if self.tracer:
+            self.tracer.detach(connection)
+
+    def close(self):
+        """Закрывает все соединения; занятые читатели закроются при возврате"""
+        self._closed = True
+        self._close_idle_readers()
+        self._detach_tracer(self.writer)
+        self.writer.close()
@@ -12,26 +12,75 @@ from datetime import datetime
 import threading
 import sys
 import logging
+import logging.handlers
 import traceback
 
+from db_connection import ConnectionManager
+import db_service
+from db_service import (DatabaseService, ColumnFilter, FILTER_OPERATORS, NO_VALUE_OPERATORS,
+                        RANGE_OPERATORS, build_search_condition, build_filter_condition,
+                        build_order_clause, combine_conditions, describe_filter, build_preview_select)
+from settings_store import SettingsStore
+from background import run_in_background
+from log_utils import BatchLog, set_log_level, format_count, format_size
+from metrics import metrics
+from profiling import profiler
+from sql_trace import sql_tracer
+from change_monitor import ChangeMonitor
+from row_cache import RowCache, CompactPage
+from query_cache import query_cache
+import maintenance
+from maintenance import MaintenanceJob, JobCancelled, compact_backup
+
+# Логгер приложения; обработчики настраиваются при создании окна
+logger = logging.getLogger('db_manager')
+
+
+# Ограничение размера файла лога и число архивных файлов
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Статистика операций сохраняется при выходе
+METRICS_FILE = os.path.join(LOG_DIR, 'metrics.json')
+SQL_TRACE_FILE = os.path.join(LOG_DIR, 'sql_trace.log')
+
+# С какого размера таблицы предупреждать о сортировке без индекса
+SORT_WARN_ROWS = 100000
+
+# Таблицы до этого размера загружаются целиком, большие - постранично
+FULL_LOAD_ROWS = 10000
+
+# Период проверки изменений БД другими программами
+CHANGE_POLL_MS = 2000
+
+# Точный COUNT(*) после внешнего изменения откладывается: пока другая программа
+# пишет, полный проход таблицы повторялся бы на каждой проверке
+RECOUNT_DELAY_MS = 10000
+
+
 # Настройка системы логирования
-def setup_logging():
-    """подробное логирование для отладки"""
-    log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+def setup_logging(level='INFO'):
+    """Логирование в ротируемый файл logs/db_manager.log и в консоль"""
+    # Повторная настройка не нужна (например, при нескольких окнах)
+    if logging.getLogger().handlers:
+        return logger
+    
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
     
-    log_file = os.path.join(log_dir, f'db_manager_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+    log_file = os.path.join(LOG_DIR, 'db_manager.log')
     
     # Настраиваем форматтер
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
     )
     
-    # Файловый хендлер
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    # Файловый хендлер: один файл с ротацией по размеру, открывается при первой записи
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8', delay=True)
     file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.DEBUG)
     
     # Консольный хендлер
     console_handler = logging.StreamHandler()
@@ -39,69 +88,127 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     
     # Настраиваем root logger
-    logging.basicConfig(level=logging.DEBUG, handlers=[file_handler, console_handler])
-    
-    logger = logging.getLogger('db_manager')
-    logger.info(f"Логирование инициализировано. Файл лога: {log_file}")
+    logging.basicConfig(handlers=[file_handler, console_handler])
+    set_log_level(level)
     return logger
 
-# Инициализируем логгер
-logger = setup_logging()
 
-# Импортируем дополнительные диалоги
-try:
-    from dialogs import (TableStructureDialog, EditRecordDialog, 
-                        SQLQueryDialog, SettingsDialog, CreateTableDialog, FieldDialog)
-    logger.info("Успешно импортированы все диалоги")
-except ImportError as e:
-    logger.error(f"Ошибка импорта диалогов: {e}")
-    # Если файл dialogs.py не найден, определяем заглушки
-    class TableStructureDialog:
-        def __init__(self, *args, **kwargs):
-            logger.error("Попытка использования недоступного TableStructureDialog")
-            messagebox.showinfo("Информация", "Диалог структуры таблицы недоступен")
-    
-    class EditRecordDialog:
-        def __init__(self, *args, **kwargs):
-            logger.error("Попытка использования недоступного EditRecordDialog")
-            messagebox.showinfo("Информация", "Диалог редактирования недоступен")
-            self.result = False
-    
-    class SQLQueryDialog:
-        def __init__(self, *args, **kwargs):
-            messagebox.showinfo("Информация", "Диалог SQL запросов недоступен")
-    
-    class SettingsDialog:
-        def __init__(self, *args, **kwargs):
-            messagebox.showinfo("Информация", "Диалог настроек недоступен")
-    
-    class CreateTableDialog:
-        def __init__(self, *args, **kwargs):
-            messagebox.showinfo("Информация", "Диалог создания таблицы недоступен")
-            self.result = False
-    
-    class FieldDialog:
-        def __init__(self, *args, **kwargs):
-            messagebox.showinfo("Информация", "Диалог добавления поля недоступен")
-            self.result = None
+# Сообщения для заглушек, если файл dialogs.py не найден
+UNAVAILABLE_DIALOGS = {
+    'TableStructureDialog': "Диалог структуры таблицы недоступен",
+    'EditRecordDialog': "Диалог редактирования недоступен",
+    'SQLQueryDialog': "Диалог SQL запросов недоступен",
+    'SettingsDialog': "Диалог настроек недоступен",
+    'PerformanceDialog': "Окно производительности недоступно",
+    'SQLTraceDialog': "Журнал SQL недоступен",
+    'GlobalSearchDialog': "Поиск по базе данных недоступен",
+    'CreateTableDialog': "Диалог создания таблицы недоступен",
+    'FieldDialog': "Диалог добавления поля недоступен",
+}
+
+
+class UnavailableDialog:
+    """Заглушка вместо диалога из недоступного dialogs.py"""
+    def __init__(self, name):
+        logger.error(f"Попытка использования недоступного {name}")
+        messagebox.showinfo("Информация", UNAVAILABLE_DIALOGS.get(name, "Диалог недоступен"))
+        self.result = None
+
+
+def get_dialog(name):
+    """Возвращает класс диалога, импортируя dialogs.py при первом обращении"""
+    try:
+        import dialogs
+    except ImportError as e:
+        logger.error(f"Ошибка импорта диалогов: {e}")
+        return lambda *args, **kwargs: UnavailableDialog(name)
+    return getattr(dialogs, name)
+
 
 class DatabaseManager:
     def __init__(self):
+        # Настройки, сохраняемые между запусками (файл читается при первом обращении)
+        self.settings = SettingsStore()
+        setup_logging(self.settings.get('log_level'))
+        
         self.root = tk.Tk()
         self.root.title("SQLite Database Manager - AstraLinux")
         self.root.geometry("1200x800")
         
-        # Текущая БД
+        # Текущая БД: writer-соединение и пул читателей
         self.current_db = None
+        self.connections = None
         self.connection = None
+        self.service = None
         
-        # Настройки автобэкапа
-        self.auto_backup = True
-        self.backup_dir = os.path.join(os.path.expanduser("~"), "db_backups")
+        # Постраничная загрузка таблицы
+        self.page_size = 1000
+        self.current_page = 0
+        self.current_columns = []
+        self.current_column_types = {}
+        # У таблиц с rowid строки грида имеют iid = rowid и правятся точечно
+        self.current_has_rowid = False
+        # Колонки грида: BLOB и длинный текст приходят сокращенными
+        self.current_select = "*"
+        self.page_limit = self.page_size
+        # Загруженные страницы: возврат к ним не требует запроса к БД
+        self.row_cache = RowCache(self.settings.get('row_cache_mb'))
+        self.grid_page = None
+        query_cache.set_limit(self.settings.get('query_cache_mb'))
+        # Колонки и наличие rowid таблиц до изменения структуры БД
+        self._table_meta = {}
+        # Оценки и точное число строк таблиц (точные сбрасываются при изменении БД)
+        self.table_info = {}
+        self.exact_counts = {}
+        self.counts_version = None
+        self._counting = set()
+        # Проверка изменений БД другими программами
+        self.change_monitor = None
+        self._change_poll_id = None
+        # Состояние БД при последнем автобэкапе в этом сеансе
+        self._backup_state = None
+        # Автобэкап идет в фоне; изменения за это время - повторный бэкап после него
+        self._backup_running = False
+        self._backup_pending = False
+        # Последний анализ места: ((файл, версия данных), StorageReport)
+        self.storage_report = None
+        # Версия данных, для которой посчитаны оценки и размеры в table_info
+        self.overview_version = None
+        self.column_filters = []
+        self.sort_column = None
+        self.sort_descending = False
+        self._load_generation = 0
+        self._search_after_id = None
+        self._recount_after_id = None
+        
+        # Запись профиля следующего действия (Инструменты -> Записать профиль)
+        profiler.output_dir = LOG_DIR
+        profiler.on_saved = self.on_profile_saved
         
         self.setup_ui()
-        self.create_backup_dir()
+    
+    @property
+    def auto_backup(self):
+        """Включено ли автоматическое резервное копирование"""
+        return self.settings.get('auto_backup')
+    
+    @auto_backup.setter
+    def auto_backup(self, value):
+        self.settings.set('auto_backup', value)
+    
+    @property
+    def backup_dir(self):
+        """Папка для автобэкапов"""
+        return self.settings.get('backup_dir')
+    
+    @backup_dir.setter
+    def backup_dir(self, value):
+        self.settings.set('backup_dir', value)
         
+    def pragma_profile_for(self, filename):
+        """Возвращает профиль соединения для файла БД"""
+        return self.settings.get_db(filename, 'pragma_profile')
+    
     def create_backup_dir(self):
         """Создает директорию для бэкапов"""
         if not os.path.exists(self.backup_dir):
@@ -122,8 +229,13 @@ class DatabaseManager:
         left_frame.config(width=300)
         
         # Дерево таблиц
-        self.tree_tables = ttk.Treeview(left_frame, selectmode='browse')
+        self.tree_tables = ttk.Treeview(left_frame, selectmode='browse', columns=('rows', 'size'))
         self.tree_tables.heading('#0', text='Таблицы')
+        self.tree_tables.heading('rows', text='Строк')
+        self.tree_tables.heading('size', text='Размер')
+        self.tree_tables.column('#0', width=140)
+        self.tree_tables.column('rows', width=80, anchor=tk.E)
+        self.tree_tables.column('size', width=70, anchor=tk.E)
         self.tree_tables.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.tree_tables.bind('<<TreeviewSelect>>', self.on_table_select)
         
@@ -155,6 +267,16 @@ class DatabaseManager:
         ttk.Button(toolbar_frame, text="Обновить", 
                   command=self.refresh_data).pack(side=tk.LEFT, padx=2)
         
+        # Навигация по страницам
+        self.prev_page_button = ttk.Button(toolbar_frame, text="◀", width=3,
+                                           command=self.prev_page, state=tk.DISABLED)
+        self.prev_page_button.pack(side=tk.LEFT, padx=(10, 2))
+        self.page_var = tk.StringVar()
+        ttk.Label(toolbar_frame, textvariable=self.page_var).pack(side=tk.LEFT, padx=2)
+        self.next_page_button = ttk.Button(toolbar_frame, text="▶", width=3,
+                                           command=self.next_page, state=tk.DISABLED)
+        self.next_page_button.pack(side=tk.LEFT, padx=2)
+        
         # Поиск
         search_frame = ttk.Frame(toolbar_frame)
         search_frame.pack(side=tk.RIGHT, padx=5)
@@ -166,6 +288,34 @@ class DatabaseManager:
         ttk.Button(search_frame, text="Очистить", 
                   command=self.clear_search).pack(side=tk.LEFT, padx=2)
         
+        # Фильтры по колонкам (компилируются в параметризованный WHERE)
+        filter_frame = ttk.Frame(right_frame)
+        filter_frame.pack(fill=tk.X, padx=5, pady=(0, 5))
+        ttk.Label(filter_frame, text="Фильтр:").pack(side=tk.LEFT, padx=2)
+        self.filter_column_var = tk.StringVar()
+        self.filter_column_combo = ttk.Combobox(filter_frame, textvariable=self.filter_column_var,
+                                                state='readonly', width=15)
+        self.filter_column_combo.pack(side=tk.LEFT, padx=2)
+        self.filter_operator_var = tk.StringVar(value=FILTER_OPERATORS['eq'])
+        operator_combo = ttk.Combobox(filter_frame, textvariable=self.filter_operator_var,
+                                      values=list(FILTER_OPERATORS.values()), state='readonly', width=11)
+        operator_combo.pack(side=tk.LEFT, padx=2)
+        operator_combo.bind('<<ComboboxSelected>>', self.update_filter_inputs)
+        self.filter_value_var = tk.StringVar()
+        self.filter_value_entry = ttk.Entry(filter_frame, textvariable=self.filter_value_var, width=15)
+        self.filter_value_entry.pack(side=tk.LEFT, padx=2)
+        self.filter_value_entry.bind('<Return>', lambda e: self.add_filter())
+        self.filter_value2_var = tk.StringVar()
+        self.filter_value2_entry = ttk.Entry(filter_frame, textvariable=self.filter_value2_var,
+                                             width=12, state=tk.DISABLED)
+        self.filter_value2_entry.pack(side=tk.LEFT, padx=2)
+        self.filter_value2_entry.bind('<Return>', lambda e: self.add_filter())
+        ttk.Button(filter_frame, text="Применить", command=self.add_filter).pack(side=tk.LEFT, padx=2)
+        ttk.Button(filter_frame, text="Убрать", command=self.remove_last_filter).pack(side=tk.LEFT, padx=2)
+        ttk.Button(filter_frame, text="Сбросить", command=self.clear_filters).pack(side=tk.LEFT, padx=2)
+        self.filters_var = tk.StringVar()
+        ttk.Label(filter_frame, textvariable=self.filters_var, foreground='gray').pack(side=tk.LEFT, padx=5)
+        
         # Таблица данных
         data_frame = ttk.Frame(right_frame)
         data_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -181,6 +331,13 @@ class DatabaseManager:
         v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         
+        # Контекстное меню ячейки: BLOB в файл и из файла
+        self.cell_menu = tk.Menu(self.root, tearoff=0)
+        self.cell_menu.add_command(label="Сохранить значение в файл...", command=self.save_cell_to_file)
+        self.cell_menu.add_command(label="Загрузить значение из файла...", command=self.load_cell_from_file)
+        self.menu_cell = None
+        self.data_tree.bind('<Button-3>', self.show_cell_menu)
+        
         # Статусная строка
         self.status_var = tk.StringVar()
         self.status_var.set("Готов к работе")
@@ -197,8 +354,12 @@ class DatabaseManager:
         menubar.add_cascade(label="Файл", menu=file_menu)
         file_menu.add_command(label="Новая база данных", command=self.new_database)
         file_menu.add_command(label="Открыть базу данных", command=self.open_database)
+        # Список заполняется при открытии подменю, чтобы не читать настройки при старте
+        self.recent_menu = tk.Menu(file_menu, tearoff=0, postcommand=self.update_recent_menu)
+        file_menu.add_cascade(label="Недавние файлы", menu=self.recent_menu)
         file_menu.add_separator()
         file_menu.add_command(label="Резервная копия", command=self.backup_database)
+        file_menu.add_command(label="Сжатая резервная копия", command=self.compact_backup_database)
         file_menu.add_command(label="Восстановить из копии", command=self.restore_database)
         file_menu.add_separator()
         file_menu.add_command(label="Экспорт в SQL", command=self.export_sql)
@@ -210,7 +371,17 @@ class DatabaseManager:
         tools_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Инструменты", menu=tools_menu)
         tools_menu.add_command(label="SQL запрос", command=self.sql_query_dialog)
+        tools_menu.add_command(label="Поиск по всей БД", command=self.global_search_dialog)
         tools_menu.add_command(label="Вакуум БД", command=self.vacuum_database)
+        tools_menu.add_command(label="Анализ места", command=self.storage_dialog)
+        tools_menu.add_command(label="Производительность", command=self.performance_dialog)
+        self.profile_var = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label="Записать профиль", variable=self.profile_var,
+                                   command=self.toggle_profile)
+        self.sql_trace_var = tk.BooleanVar(value=self.settings.get('sql_trace'))
+        tools_menu.add_checkbutton(label="Трассировка SQL", variable=self.sql_trace_var,
+                                   command=self.toggle_sql_trace)
+        tools_menu.add_command(label="Журнал SQL", command=self.sql_trace_dialog)
         tools_menu.add_separator()
         tools_menu.add_command(label="Настройки", command=self.settings_dialog)
         
@@ -219,6 +390,17 @@ class DatabaseManager:
         menubar.add_cascade(label="Справка", menu=help_menu)
         help_menu.add_command(label="О программе", command=self.about_dialog)
     
+    def update_recent_menu(self):
+        """Перестраивает меню недавних файлов"""
+        self.recent_menu.delete(0, tk.END)
+        recent_files = self.settings.get('recent_files')
+        if not recent_files:
+            self.recent_menu.add_command(label="(пусто)", state=tk.DISABLED)
+            return
+        for filename in recent_files:
+            self.recent_menu.add_command(label=filename,
+                                         command=lambda f=filename: self.open_database_file(f))
+    
     def new_database(self):
         """Создает новую базу данных"""
         filename = filedialog.asksaveasfilename(
@@ -248,23 +430,56 @@ class DatabaseManager:
     def open_database_file(self, filename):
         """Открывает файл базы данных"""
         try:
-            # Закрываем текущее соединение
-            if self.connection:
-                self.connection.close()
-            
-            self.connection = sqlite3.connect(filename)
-            self.current_db = filename
-            self.refresh_tables()
+            with metrics.measure('open_database'):
+                # Закрываем текущие соединения
+                self.close_connections()
+                
+                self.connections = ConnectionManager(filename, self.pragma_profile_for(filename),
+                                                     tracer=self.active_sql_tracer())
+                self.connection = self.connections.writer
+                self.service = DatabaseService(self.connection, self.connections)
+                self.current_db = filename
+                self.page_size = self.settings.get_db(filename, 'page_size')
+                
+                self.settings.add_recent_file(filename)
+                self.settings.save()
+                self.refresh_tables()
             self.root.title(f"SQLite Database Manager - {os.path.basename(filename)}")
             self.status_var.set(f"Открыта база данных: {os.path.basename(filename)}")
             
             # Автобэкап при открытии
             if self.auto_backup:
                 self.auto_backup_database()
+            
+            self.change_monitor = ChangeMonitor(self.connections)
+            self.schedule_change_poll()
                 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось открыть базу данных: {str(e)}")
     
+    def close_connections(self):
+        """Закрывает writer-соединение и всех читателей"""
+        if self._change_poll_id:
+            self.root.after_cancel(self._change_poll_id)
+            self._change_poll_id = None
+        self.cancel_recount()
+        self.change_monitor = None
+        if self.connections:
+            self.connections.close()
+        self.connections = None
+        self.connection = None
+        self.service = None
+        self.table_info = {}
+        self.overview_version = None
+        self.exact_counts = {}
+        self.counts_version = None
+        self.row_cache.validate(None)
+        self.grid_page = None
+        self._table_meta = {}
+        self._backup_state = None
+        self.storage_report = None
+        query_cache.clear()
+    
     def refresh_tables(self):
         """Обновляет список таблиц"""
         logger.info("Начинаем обновление списка таблиц")
@@ -280,17 +495,19 @@ class DatabaseManager:
                 self.tree_tables.delete(item)
             
             # Получаем список таблиц
-            cursor = self.connection.cursor()
             logger.debug("Выполняем запрос для получения списка таблиц")
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-            tables = cursor.fetchall()
-            logger.info(f"Найдено таблиц: {len(tables)}")
-            
-            for table in tables:
-                logger.debug(f"Добавляем таблицу в дерево: {table[0]}")
-                self.tree_tables.insert('', 'end', text=table[0], values=[table[0]])
+            with metrics.measure('refresh_tables') as measurement:
+                self.valid_exact_counts()
+                tables = self.service.list_tables()
+                logger.info(f"Найдено таблиц: {len(tables)}")
+                
+                for table in tables:
+                    self.tree_tables.insert('', 'end', iid=table, text=table,
+                                            values=(self.row_count_text(table), ''))
+                measurement.rows = len(tables)
             
             logger.info("Обновление списка таблиц завершено успешно")
+            self.load_table_overview()
                 
         except Exception as e:
             logger.error(f"Ошибка при обновлении списка таблиц: {str(e)}")
@@ -298,6 +515,111 @@ class DatabaseManager:
             logger.error(f"Трассировка: {traceback.format_exc()}")
             messagebox.showerror("Ошибка", f"Не удалось получить список таблиц: {str(e)}")
     
+    def load_table_overview(self):
+        """Оценки числа строк и размеры таблиц в фоне (dbstat читает все страницы).
+        
+        Пока версия данных и схемы не изменилась, используется прошлый результат.
+        """
+        service = self.service
+        version = self.connections.data_version()
+        if version == self.overview_version:
+            for name in self.table_info:
+                self.update_table_item(name)
+            return
+        
+        def on_done(overview):
+            if service is not self.service:
+                return
+            self.table_info = {info.name: info for info in overview}
+            self.overview_version = version
+            for info in overview:
+                self.update_table_item(info.name)
+        
+        def on_error(e):
+            logger.warning(f"Не удалось получить размеры таблиц: {str(e)}")
+        
+        run_in_background(self.root, service.table_overview, on_done, on_error)
+    
+    def valid_exact_counts(self):
+        """Точные числа строк, актуальные для текущей версии данных"""
+        version = self.connections.data_version()
+        if version != self.counts_version:
+            self.exact_counts = {}
+            self.counts_version = version
+        return self.exact_counts
+    
+    def row_count_text(self, table_name):
+        """Число строк: точное или оценка с ~"""
+        if table_name in self.exact_counts:
+            return format_count(self.exact_counts[table_name])
+        info = self.table_info.get(table_name)
+        if info and info.estimated_rows is not None:
+            return "~" + format_count(info.estimated_rows)
+        return ""
+    
+    def update_table_item(self, table_name):
+        """Обновляет число строк и размер в дереве таблиц"""
+        if not self.tree_tables.exists(table_name):
+            return
+        info = self.table_info.get(table_name)
+        size = format_size(info.size) if info and info.size is not None else ''
+        self.tree_tables.item(table_name, values=(self.row_count_text(table_name), size))
+    
+    def schedule_recount(self, table_name):
+        """Откладывает COUNT(*) до паузы во внешних изменениях (до нее показывается оценка)"""
+        self.cancel_recount()
+        
+        def recount():
+            self._recount_after_id = None
+            self.count_table_rows(table_name)
+        self._recount_after_id = self.root.after(RECOUNT_DELAY_MS, recount)
+    
+    def cancel_recount(self):
+        """Отменяет отложенный COUNT(*)"""
+        if self._recount_after_id:
+            self.root.after_cancel(self._recount_after_id)
+            self._recount_after_id = None
+    
+    def count_table_rows(self, table_name):
+        """Точный COUNT(*) в фоне, если нет актуального значения в кэше"""
+        if not self.connections or table_name in self.valid_exact_counts() or table_name in self._counting:
+            return
+        
+        service = self.service
+        version = self.counts_version
+        self._counting.add(table_name)
+        
+        def task():
+            return service.count_rows(table_name)
+        
+        def on_done(count):
+            self._counting.discard(table_name)
+            if service is not self.service:
+                return
+            # Пока считали, данные могли измениться - такой результат не кэшируем
+            self.valid_exact_counts()
+            if self.counts_version != version:
+                return
+            self.exact_counts[table_name] = count
+            self.update_table_item(table_name)
+            if getattr(self, 'current_table', None) == table_name:
+                self.update_pager(self.next_page_button.instate(['!disabled']))
+        
+        def on_error(e):
+            self._counting.discard(table_name)
+            logger.warning(f"Не удалось посчитать строки таблицы {table_name}: {str(e)}")
+        
+        run_in_background(self.root, task, on_done, on_error)
+    
+    def table_row_estimate(self, table_name):
+        """Точное число строк из кэша или быстрая оценка"""
+        if table_name in self.valid_exact_counts():
+            return self.exact_counts[table_name]
+        info = self.table_info.get(table_name)
+        if info:
+            return info.estimated_rows
+        return self.service.estimate_row_count(table_name)
+    
     def on_table_select(self, event):
         """Обработка выбора таблицы"""
         selection = self.tree_tables.selection()
@@ -305,58 +627,367 @@ class DatabaseManager:
             table_name = self.tree_tables.item(selection[0])['text']
             self.load_table_data(table_name)
     
-    def load_table_data(self, table_name):
-        """Загружает данные таблицы"""
-        logger.info(f"Начинаем загрузку данных таблицы: {table_name}")
+    def show_search_hit(self, hit, term):
+        """Открывает таблицу с найденной строкой: фильтр по rowid, без rowid - по искомому тексту"""
+        if not self.tree_tables.exists(hit.table):
+            return
+        if hit.rowid is not None:
+            column_filter = ColumnFilter('rowid', 'eq', hit.rowid, '')
+        else:
+            column_filter = ColumnFilter(hit.column, 'like', f"%{term}%", '')
+        # Строка поиска по таблице могла бы скрыть найденную строку
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        self.search_var.set("")
+        self.tree_tables.see(hit.table)
+        self.load_table_data(hit.table, filters=[column_filter])
+    
+    def schedule_change_poll(self):
+        """Планирует следующую проверку внешних изменений"""
+        if self._change_poll_id:
+            self.root.after_cancel(self._change_poll_id)
+        self._change_poll_id = self.root.after(CHANGE_POLL_MS, self.poll_changes)
+    
+    def poll_changes(self):
+        """Проверяет, не изменила ли БД другая программа (в простое - только os.stat)"""
+        self._change_poll_id = None
+        if not self.change_monitor:
+            return
+        
+        if self.settings.get('auto_refresh'):
+            try:
+                state = self.change_monitor.check()
+            except (sqlite3.Error, OSError) as e:
+                logger.debug("Ошибка проверки изменений БД: %s", e)
+                state = None
+            if state:
+                self.on_external_change(state)
+        
+        self.schedule_change_poll()
+    
+    def on_external_change(self, state):
+        """Обновляет список таблиц и видимую страницу после внешнего изменения"""
+        if state.schema:
+            self.refresh_tables()
+        
+        table_name = getattr(self, 'current_table', None)
+        if table_name and self.tree_tables.exists(table_name):
+            self.load_table_data(table_name, self.current_page, keep_view=True)
+        self.status_var.set("База данных изменена другой программой - данные обновлены")
+    
+    def load_table_data(self, table_name, page=0, keep_view=False, filters=None):
+        """Загружает данные таблицы (filters - заменить фильтры по колонкам)"""
+        logger.info(f"Начинаем загрузку данных таблицы: {table_name}, страница {page + 1}")
         
         if not self.connection:
             logger.warning("Нет подключения к БД при загрузке данных таблицы")
             return
             
         try:
-            # Очищаем текущие данные
-            logger.debug("Очищаем текущие данные в дереве")
-            for item in self.data_tree.get_children():
-                self.data_tree.delete(item)
-            
             # Получаем структуру таблицы
-            cursor = self.connection.cursor()
-            logger.debug(f"Получаем структуру таблицы: {table_name}")
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            logger.debug(f"Структура таблицы {table_name}: {columns}")
+            logger.debug("Получаем структуру таблицы: %s", table_name)
+            columns, has_rowid = self.table_metadata(table_name)
+            logger.debug("Структура таблицы %s: %s", table_name, columns)
             
             # Настраиваем колонки
-            column_names = [col[1] for col in columns]
-            logger.debug(f"Имена колонок: {column_names}")
+            column_names = [col.name for col in columns]
+            logger.debug("Имена колонок: %s", column_names)
             self.data_tree['columns'] = column_names
             self.data_tree['show'] = 'headings'
             
+            # Сортировка и фильтры сбрасываются при переходе к другой таблице
+            table_changed = table_name != getattr(self, 'current_table', None)
+            if table_changed or self.sort_column not in column_names:
+                self.sort_column = None
+                self.sort_descending = False
+            if table_changed:
+                self.column_filters = []
+                self.filter_column_combo['values'] = column_names
+                self.filter_column_var.set(column_names[0] if column_names else '')
+            if filters is not None:
+                self.column_filters = list(filters)
+            if table_changed or filters is not None:
+                self.update_filter_summary()
+            
             for col in column_names:
-                logger.debug(f"Настраиваем колонку: {col}")
-                self.data_tree.heading(col, text=col)
+                self.data_tree.heading(col, text=self.heading_text(col),
+                                       command=lambda c=col: self.sort_by(c))
                 self.data_tree.column(col, width=100)
             
-            # Загружаем данные
-            logger.debug(f"Выполняем запрос SELECT * FROM {table_name}")
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
-            logger.info(f"Получено {len(rows)} записей из таблицы {table_name}")
-            
-            for i, row in enumerate(rows):
-                logger.debug(f"Добавляем строку {i+1}: {row}")
-                self.data_tree.insert('', 'end', values=row)
-                
             self.current_table = table_name
-            status_msg = f"Загружена таблица '{table_name}': {len(rows)} записей"
-            self.status_var.set(status_msg)
-            logger.info(f"Загрузка данных завершена успешно. {status_msg}")
+            self.current_columns = column_names
+            self.current_column_types = {col.name: col.type for col in columns}
+            self.current_has_rowid = has_rowid
+            # Полные значения догружаются по rowid, поэтому без rowid грид получает их целиком
+            self.current_select = build_preview_select(columns) if self.current_has_rowid else "*"
+            
+            # Небольшие таблицы загружаются целиком, большие - постранично
+            estimate = self.table_row_estimate(table_name)
+            paged = estimate is None or estimate > FULL_LOAD_ROWS
+            self.page_limit = self.page_size if paged else max(self.page_size, FULL_LOAD_ROWS)
+            # После внешнего изменения (keep_view) пересчет откладывается до паузы в записи
+            if keep_view:
+                self.schedule_recount(table_name)
+            else:
+                self.cancel_recount()
+                self.count_table_rows(table_name)
+            self.current_page = page
             
         except Exception as e:
             logger.error(f"Ошибка при загрузке данных таблицы {table_name}: {str(e)}")
             logger.error(f"Тип ошибки: {type(e).__name__}")
             logger.error(f"Трассировка: {traceback.format_exc()}")
             messagebox.showerror("Ошибка", f"Не удалось загрузить данные таблицы: {str(e)}")
+            return
+        
+        self.start_grid_load(keep_view)
+    
+    def table_metadata(self, table_name):
+        """Колонки и наличие rowid таблицы; кэш действует до изменения структуры БД"""
+        schema_version = self.connections.data_version()[2]
+        cached = self._table_meta.get(table_name)
+        if cached and cached[0] == schema_version:
+            return cached[1], cached[2]
+        
+        columns = self.service.table_columns(table_name)
+        has_rowid = self.service.has_rowid(table_name)
+        self._table_meta[table_name] = (schema_version, columns, has_rowid)
+        return columns, has_rowid
+    
+    def search_condition(self):
+        """Формирует WHERE из строки поиска по всем колонкам и фильтров по колонкам"""
+        search_mode = self.settings.get_db(self.current_db, 'search_mode')
+        return combine_conditions(
+            build_search_condition(self.current_columns, self.search_var.get(), search_mode),
+            build_filter_condition(self.column_filters, self.current_column_types))
+    
+    def selected_filter_operator(self):
+        """Ключ оператора, выбранного в панели фильтра"""
+        label = self.filter_operator_var.get()
+        for operator, title in FILTER_OPERATORS.items():
+            if title == label:
+                return operator
+        return 'eq'
+    
+    def update_filter_inputs(self, event=None):
+        """Поля значений в зависимости от оператора"""
+        operator = self.selected_filter_operator()
+        self.filter_value_entry.config(state=tk.DISABLED if operator in NO_VALUE_OPERATORS else tk.NORMAL)
+        self.filter_value2_entry.config(state=tk.NORMAL if operator in RANGE_OPERATORS else tk.DISABLED)
+    
+    def update_filter_summary(self):
+        """Список активных фильтров рядом с панелью"""
+        self.filters_var.set("; ".join(describe_filter(f) for f in self.column_filters))
+    
+    def add_filter(self):
+        """Добавляет фильтр по колонке и перезагружает таблицу"""
+        if not hasattr(self, 'current_table') or not self.filter_column_var.get():
+            messagebox.showwarning("Предупреждение", "Выберите таблицу")
+            return
+        
+        operator = self.selected_filter_operator()
+        column_filter = ColumnFilter(self.filter_column_var.get(), operator,
+                                     self.filter_value_var.get(), self.filter_value2_var.get())
+        try:
+            # Проверяем значения до загрузки
+            build_filter_condition([column_filter], self.current_column_types)
+        except ValueError as e:
+            messagebox.showwarning("Предупреждение", str(e))
+            return
+        
+        self.column_filters.append(column_filter)
+        self.filter_value_var.set("")
+        self.filter_value2_var.set("")
+        self.update_filter_summary()
+        self.load_table_data(self.current_table)
+    
+    def remove_last_filter(self):
+        """Убирает последний добавленный фильтр"""
+        if self.column_filters:
+            self.column_filters.pop()
+            self.update_filter_summary()
+            self.load_table_data(self.current_table)
+    
+    def clear_filters(self):
+        """Убирает все фильтры по колонкам"""
+        if self.column_filters:
+            self.column_filters = []
+            self.update_filter_summary()
+            self.load_table_data(self.current_table)
+    
+    def start_grid_load(self, keep_view=False):
+        """Загружает текущую страницу таблицы в фоне через читателя.
+        
+        keep_view - сохранить прокрутку и выделенные строки (при автообновлении).
+        """
+        table_name = self.current_table
+        where_clause, params = self.search_condition()
+        sort_column = self.sort_column
+        filter_count = len(self.column_filters)
+        order_clause = build_order_clause(sort_column, self.sort_descending, table_name)
+        limit = self.page_limit
+        offset = self.current_page * limit
+        with_rowid = self.current_has_rowid
+        select_sql = self.current_select
+        
+        # Результаты устаревших загрузок отбрасываются
+        self._load_generation += 1
+        generation = self._load_generation
+        service = self.service
+        connections = self.connections
+        
+        # Страница уже загружалась при той же версии данных - берем из кэша
+        version = connections.data_version()
+        self.row_cache.validate(version)
+        cache_key = (table_name, select_sql, where_clause, tuple(params), order_clause,
+                     limit, offset, with_rowid)
+        cached_page = self.row_cache.get(cache_key)
+        measurement = metrics.begin('search' if where_clause else 'load_table_data')
+        
+        def task():
+            page = service.fetch_page(table_name, where_clause, params, limit, offset, order_clause,
+                                      with_rowid, select_sql)
+            # Кортежи fetchall освобождаются сразу, дальше живут только колонки
+            return CompactPage.from_page(page)
+        
+        def on_loaded(page):
+            if generation != self._load_generation:
+                logger.debug("Отбрасываем устаревшую загрузку таблицы %s", table_name)
+                return
+            
+            # Запоминаем прокрутку и выделение, чтобы обновление не сбивало просмотр
+            if keep_view:
+                yview = self.data_tree.yview()[0]
+                selected = [self.data_tree.index(item) for item in self.data_tree.selection()]
+            
+            # Очищаем текущие данные
+            logger.debug("Очищаем текущие данные в дереве")
+            for item in self.data_tree.get_children():
+                self.data_tree.delete(item)
+            
+            rows, has_next = page, page.has_next
+            logger.info(f"Получено {len(rows)} записей из таблицы {table_name}")
+            self.grid_page = page
+            # Данные могли измениться во время чтения - такую страницу не кэшируем
+            if connections is self.connections and connections.data_version() == version:
+                self.row_cache.put(cache_key, page)
+            
+            with BatchLog(logger, "Добавлено строк в таблицу %s", table_name,
+                          level=logging.DEBUG) as batch:
+                for row in rows:
+                    if with_rowid:
+                        self.data_tree.insert('', 'end', iid=str(row[0]), values=row[1:])
+                    else:
+                        self.data_tree.insert('', 'end', values=row)
+                    batch.add()
+            measurement.finish(rows=len(rows))
+            
+            if keep_view:
+                children = self.data_tree.get_children()
+                self.data_tree.selection_set([children[i] for i in selected if i < len(children)])
+                self.data_tree.yview_moveto(yview)
+            
+            self.update_pager(has_next)
+            status_msg = f"Загружена таблица '{table_name}': {len(rows)} записей"
+            if self.current_page or has_next:
+                status_msg += f" (строки {offset + 1}-{offset + len(rows)})"
+            if sort_column:
+                status_msg += f", сортировка по '{sort_column}'"
+            if filter_count:
+                status_msg += f", фильтров: {filter_count}"
+            self.status_var.set(status_msg)
+            logger.info(f"Загрузка данных завершена успешно. {status_msg}")
+        
+        def on_error(e):
+            if generation != self._load_generation:
+                return
+            measurement.finish(error=True)
+            logger.error(f"Ошибка при загрузке данных таблицы {table_name}: {str(e)}")
+            messagebox.showerror("Ошибка", f"Не удалось загрузить данные таблицы: {str(e)}")
+        
+        if cached_page is not None:
+            logger.debug("Страница %s таблицы %s взята из кэша", self.current_page + 1, table_name)
+            on_loaded(cached_page)
+            return
+        
+        task, on_loaded, on_error = profiler.wrap_background(measurement.name, task, on_loaded, on_error)
+        self.status_var.set(f"Загрузка таблицы '{table_name}'...")
+        run_in_background(self.root, task, on_loaded, on_error)
+    
+    def heading_text(self, column):
+        """Заголовок колонки со стрелкой направления сортировки"""
+        if column != self.sort_column:
+            return column
+        return f"{column} {'▼' if self.sort_descending else '▲'}"
+    
+    def sort_by(self, column):
+        """Сортировка на стороне SQLite: по возрастанию, по убыванию, без сортировки"""
+        if not hasattr(self, 'current_table'):
+            return
+        
+        if column != self.sort_column:
+            sort_column, descending = column, False
+        elif not self.sort_descending:
+            sort_column, descending = column, True
+        else:
+            sort_column, descending = None, False
+        
+        if sort_column and not self.confirm_sort(sort_column, descending):
+            return
+        
+        self.sort_column = sort_column
+        self.sort_descending = descending
+        self.load_table_data(self.current_table)
+    
+    def confirm_sort(self, column, descending):
+        """Предупреждает, если сортировка большой таблицы пойдет без индекса"""
+        where_clause, params = self.search_condition()
+        try:
+            plan = self.service.sort_plan(self.current_table,
+                                          build_order_clause(column, descending, self.current_table),
+                                          where_clause, params, self.current_has_rowid,
+                                          self.current_select)
+        except Exception as e:
+            logger.warning(f"Не удалось получить план сортировки: {str(e)}")
+            return True
+        
+        if not plan.temp_btree or (plan.estimated_rows or 0) < SORT_WARN_ROWS:
+            return True
+        
+        logger.info(f"Сортировка {self.current_table} по {column} без индекса, "
+                    f"строк: ~{plan.estimated_rows}")
+        return messagebox.askyesno(
+            "Сортировка без индекса",
+            f"Для колонки '{column}' нет подходящего индекса.\n"
+            f"SQLite будет сортировать ~{format_count(plan.estimated_rows)} строк "
+            f"во временном B-дереве при загрузке каждой страницы.\n\n"
+            f"Сортировать все равно?")
+    
+    def update_pager(self, has_next):
+        """Обновляет кнопки навигации по страницам"""
+        page_text = f"Стр. {self.current_page + 1}"
+        # Число страниц известно только без поиска и фильтров
+        if not self.search_var.get().strip() and not self.column_filters:
+            total = self.exact_counts.get(self.current_table)
+            info = self.table_info.get(self.current_table)
+            if total is not None:
+                page_text += f" из {format_count(max(1, -(-total // self.page_limit)))}"
+            elif info and info.estimated_rows:
+                page_text += f" из ~{format_count(max(1, -(-info.estimated_rows // self.page_limit)))}"
+        self.page_var.set(page_text)
+        self.prev_page_button.config(state=tk.NORMAL if self.current_page > 0 else tk.DISABLED)
+        self.next_page_button.config(state=tk.NORMAL if has_next else tk.DISABLED)
+    
+    def prev_page(self):
+        """Переход на предыдущую страницу"""
+        if hasattr(self, 'current_table') and self.current_page > 0:
+            self.load_table_data(self.current_table, self.current_page - 1)
+    
+    def next_page(self):
+        """Переход на следующую страницу"""
+        if hasattr(self, 'current_table'):
+            self.load_table_data(self.current_table, self.current_page + 1)
     
     def create_table_dialog(self):
         """Диалог создания новой таблицы"""
@@ -369,8 +1000,8 @@ class DatabaseManager:
             
         try:
             logger.debug("Создаем экземпляр CreateTableDialog")
-            dialog = CreateTableDialog(self.root, self.connection)
-            logger.debug(f"Результат диалога: {dialog.result}")
+            dialog = get_dialog('CreateTableDialog')(self.root, self.connection)
+            logger.debug("Результат диалога: %s", dialog.result)
             
             if dialog.result:
                 logger.info("Пользователь подтвердил создание таблицы")
@@ -406,9 +1037,7 @@ class DatabaseManager:
                               f"Вы действительно хотите удалить таблицу '{table_name}'?\n"
                               "Все данные будут потеряны!"):
             try:
-                cursor = self.connection.cursor()
-                cursor.execute(f"DROP TABLE {table_name}")
-                self.connection.commit()
+                self.service.drop_table(table_name)
                 self.refresh_tables()
                 
                 # Очищаем область данных
@@ -431,7 +1060,7 @@ class DatabaseManager:
             return
             
         table_name = self.tree_tables.item(selection[0])['text']
-        TableStructureDialog(self.root, self.connection, table_name)
+        get_dialog('TableStructureDialog')(self.root, self.connection, table_name)
     
     def add_record(self):
         """Добавляет новую запись"""
@@ -439,9 +1068,12 @@ class DatabaseManager:
             messagebox.showwarning("Предупреждение", "Выберите таблицу")
             return
             
-        dialog = EditRecordDialog(self.root, self.connection, self.current_table)
+        dialog = get_dialog('EditRecordDialog')(self.root, self.connection, self.current_table)
         if dialog.result:
-            self.load_table_data(self.current_table)
+            if self.patch_grid_row(dialog.rowid):
+                self.status_var.set("Запись добавлена")
+            else:
+                self.refresh_data()
             if self.auto_backup:
                 self.auto_backup_database()
     
@@ -451,48 +1083,55 @@ class DatabaseManager:
         if not selection:
             messagebox.showwarning("Предупреждение", "Выберите запись для редактирования")
             return
-            
-        values = self.data_tree.item(selection[0])['values']
-        dialog = EditRecordDialog(self.root, self.connection, self.current_table, values)
+        
+        item = selection[0]
+        rowid = int(item) if self.current_has_rowid else None
+        if rowid is not None:
+            # Значения из БД, а не строки из грида: типы сохраняются, BLOB и длинный
+            # текст не загружаются (LargeValue) и без изменений не перезаписываются
+            values = self.service.fetch_row_for_edit(self.current_table, rowid)
+            if values is None:
+                messagebox.showwarning("Предупреждение", "Запись уже удалена")
+                self.refresh_data()
+                return
+        else:
+            values = self.grid_row_values(item)
+        dialog = get_dialog('EditRecordDialog')(self.root, self.connection, self.current_table, values, rowid)
         if dialog.result:
-            self.load_table_data(self.current_table)
+            if self.patch_grid_row(rowid, item):
+                self.status_var.set("Запись изменена")
+            else:
+                self.refresh_data()
             if self.auto_backup:
                 self.auto_backup_database()
     
     def delete_record(self):
-        """Удаляет выбранную запись"""
+        """Удаляет выбранные записи"""
         selection = self.data_tree.selection()
         if not selection:
             messagebox.showwarning("Предупреждение", "Выберите запись для удаления")
             return
+        
+        # Без rowid запись ищется по значениям, поэтому удаляется только первая выбранная
+        rowids = [int(item) for item in selection] if self.current_has_rowid else []
+        question = "Удалить выбранную запись?"
+        if len(rowids) > 1:
+            question = f"Удалить выбранные записи ({format_count(len(rowids))})?"
             
-        if messagebox.askyesno("Подтверждение", "Удалить выбранную запись?"):
+        if messagebox.askyesno("Подтверждение", question):
             try:
-                values = self.data_tree.item(selection[0])['values']
-                
-                # Получаем структуру таблицы для формирования WHERE
-                cursor = self.connection.cursor()
-                cursor.execute(f"PRAGMA table_info({self.current_table})")
-                columns = cursor.fetchall()
-                
-                # Формируем WHERE условие
-                where_parts = []
-                for i, col in enumerate(columns):
-                    if i < len(values):
-                        if values[i] is None:
-                            where_parts.append(f"{col[1]} IS NULL")
-                        else:
-                            where_parts.append(f"{col[1]} = ?")
-                
-                where_clause = " AND ".join(where_parts)
-                values_for_where = [v for v in values if v is not None]
-                
-                cursor.execute(f"DELETE FROM {self.current_table} WHERE {where_clause}", 
-                             values_for_where)
-                self.connection.commit()
+                with metrics.measure('delete_record') as measurement:
+                    if rowids:
+                        measurement.rows = self.service.delete_records_by_rowid(self.current_table, rowids)
+                    else:
+                        values = self.grid_row_values(selection[0])
+                        measurement.rows = self.service.delete_record(self.current_table, values)
                 
-                self.load_table_data(self.current_table)
-                self.status_var.set("Запись удалена")
+                if rowids:
+                    self.remove_grid_rows(selection)
+                else:
+                    self.refresh_data()
+                self.status_var.set(f"Удалено записей: {format_count(measurement.rows)}")
                 
                 if self.auto_backup:
                     self.auto_backup_database()
@@ -500,35 +1139,163 @@ class DatabaseManager:
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось удалить запись: {str(e)}")
     
+    def patch_grid_row(self, rowid, item=None):
+        """Точечное обновление грида после записи по rowid.
+        
+        item - строка грида для изменения на месте, без него строка вставляется
+        в конец и выделяется. False - точечно обновить нельзя (нет rowid, rowid
+        изменился вместе с первичным ключом), нужна перезагрузка страницы.
+        """
+        if not self.current_has_rowid or rowid is None:
+            return False
+        
+        row = self.service.fetch_row(self.current_table, rowid, self.current_select)
+        if row is None:
+            return False
+        
+        if item is not None:
+            self.data_tree.item(item, values=row)
+        else:
+            item = str(rowid)
+            if self.data_tree.exists(item):
+                self.data_tree.item(item, values=row)
+            else:
+                self.data_tree.insert('', 'end', iid=item, values=row)
+            self.data_tree.selection_set(item)
+            self.data_tree.see(item)
+        
+        self.count_table_rows(self.current_table)
+        logger.debug("Строка rowid=%s таблицы %s обновлена в гриде", rowid, self.current_table)
+        return True
+    
+    def grid_row_values(self, item):
+        """Значения строки грида из загруженной страницы (с исходными типами,
+        а не строками Tcl из item()['values'])"""
+        index = self.data_tree.index(item)
+        if self.grid_page is not None and index < len(self.grid_page):
+            return list(self.grid_page.row(index))
+        return self.data_tree.item(item)['values']
+    
+    def remove_grid_rows(self, items):
+        """Убирает удаленные строки из грида, выделение переходит на соседнюю строку"""
+        neighbour = self.data_tree.next(items[-1]) or self.data_tree.prev(items[0])
+        self.data_tree.delete(*items)
+        if neighbour and self.data_tree.exists(neighbour):
+            self.data_tree.selection_set(neighbour)
+            self.data_tree.focus(neighbour)
+        self.count_table_rows(self.current_table)
+    
+    def show_cell_menu(self, event):
+        """Контекстное меню ячейки под курсором (только для таблиц с rowid)"""
+        item = self.data_tree.identify_row(event.y)
+        column = self.data_tree.identify_column(event.x)
+        if not item or not column or not self.current_has_rowid:
+            return
+        
+        index = int(column.lstrip('#')) - 1
+        if not 0 <= index < len(self.current_columns):
+            return
+        self.menu_cell = (int(item), self.current_columns[index])
+        self.data_tree.selection_set(item)
+        self.cell_menu.tk_popup(event.x_root, event.y_root)
+    
+    def save_cell_to_file(self):
+        """Сохраняет значение ячейки в файл блоками через читателя"""
+        if not self.menu_cell:
+            return
+        rowid, column = self.menu_cell
+        table_name = self.current_table
+        filename = filedialog.asksaveasfilename(
+            title=f"Сохранить {column}",
+            initialfile=f"{table_name}_{column}_{rowid}.bin",
+            filetypes=[("All files", "*.*")]
+        )
+        if not filename:
+            return
+        
+        service = self.service
+        measurement = metrics.begin('blob_export')
+        
+        def task():
+            return service.export_blob(table_name, column, rowid, filename)
+        
+        def on_done(size):
+            measurement.finish(bytes_written=size)
+            self.status_var.set(f"Значение {column} сохранено в {filename} ({format_size(size)})")
+        
+        def on_error(e):
+            measurement.finish(error=True)
+            messagebox.showerror("Ошибка", f"Не удалось сохранить значение: {str(e)}")
+        
+        self.status_var.set(f"Сохранение {column} в файл...")
+        run_in_background(self.root, task, on_done, on_error)
+    
+    def load_cell_from_file(self):
+        """Заменяет значение ячейки содержимым файла (BLOB пишется блоками в фоне)"""
+        if not self.menu_cell:
+            return
+        rowid, column = self.menu_cell
+        table_name = self.current_table
+        filename = filedialog.askopenfilename(
+            title=f"Загрузить {column}",
+            filetypes=[("All files", "*.*")]
+        )
+        if not filename:
+            return
+        size = os.path.getsize(filename)
+        if not messagebox.askyesno("Подтверждение",
+                                   f"Заменить значение {column} содержимым файла ({format_size(size)})?"):
+            return
+        
+        connections = self.connections
+        measurement = metrics.begin('blob_import')
+        
+        # Запись идет через отдельное соединение, интерфейс не блокируется
+        def task():
+            with connections.background_writer('blob') as connection:
+                return db_service.import_blob(connection, table_name, column, rowid, filename)
+        
+        def on_done(written):
+            measurement.finish(rows=1, bytes_written=written)
+            if connections is not self.connections:
+                return
+            self.change_monitor.acknowledge()
+            if getattr(self, 'current_table', None) == table_name and self.data_tree.exists(str(rowid)):
+                self.patch_grid_row(rowid, str(rowid))
+            self.status_var.set(f"Файл загружен в {column} ({format_size(written)})")
+            if self.auto_backup:
+                self.auto_backup_database()
+        
+        def on_error(e):
+            measurement.finish(error=True)
+            messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {str(e)}")
+        
+        self.status_var.set(f"Загрузка файла в {column}...")
+        run_in_background(self.root, task, on_done, on_error)
+    
     def refresh_data(self):
         """Обновляет данные текущей таблицы"""
         if hasattr(self, 'current_table'):
-            self.load_table_data(self.current_table)
+            self.load_table_data(self.current_table, self.current_page)
     
     def on_search(self, event):
         """Поиск в данных таблицы"""
-        search_text = self.search_var.get().strip().lower()
-        if not search_text:
-            self.refresh_data()
-            return
-            
-        # Фильтруем отображаемые строки
-        all_items = self.data_tree.get_children()
-        for item in all_items:
-            values = self.data_tree.item(item)['values']
-            found = False
-            for value in values:
-                if str(value).lower().find(search_text) != -1:
-                    found = True
-                    break
-            
-            if not found:
-                self.data_tree.delete(item)
+        # Запрос выполняется после паузы в наборе текста
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(300, self.apply_search)
+    
+    def apply_search(self):
+        """Перезагружает таблицу с условием поиска"""
+        self._search_after_id = None
+        if hasattr(self, 'current_table'):
+            self.load_table_data(self.current_table)
     
     def clear_search(self):
         """Очищает поиск"""
         self.search_var.set("")
-        self.refresh_data()
+        if hasattr(self, 'current_table'):
+            self.load_table_data(self.current_table)
     
     def backup_database(self):
         """Создает резервную копию БД"""
@@ -543,51 +1310,141 @@ class DatabaseManager:
             filetypes=[("SQLite files", "*.db"), ("All files", "*.*")]
         )
         
-        if filename:
-            try:
-                shutil.copy2(self.current_db, filename)
-                messagebox.showinfo("Успех", f"Резервная копия создана: {filename}")
-                self.status_var.set("Резервная копия создана")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось создать резервную копию: {str(e)}")
+        if not filename:
+            return
+        
+        db_path = self.current_db
+        measurement = metrics.begin('backup')
+        
+        # Копия снимается отдельным соединением в фоне (включая данные из WAL)
+        def task():
+            return db_service.backup_database(None, db_path, filename)
+        
+        def on_done(size):
+            measurement.finish(bytes_written=size)
+            messagebox.showinfo("Успех", f"Резервная копия создана: {filename}")
+            self.status_var.set("Резервная копия создана")
+        
+        def on_error(e):
+            measurement.finish(error=True)
+            messagebox.showerror("Ошибка", f"Не удалось создать резервную копию: {str(e)}")
+        
+        self.status_var.set("Создание резервной копии...")
+        run_in_background(self.root, task, on_done, on_error)
+    
+    def compact_backup_database(self):
+        """Сжатая копия БД (VACUUM INTO) в фоне, вместо копирования и вакуума копии"""
+        if not self.current_db:
+            messagebox.showwarning("Предупреждение", "Сначала откройте базу данных")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            title="Сохранить сжатую копию",
+            defaultextension=".db",
+            initialfile=f"{os.path.splitext(os.path.basename(self.current_db))[0]}_compact_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db",
+            filetypes=[("SQLite files", "*.db"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        if os.path.abspath(filename) == os.path.abspath(self.current_db):
+            messagebox.showerror("Ошибка", "Копию нельзя сохранить поверх открытой БД")
+            return
+        
+        connections = self.connections
+        job = MaintenanceJob("Сжатая резервная копия")
+        measurement = metrics.begin('compact_backup')
+        
+        # Копия читает БД на отдельном соединении: ни писатель UI, ни пул не заняты
+        def task():
+            with connections.background_writer('compact') as connection:
+                return compact_backup(connection, filename, job)
+        
+        def on_done(result):
+            progress.close()
+            measurement.finish(bytes_written=result.size_after)
+            self.status_var.set(f"Сжатая копия создана: {format_size(result.size_before)} -> "
+                                f"{format_size(result.size_after)}")
+            messagebox.showinfo("Успех", f"Сжатая копия создана: {filename}\n"
+                                         f"Размер БД: {format_size(result.size_before)}\n"
+                                         f"Размер копии: {format_size(result.size_after)}")
+        
+        def on_error(e):
+            progress.close()
+            if isinstance(e, JobCancelled):
+                measurement.finish()
+                self.status_var.set("Создание сжатой копии отменено")
+                return
+            measurement.finish(error=True)
+            messagebox.showerror("Ошибка", f"Не удалось создать сжатую копию: {str(e)}")
+        
+        progress = get_dialog('ProgressDialog')(self.root, job)
+        task, on_done, on_error = profiler.wrap_background('compact_backup', task, on_done, on_error)
+        run_in_background(self.root, task, on_done, on_error)
     
     def auto_backup_database(self):
-        """Автоматическое создание резервной копии"""
+        """Автоматическое создание резервной копии в фоновом потоке"""
         if not self.current_db or not self.auto_backup:
             return
+        # Копия уже создается - повторим после ее завершения
+        if self._backup_running:
+            self._backup_pending = True
+            return
             
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            basename = os.path.splitext(os.path.basename(self.current_db))[0]
-            backup_filename = f"{basename}_auto_{timestamp}.db"
-            backup_path = os.path.join(self.backup_dir, backup_filename)
-            
-            shutil.copy2(self.current_db, backup_path)
-            
-            # Удаляем старые автобэкапы (оставляем последние 10)
-            self.cleanup_old_backups(basename)
+            # Данные и файлы не менялись после прошлого автобэкапа в этом сеансе -
+            # не нужно даже читать файл
+            state = self.backup_state()
+            if state is not None and state == self._backup_state:
+                logger.debug("БД не изменилась после прошлого автобэкапа, пропускаем")
+                return
             
+            # Папка проверяется только при первом бэкапе, а не при запуске
+            self.create_backup_dir()
         except Exception:
-            pass  # Игнорируем ошибки автобэкапа
+            return  # Игнорируем ошибки автобэкапа
+        
+        db_path = self.current_db
+        backup_dir = self.backup_dir
+        basename = os.path.splitext(os.path.basename(db_path))[0]
+        # Количество хранимых копий задается в настройках БД
+        keep = self.settings.get_db(db_path, 'backup_keep')
+        measurement = metrics.begin('auto_backup')
+        
+        def task():
+            # Копия пропускается, если отпечаток совпал с последним автобэкапом
+            backup_path = db_service.auto_backup(None, db_path, backup_dir)
+            if backup_path:
+                db_service.cleanup_old_backups(backup_dir, basename, keep)
+            return backup_path
+        
+        def on_done(backup_path):
+            measurement.finish(bytes_written=os.path.getsize(backup_path)
+                               if backup_path and os.path.exists(backup_path) else 0)
+            # Состояние снято до начала копии: изменения во время нее дадут новый бэкап
+            self.finish_auto_backup(db_path, state)
+        
+        def on_error(e):
+            measurement.finish(error=True)
+            logger.warning(f"Ошибка автобэкапа: {str(e)}")
+            self.finish_auto_backup(db_path, None)
+        
+        self._backup_running = True
+        run_in_background(self.root, task, on_done, on_error)
     
-    def cleanup_old_backups(self, basename):
-        """Удаляет старые автобэкапы"""
-        try:
-            backups = []
-            for filename in os.listdir(self.backup_dir):
-                if filename.startswith(f"{basename}_auto_") and filename.endswith('.db'):
-                    filepath = os.path.join(self.backup_dir, filename)
-                    backups.append((filepath, os.path.getmtime(filepath)))
-            
-            # Сортируем по времени изменения
-            backups.sort(key=lambda x: x[1], reverse=True)
-            
-            # Удаляем старые (оставляем 10 последних)
-            for filepath, _ in backups[10:]:
-                os.remove(filepath)
-                
-        except Exception:
-            pass
+    def finish_auto_backup(self, db_path, state):
+        """Запоминает состояние БД после автобэкапа и запускает отложенный"""
+        self._backup_running = False
+        if db_path == self.current_db and state is not None:
+            self._backup_state = state
+        if self._backup_pending:
+            self._backup_pending = False
+            self.auto_backup_database()
+    
+    def backup_state(self):
+        """Версия данных и mtime/размер файлов БД для пропуска повторного автобэкапа"""
+        if not self.connections or not self.change_monitor:
+            return None
+        return self.connections.data_version(), self.change_monitor.file_state()
     
     def restore_database(self):
         """Восстанавливает БД из резервной копии"""
@@ -601,11 +1458,11 @@ class DatabaseManager:
                                  "Текущая база данных будет заменена резервной копией.\n"
                                  "Продолжить?"):
                 try:
-                    if self.connection:
-                        self.connection.close()
-                        
                     if self.current_db:
-                        shutil.copy2(filename, self.current_db)
+                        # Копия записывается через писателя: файл БД в режиме WAL
+                        # нельзя заменить, пока его -wal держат другие соединения
+                        with metrics.measure('restore'):
+                            self.service.restore(filename)
                         self.open_database_file(self.current_db)
                     else:
                         self.open_database_file(filename)
@@ -628,16 +1485,26 @@ class DatabaseManager:
         )
         
         if filename:
-            try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    for line in self.connection.iterdump():
-                        f.write(f"{line}\n")
-                        
+            service = self.service
+            measurement = metrics.begin('export')
+            
+            # Экспорт идет через читателя и не мешает правке записей
+            def task():
+                return service.export_sql(filename)
+            
+            def on_done(result):
+                measurement.finish(rows=result, bytes_written=os.path.getsize(filename))
                 messagebox.showinfo("Успех", f"База данных экспортирована в: {filename}")
                 self.status_var.set("Экспорт завершен")
-                
-            except Exception as e:
+            
+            def on_error(e):
+                measurement.finish(error=True)
                 messagebox.showerror("Ошибка", f"Не удалось экспортировать базу данных: {str(e)}")
+                self.status_var.set("Ошибка экспорта")
+            
+            task, on_done, on_error = profiler.wrap_background('export', task, on_done, on_error)
+            self.status_var.set("Экспорт в SQL...")
+            run_in_background(self.root, task, on_done, on_error)
     
     def import_sql(self):
         """Импортирует SQL файл"""
@@ -655,12 +1522,8 @@ class DatabaseManager:
                                  "Импорт может изменить структуру и данные базы.\n"
                                  "Продолжить?"):
                 try:
-                    with open(filename, 'r', encoding='utf-8') as f:
-                        sql_script = f.read()
-                        
-                    cursor = self.connection.cursor()
-                    cursor.executescript(sql_script)
-                    self.connection.commit()
+                    with profiler.profile('import'), metrics.measure('import') as measurement:
+                        measurement.bytes = self.service.import_sql(filename)
                     
                     self.refresh_tables()
                     messagebox.showinfo("Успех", "SQL файл успешно импортирован")
@@ -678,29 +1541,167 @@ class DatabaseManager:
             messagebox.showwarning("Предупреждение", "Сначала откройте базу данных")
             return
             
-        SQLQueryDialog(self.root, self.connection)
+        get_dialog('SQLQueryDialog')(self.root, self.connection, self.connections)
+    
+    def global_search_dialog(self):
+        """Поиск строки во всех таблицах"""
+        if not self.connection:
+            messagebox.showwarning("Предупреждение", "Сначала откройте базу данных")
+            return
+        
+        get_dialog('GlobalSearchDialog')(self.root, self)
     
     def vacuum_database(self):
-        """Выполняет вакуум БД"""
+        """Вакуум БД: оценка и проверка места в фоне, затем подтверждение"""
         if not self.connection:
             messagebox.showwarning("Предупреждение", "Сначала откройте базу данных")
             return
-            
-        if messagebox.askyesno("Подтверждение", 
-                              "Выполнить вакуум базы данных?\n"
-                              "Это может занять некоторое время."):
-            try:
-                cursor = self.connection.cursor()
-                cursor.execute("VACUUM")
-                self.connection.commit()
-                messagebox.showinfo("Успех", "Вакуум базы данных выполнен")
-                self.status_var.set("Вакуум завершен")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось выполнить вакуум: {str(e)}")
+        
+        connections = self.connections
+        db_path = self.current_db
+        job = MaintenanceJob("Вакуум БД")
+        
+        def task():
+            with connections.background_writer('vacuum') as connection:
+                estimate = maintenance.estimate_vacuum(connection, job)
+            return estimate, maintenance.check_disk_space(db_path, estimate)
+        
+        def on_done(result):
+            progress.close()
+            if connections is not self.connections:
+                return
+            estimate, shortages = result
+            if shortages:
+                details = "\n".join(f"{need.path}: нужно {format_size(need.required)}, "
+                                    f"свободно {format_size(need.available)}" for need in shortages)
+                messagebox.showerror("Недостаточно места",
+                                     f"Для вакуума не хватает места на диске:\n{details}")
+                return
+            if estimate.unused_bytes is None:
+                reclaimable = f"не меньше {format_size(estimate.reclaimable)} (свободные страницы)"
+            else:
+                reclaimable = f"около {format_size(estimate.reclaimable)}"
+            if messagebox.askyesno("Подтверждение",
+                                   f"Размер БД: {format_size(estimate.page_count * estimate.page_size)}\n"
+                                   f"Освободится: {reclaimable}\n"
+                                   f"Временно нужно места: {format_size(estimate.required)}\n\n"
+                                   "Выполнить вакуум базы данных?"):
+                self.run_vacuum(estimate)
+        
+        def on_error(e):
+            progress.close()
+            if not isinstance(e, JobCancelled):
+                messagebox.showerror("Ошибка", f"Не удалось оценить вакуум: {str(e)}")
+        
+        progress = get_dialog('ProgressDialog')(self.root, job)
+        run_in_background(self.root, task, on_done, on_error)
+    
+    def run_vacuum(self, estimate):
+        """VACUUM на отдельном соединении с прогрессом и отменой"""
+        connections = self.connections
+        job = MaintenanceJob("Вакуум БД")
+        measurement = metrics.begin('vacuum')
+        
+        def task():
+            with connections.background_writer('vacuum') as connection:
+                return maintenance.vacuum(connection, job, estimate)
+        
+        def on_done(result):
+            progress.close()
+            measurement.finish(bytes_written=result.size_after)
+            if connections is not self.connections:
+                return
+            # Своя запись; rowid таблиц без INTEGER PRIMARY KEY могли измениться
+            self.change_monitor.acknowledge()
+            self.refresh_data()
+            self.status_var.set(f"Вакуум завершен, освобождено {format_size(result.reclaimed)}")
+            messagebox.showinfo("Успех", f"Вакуум базы данных выполнен\n"
+                                         f"Размер: {format_size(result.size_before)} -> "
+                                         f"{format_size(result.size_after)}\n"
+                                         f"Освобождено: {format_size(result.reclaimed)}")
+        
+        def on_error(e):
+            progress.close()
+            if isinstance(e, JobCancelled):
+                measurement.finish()
+                self.status_var.set("Вакуум отменен, БД не изменена")
+                return
+            measurement.finish(error=True)
+            messagebox.showerror("Ошибка", f"Не удалось выполнить вакуум: {str(e)}")
+        
+        # Окно модальное: во время вакуума правки ждали бы блокировки БД
+        progress = get_dialog('ProgressDialog')(self.root, job, modal=True)
+        task, on_done, on_error = profiler.wrap_background('vacuum', task, on_done, on_error)
+        run_in_background(self.root, task, on_done, on_error)
+    
+    def storage_dialog(self):
+        """Место, занимаемое таблицами и индексами"""
+        if not self.connection:
+            messagebox.showwarning("Предупреждение", "Сначала откройте базу данных")
+            return
+        
+        get_dialog('StorageDialog')(self.root, self)
+    
+    def storage_scope(self):
+        """Файл и версия данных БД для кэша анализа места"""
+        return self.current_db, self.connections.data_version()
+    
+    def performance_dialog(self):
+        """Окно статистики операций"""
+        get_dialog('PerformanceDialog')(self.root, metrics)
+    
+    def toggle_profile(self):
+        """Включает или отменяет запись профиля следующего действия"""
+        if self.profile_var.get():
+            profiler.arm()
+            self.status_var.set("Запись профиля: выполните действие (загрузка таблицы, поиск, импорт, запрос)")
+        else:
+            profiler.disarm()
+            self.status_var.set("Запись профиля отменена")
+    
+    def on_profile_saved(self, capture):
+        """Сообщает, куда сохранен профиль"""
+        self.profile_var.set(False)
+        self.status_var.set(f"Профиль сохранен: {os.path.basename(capture.prof_path)}")
+        messagebox.showinfo("Профиль сохранен",
+                           f"Действие: {capture.action}\n\n"
+                           f"Профиль: {capture.prof_path}\n"
+                           f"Отчет о памяти: {capture.report_path}")
+    
+    def active_sql_tracer(self):
+        """Трассировщик SQL, если трассировка включена в настройках"""
+        if not self.settings.get('sql_trace'):
+            return None
+        trace_file = SQL_TRACE_FILE if self.settings.get('sql_trace_file') else None
+        if sql_tracer.path != trace_file:
+            if trace_file and not os.path.exists(LOG_DIR):
+                os.makedirs(LOG_DIR)
+            sql_tracer.set_file(trace_file)
+        return sql_tracer
+    
+    def toggle_sql_trace(self):
+        """Включает или выключает трассировку SQL для открытой БД"""
+        self.settings.set('sql_trace', self.sql_trace_var.get())
+        self.settings.save()
+        self.apply_sql_trace()
+        self.status_var.set("Трассировка SQL включена" if self.sql_trace_var.get()
+                            else "Трассировка SQL выключена")
+    
+    def apply_sql_trace(self):
+        """Применяет настройки трассировки к открытым соединениям"""
+        tracer = self.active_sql_tracer()
+        if tracer is None:
+            sql_tracer.set_file(None)
+        if self.connections:
+            self.connections.set_tracer(tracer)
+    
+    def sql_trace_dialog(self):
+        """Журнал выполненных SQL запросов"""
+        get_dialog('SQLTraceDialog')(self.root, sql_tracer, self)
     
     def settings_dialog(self):
         """Диалог настроек"""
-        SettingsDialog(self.root, self)
+        get_dialog('SettingsDialog')(self.root, self)
     
     def about_dialog(self):
         """О программе"""
@@ -721,8 +1722,9 @@ class DatabaseManager:
     def run(self):
         """Запускает приложение"""
         self.root.mainloop()
-        if self.connection:
-            self.connection.close()
+        self.close_connections()
+        sql_tracer.close()
+        metrics.dump(METRICS_FILE)
 
 
 if __name__ == "__main__":
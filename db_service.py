@@ -0,0 +1,1036 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Операции с базой данных без зависимости от интерфейса (tkinter не импортируется)
+
+Модуль используется и графическим интерфейсом, и консольным режимом:
+функции уровня файла (бэкап, экспорт, импорт, вакуум) принимают соединение,
+DatabaseService объединяет построение SQL и операции с записями.
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import logging
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from db_connection import checkpoint
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.service')
+
+
+# Типизированные результаты
+ColumnInfo = namedtuple('ColumnInfo', 'cid name type notnull default pk')
+IndexInfo = namedtuple('IndexInfo', 'name columns unique')
+TableStructure = namedtuple('TableStructure', 'name sql columns indexes')
+FieldSpec = namedtuple('FieldSpec', 'name type allow_null default is_pk')
+Page = namedtuple('Page', 'rows offset has_next')
+QueryResult = namedtuple('QueryResult', 'columns rows rowcount')
+TableInfo = namedtuple('TableInfo', 'name estimated_rows size')
+SortPlan = namedtuple('SortPlan', 'temp_btree estimated_rows details')
+ColumnFilter = namedtuple('ColumnFilter', 'column operator value value2')
+# Значение, не загруженное целиком: тип ('blob' / 'text') и длина в байтах / символах
+LargeValue = namedtuple('LargeValue', 'type size')
+
+# Сколько символов длинного текста показывается в гриде
+PREVIEW_CHARS = 100
+# Текст длиннее этого открывается в редакторе только по запросу
+EDIT_TEXT_CHARS = 10000
+# Размер блока при потоковом чтении BLOB
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+# Сколько страниц файла БД хешируется для отпечатка автобэкапа
+FINGERPRINT_PAGES = 16
+
+# Минимальный размер строки на странице: указатель ячейки (2 байта), длина
+# записи и rowid (по 1 байту), заголовок записи с одной колонкой (2 байта)
+MIN_ROW_BYTES = 6
+
+# Операторы фильтра по колонке: ключ -> подпись в интерфейсе
+FILTER_OPERATORS = {
+    'eq': "=",
+    'ne': "≠",
+    'lt': "<",
+    'le': "≤",
+    'gt': ">",
+    'ge': "≥",
+    'between': "между",
+    'in': "в списке",
+    'like': "LIKE",
+    'null': "пусто",
+    'not_null': "не пусто",
+    'date_between': "даты между",
+}
+
+# Операторы без значения и с двумя значениями
+NO_VALUE_OPERATORS = ('null', 'not_null')
+RANGE_OPERATORS = ('between', 'date_between')
+
+_COMPARISONS = {'eq': '=', 'ne': '<>', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+
+def quote_identifier(name):
+    """Экранирует имя таблицы или колонки для подстановки в SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def lower_text(value):
+    """Приводит значение ячейки к нижнему регистру для поиска"""
+    if value is None:
+        return ''
+    return str(value).lower()
+
+
+def register_functions(connection):
+    """Регистрирует функции Python, используемые в генерируемом SQL"""
+    # lower() в SQLite не работает с кириллицей
+    connection.create_function('lower_text', 1, lower_text)
+
+
+def build_search_condition(column_names, search_text, mode='contains'):
+    """WHERE для поиска текста по всем колонкам"""
+    search_text = search_text.strip().lower()
+    if not search_text or not column_names:
+        return "", []
+
+    if mode == 'exact':
+        template = 'lower_text({}) = ?'
+    elif mode == 'prefix':
+        template = 'instr(lower_text({}), ?) = 1'
+    else:
+        template = 'instr(lower_text({}), ?) > 0'
+    parts = [template.format(quote_identifier(col)) for col in column_names]
+    return " WHERE " + " OR ".join(parts), [search_text] * len(parts)
+
+
+def coerce_value(value, column_type=''):
+    """Значение фильтра в тип колонки, чтобы сравнение шло по индексу"""
+    column_type = (column_type or '').upper()
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        if 'INT' in column_type:
+            return int(value)
+        if any(name in column_type for name in ('REAL', 'FLOA', 'DOUB', 'NUMERIC', 'DECIMAL')):
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def parse_date(value):
+    """Дата ГГГГ-ММ-ДД из фильтра"""
+    try:
+        return datetime.strptime(value.strip(), '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Неверная дата '{value}', ожидается ГГГГ-ММ-ДД")
+
+
+def build_filter_condition(filters, column_types=None):
+    """WHERE из фильтров по колонкам (ColumnFilter), условия объединяются через AND.
+
+    Условия записываются так, чтобы SQLite мог использовать индекс по колонке:
+    колонка слева без функций, диапазон дат - через >= и <.
+    """
+    column_types = column_types or {}
+    parts = []
+    params = []
+
+    for column_filter in filters:
+        column = quote_identifier(column_filter.column)
+        operator = column_filter.operator
+        column_type = column_types.get(column_filter.column, '')
+        value = column_filter.value
+        value2 = column_filter.value2
+
+        if operator in _COMPARISONS:
+            if value is None or str(value).strip() == '':
+                raise ValueError(f"Не указано значение для '{column_filter.column}'")
+            parts.append(f"{column} {_COMPARISONS[operator]} ?")
+            params.append(coerce_value(value, column_type))
+        elif operator == 'between':
+            low = '' if value is None else str(value).strip()
+            high = '' if value2 is None else str(value2).strip()
+            if not low and not high:
+                raise ValueError(f"Не указан диапазон для '{column_filter.column}'")
+            if low:
+                parts.append(f"{column} >= ?")
+                params.append(coerce_value(low, column_type))
+            if high:
+                parts.append(f"{column} <= ?")
+                params.append(coerce_value(high, column_type))
+        elif operator == 'date_between':
+            low = '' if value is None else str(value).strip()
+            high = '' if value2 is None else str(value2).strip()
+            if not low and not high:
+                raise ValueError(f"Не указан диапазон дат для '{column_filter.column}'")
+            # Конец диапазона включительно: значения с временем тоже попадают
+            if low:
+                parts.append(f"{column} >= ?")
+                params.append(parse_date(low).strftime('%Y-%m-%d'))
+            if high:
+                parts.append(f"{column} < ?")
+                params.append((parse_date(high) + timedelta(days=1)).strftime('%Y-%m-%d'))
+        elif operator == 'in':
+            items = [item for item in str(value or '').split(',') if item.strip()]
+            if not items:
+                raise ValueError(f"Не указан список значений для '{column_filter.column}'")
+            parts.append(f"{column} IN ({', '.join('?' for _ in items)})")
+            params.extend(coerce_value(item, column_type) for item in items)
+        elif operator == 'like':
+            if not value:
+                raise ValueError(f"Не указан шаблон для '{column_filter.column}'")
+            parts.append(f"{column} LIKE ?")
+            params.append(value)
+        elif operator == 'null':
+            parts.append(f"{column} IS NULL")
+        elif operator == 'not_null':
+            parts.append(f"{column} IS NOT NULL")
+        else:
+            raise ValueError(f"Неизвестный оператор фильтра: {operator}")
+
+    if not parts:
+        return "", []
+    return " WHERE " + " AND ".join(parts), params
+
+
+def describe_filter(column_filter):
+    """Фильтр в читаемом виде для строки состояния"""
+    operator = column_filter.operator
+    label = FILTER_OPERATORS.get(operator, operator)
+    if operator in NO_VALUE_OPERATORS:
+        return f"{column_filter.column} {label}"
+    if operator in RANGE_OPERATORS:
+        return f"{column_filter.column} {label} {column_filter.value or '…'} и {column_filter.value2 or '…'}"
+    return f"{column_filter.column} {label} {column_filter.value}"
+
+
+def combine_conditions(*conditions):
+    """Объединяет несколько (WHERE, параметры) через AND"""
+    parts = []
+    params = []
+    for where_clause, where_params in conditions:
+        where_clause = where_clause.strip()
+        if not where_clause:
+            continue
+        if where_clause.upper().startswith('WHERE '):
+            where_clause = where_clause[6:]
+        parts.append(f"({where_clause})")
+        params.extend(where_params)
+    if not parts:
+        return "", []
+    return " WHERE " + " AND ".join(parts), params
+
+
+def build_order_clause(column_name, descending=False, table_name=None):
+    """ORDER BY по одной колонке (пустая строка, если сортировки нет).
+    
+    С table_name колонка квалифицируется именем таблицы: в ORDER BY
+    псевдоним из списка выборки важнее колонки таблицы, а грид выбирает
+    сокращенные значения под теми же именами (build_preview_select) -
+    без квалификации сортировка шла бы по ним и мимо индекса.
+    """
+    if not column_name:
+        return ""
+    column = quote_identifier(column_name)
+    if table_name:
+        column = f"{quote_identifier(table_name)}.{column}"
+    return f" ORDER BY {column}{' DESC' if descending else ''}"
+
+
+def column_affinity(column_type):
+    """Тип колонки SQLite (affinity) по объявленному типу"""
+    column_type = (column_type or '').upper()
+    if 'INT' in column_type:
+        return 'INTEGER'
+    if any(name in column_type for name in ('CHAR', 'CLOB', 'TEXT')):
+        return 'TEXT'
+    if not column_type or 'BLOB' in column_type:
+        return 'BLOB'
+    if any(name in column_type for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'REAL'
+    return 'NUMERIC'
+
+
+def build_preview_select(columns, max_chars=PREVIEW_CHARS):
+    """Список колонок для грида: BLOB заменяется описанием, длинный текст обрезается.
+    
+    Значения сокращаются на стороне SQLite, в Python и в ячейки Treeview
+    попадает не больше max_chars символов. Проверяется тип каждого значения
+    (typeof), а не объявленный тип колонки: SQLite хранит текст и BLOB
+    и в колонках INTEGER / REAL, если значение не приводится к числу.
+    """
+    max_chars = int(max_chars)
+    parts = []
+    for col in columns:
+        name = quote_identifier(col.name)
+        parts.append(f"CASE typeof({name}) WHEN 'blob' THEN '[BLOB, ' || length({name}) || ' байт]' "
+                     f"WHEN 'text' THEN CASE WHEN length({name}) > {max_chars} "
+                     f"THEN substr({name}, 1, {max_chars}) || '…' ELSE {name} END "
+                     f"ELSE {name} END AS {name}")
+    return ', '.join(parts)
+
+
+def iter_blob(connection, table_name, column_name, rowid, chunk_size=BLOB_CHUNK_SIZE, offset=0):
+    """Читает BLOB блоками, не загружая значение в память целиком.
+    
+    Через Connection.blobopen (Python 3.11+), в старых версиях - через substr.
+    """
+    if hasattr(connection, 'blobopen'):
+        with connection.blobopen(table_name, column_name, rowid, readonly=True) as blob:
+            blob.seek(offset)
+            while True:
+                chunk = blob.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        return
+    
+    sql = (f"SELECT substr({quote_identifier(column_name)}, ?, ?) "
+           f"FROM {quote_identifier(table_name)} WHERE rowid = ?")
+    position = offset + 1
+    while True:
+        row = connection.execute(sql, (position, chunk_size, rowid)).fetchone()
+        if not row or not row[0]:
+            break
+        yield row[0]
+        position += len(row[0])
+
+
+def export_blob(connection, table_name, column_name, rowid, filename, chunk_size=BLOB_CHUNK_SIZE):
+    """Сохраняет значение ячейки в файл блоками, возвращает число байт"""
+    written = 0
+    with open(filename, 'wb') as f:
+        for chunk in iter_blob(connection, table_name, column_name, rowid, chunk_size):
+            f.write(chunk)
+            written += len(chunk)
+    logger.info(f"Значение {table_name}.{column_name} (rowid={rowid}) сохранено в {filename}: {written} байт")
+    return written
+
+
+def import_blob(connection, table_name, column_name, rowid, filename, chunk_size=BLOB_CHUNK_SIZE):
+    """Записывает файл в ячейку BLOB блоками, возвращает число байт.
+    
+    Место под значение выделяется через zeroblob() и заполняется через
+    Connection.blobopen, поэтому файл не загружается в память целиком.
+    Все выполняется одной транзакцией: при ошибке значение не меняется.
+    """
+    size = os.path.getsize(filename)
+    table_sql, column_sql = quote_identifier(table_name), quote_identifier(column_name)
+    with open(filename, 'rb') as f, connection:
+        if hasattr(connection, 'blobopen'):
+            cursor = connection.execute(
+                f"UPDATE {table_sql} SET {column_sql} = zeroblob(?) WHERE rowid = ?", (size, rowid))
+        else:
+            # Python < 3.11: без blobopen значение передается целиком
+            cursor = connection.execute(
+                f"UPDATE {table_sql} SET {column_sql} = ? WHERE rowid = ?", (f.read(), rowid))
+        if cursor.rowcount == 0:
+            raise ValueError(f"Запись rowid={rowid} не найдена в таблице {table_name}")
+        
+        if hasattr(connection, 'blobopen'):
+            with connection.blobopen(table_name, column_name, rowid) as blob:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    blob.write(chunk)
+    logger.info(f"Файл {filename} записан в {table_name}.{column_name} (rowid={rowid}): {size} байт")
+    return size
+
+
+def build_match_condition(column_names, values):
+    """WHERE, совпадающий с записью по значениям всех колонок"""
+    where_parts = []
+    where_values = []
+    for name, value in zip(column_names, values):
+        if value is None:
+            where_parts.append(f"{quote_identifier(name)} IS NULL")
+        else:
+            where_parts.append(f"{quote_identifier(name)} = ?")
+            where_values.append(value)
+    return " AND ".join(where_parts), where_values
+
+
+def build_create_table_sql(table_name, fields):
+    """CREATE TABLE по списку FieldSpec"""
+    primary_keys = [field.name for field in fields if field.is_pk]
+    definitions = []
+
+    for field in fields:
+        field_type = field.type.upper()
+        field_def = f'{quote_identifier(field.name)} {field_type}'
+
+        if field.is_pk:
+            # Автоинкремент только для единственного INTEGER PK
+            if field_type == 'INTEGER' and len(primary_keys) == 1:
+                field_def += " PRIMARY KEY AUTOINCREMENT"
+            elif len(primary_keys) == 1:
+                field_def += " PRIMARY KEY"
+
+        if not field.allow_null and not field.is_pk:
+            field_def += " NOT NULL"
+
+        default = '' if field.default is None else str(field.default).strip()
+        if default and default.upper() != 'NULL':
+            # Экранируем строковые значения
+            if field_type in ['TEXT', 'BLOB']:
+                field_def += " DEFAULT '{}'".format(default.replace("'", "''"))
+            else:
+                field_def += f" DEFAULT {default}"
+
+        definitions.append(field_def)
+
+    # Составной первичный ключ
+    if len(primary_keys) > 1:
+        pk_fields = ", ".join(quote_identifier(pk) for pk in primary_keys)
+        definitions.append(f"PRIMARY KEY ({pk_fields})")
+
+    return f'CREATE TABLE {quote_identifier(table_name)} ({", ".join(definitions)})'
+
+
+def estimate_row_count(connection, table_name):
+    """Оценка числа строк без COUNT(*).
+
+    Сначала берется sqlite_stat1 (если выполнялся ANALYZE): наибольшее число
+    строк среди записей таблицы - запись частичного индекса (CREATE INDEX
+    ... WHERE) учитывает только попавшие в него строки. Без статистики
+    оценка строится по диапазону rowid: min/max читаются из B-дерева за
+    O(log n) и точны для подряд выдаваемых ключей, но при явно заданных
+    разреженных ключах (хеши, случайные 64-битные id) диапазон может быть
+    сколь угодно больше числа строк. Поэтому он принимается, только если
+    столько строк вообще поместилось бы в файл БД (page_count * page_size /
+    MIN_ROW_BYTES); иначе, как и для WITHOUT ROWID без ANALYZE, - None.
+    """
+    try:
+        counts = [int(row[0].split()[0]) for row in connection.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = ?", (table_name,)) if row[0]]
+        if counts:
+            return max(counts)
+    except (sqlite3.Error, ValueError):
+        # ANALYZE не выполнялся - таблицы sqlite_stat1 нет
+        pass
+    try:
+        low, high = connection.execute(
+            f"SELECT min(rowid), max(rowid) FROM {quote_identifier(table_name)}").fetchone()
+    except sqlite3.Error:
+        # WITHOUT ROWID таблица
+        return None
+    if high is None:
+        return 0
+    estimate = high - low + 1
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    if estimate > page_count * page_size // MIN_ROW_BYTES:
+        logger.debug(f"Диапазон rowid {table_name} ({low}..{high}) больше, чем строк помещается в файл, оценки нет")
+        return None
+    return estimate
+
+
+def table_sizes(connection):
+    """Размер таблиц на диске вместе с индексами (по dbstat), {} если dbstat недоступен"""
+    try:
+        rows = connection.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+        owners = dict(connection.execute(
+            "SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')").fetchall())
+    except sqlite3.Error as e:
+        # SQLite собран без SQLITE_ENABLE_DBSTAT_VTAB
+        logger.debug("dbstat недоступен: %s", e)
+        return {}
+    sizes = {}
+    for name, size in rows:
+        # Автоиндексы (sqlite_autoindex_*) тоже есть в sqlite_master
+        table = owners.get(name, name)
+        sizes[table] = sizes.get(table, 0) + size
+    return sizes
+
+
+def database_size(connection):
+    """Размер БД в байтах по числу страниц"""
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size
+
+
+def backup_database(connection, database_path, backup_path):
+    """Резервная копия через API резервного копирования SQLite.
+    
+    Копируется согласованный снимок БД вместе с транзакциями, которые
+    еще лежат в WAL: checkpoint не нужен и не ждет открытых читателей.
+    Источник открывается отдельным соединением, поэтому функцию можно
+    вызывать из фонового потока. Копия пишется во временный файл и
+    заменяет backup_path только после успешного завершения.
+    
+    Без Connection.backup (Python < 3.7) копируется файл после checkpoint
+    через connection; если читатели не дали перенести WAL, копия была бы
+    неполной - тогда выбрасывается sqlite3.OperationalError.
+    """
+    temp_path = backup_path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    source = sqlite3.connect(database_path)
+    try:
+        if hasattr(source, 'backup'):
+            target = sqlite3.connect(temp_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        else:
+            result = checkpoint(connection or source)
+            if result is None or result[0]:
+                raise sqlite3.OperationalError(
+                    "WAL не перенесен в файл БД (заняты читателями), копия была бы неполной")
+            shutil.copy2(database_path, temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    os.replace(temp_path, backup_path)
+    logger.info(f"Резервная копия {database_path} -> {backup_path}")
+    return os.path.getsize(backup_path)
+
+
+def restore_database(connection, backup_path):
+    """Восстановление открытой БД из резервной копии через API резервного копирования.
+    
+    Страницы копии записываются через connection одной транзакцией и
+    попадают в WAL открытой БД. Копирование файла поверх БД здесь не
+    годится: оставшийся -wal (его держат читатели пула и фоновые
+    соединения) при следующем открытии досыгрывается поверх копии.
+    Читатели с открытой транзакцией дочитывают свой снимок.
+    
+    В режиме WAL размер страницы БД не меняется, а backup() требует
+    одинаковый; копия с другим размером страницы сначала перестраивается
+    во временном файле рядом с БД.
+    """
+    if not hasattr(connection, 'backup'):
+        raise sqlite3.NotSupportedError("Восстановление открытой БД требует Python 3.7+")
+    database_path = connection.execute("PRAGMA database_list").fetchone()[2]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    temp_path = None
+    source = sqlite3.connect(backup_path)
+    try:
+        if source.execute("PRAGMA page_size").fetchone()[0] != page_size:
+            temp_path = database_path + '.restore'
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            rebuilt = sqlite3.connect(temp_path)
+            try:
+                source.backup(rebuilt)
+                rebuilt.execute("PRAGMA journal_mode = DELETE")
+                rebuilt.execute(f"PRAGMA page_size = {int(page_size)}")
+                rebuilt.execute("VACUUM")
+            finally:
+                rebuilt.close()
+            source.close()
+            source = sqlite3.connect(temp_path)
+        if connection.in_transaction:
+            connection.rollback()
+        source.backup(connection)
+    finally:
+        source.close()
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+    logger.info(f"БД {database_path} восстановлена из {backup_path}")
+
+
+def vacuum_into(connection, backup_path):
+    """Сжатая копия БД через VACUUM INTO: без пустых страниц и фрагментации.
+    
+    Копия собирается во временном файле рядом с backup_path и заменяет его
+    только после успешного завершения. Основная БД не перезаписывается
+    и не блокируется монопольно, достаточно соединения только для чтения.
+    """
+    temp_path = backup_path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        connection.execute("VACUUM INTO ?", (temp_path,))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, backup_path)
+    size = os.path.getsize(backup_path)
+    logger.info(f"Сжатая копия -> {backup_path} ({size} байт)")
+    return size
+
+
+def database_fingerprint(database_path, samples=FINGERPRINT_PAGES):
+    """Дешевый отпечаток файла БД: размер, mtime и хеш выборки страниц.
+    
+    Хешируются первая страница (заголовок со счетчиком изменений и версией
+    схемы), последняя и samples страниц, равномерно распределенных по файлу:
+    десятки килобайт чтения вместо копирования всего файла.
+    
+    Зафиксированные транзакции могут оставаться в -wal, пока открытые
+    читатели не дают выполнить checkpoint, - основной файл при этом не
+    меняется. Поэтому в отпечаток входят и размер, mtime и заголовок WAL
+    (соль в заголовке меняется при каждом перезапуске журнала).
+    """
+    stat = os.stat(database_path)
+    digest = hashlib.sha1()
+    with open(database_path, 'rb') as f:
+        header = f.read(100)
+        # Размер страницы - байты 16-17 заголовка, 1 означает 65536
+        page_size = int.from_bytes(header[16:18], 'big') if len(header) >= 18 else 0
+        page_size = 65536 if page_size == 1 else (page_size or 4096)
+        page_count = max(1, -(-stat.st_size // page_size))
+        pages = {0, page_count - 1} | {i * page_count // samples for i in range(samples)}
+        for index in sorted(pages):
+            f.seek(index * page_size)
+            digest.update(f.read(page_size))
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'pages': digest.hexdigest()}
+    
+    wal_path = database_path + '-wal'
+    if os.path.exists(wal_path):
+        wal_stat = os.stat(wal_path)
+        if wal_stat.st_size:
+            with open(wal_path, 'rb') as f:
+                header = hashlib.sha1(f.read(32)).hexdigest()
+            fingerprint['wal'] = [wal_stat.st_size, wal_stat.st_mtime_ns, header]
+    return fingerprint
+
+
+def fingerprint_path(backup_path):
+    """Файл с отпечатком рядом с копией"""
+    return backup_path + '.json'
+
+
+def read_fingerprint(backup_path):
+    """Отпечаток БД, записанный при создании копии, или None"""
+    try:
+        with open(fingerprint_path(backup_path), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def latest_auto_backup(backup_dir, basename):
+    """Самый новый автобэкап БД (по имени с отметкой времени) или None"""
+    if not os.path.isdir(backup_dir):
+        return None
+    backups = sorted(filename for filename in os.listdir(backup_dir)
+                     if filename.startswith(f"{basename}_auto_") and filename.endswith('.db'))
+    return os.path.join(backup_dir, backups[-1]) if backups else None
+
+
+def auto_backup(connection, database_path, backup_dir, compact=False):
+    """Автобэкап, если БД изменилась после последней копии.
+    
+    Возвращает путь к новой копии или None, если отпечаток совпал
+    с отпечатком последнего автобэкапа и копирование пропущено.
+    С compact копия создается через VACUUM INTO (нужно соединение).
+    """
+    fingerprint = database_fingerprint(database_path)
+    basename = os.path.splitext(os.path.basename(database_path))[0]
+    latest = latest_auto_backup(backup_dir, basename)
+    if latest and read_fingerprint(latest) == fingerprint:
+        logger.info(f"БД {database_path} не изменилась после копии {latest}, автобэкап пропущен")
+        return None
+    
+    backup_path = auto_backup_path(backup_dir, database_path)
+    if compact:
+        vacuum_into(connection, backup_path)
+    else:
+        backup_database(None, database_path, backup_path)
+    with open(fingerprint_path(backup_path), 'w', encoding='utf-8') as f:
+        json.dump(fingerprint, f)
+    return backup_path
+
+
+def auto_backup_path(backup_dir, database_path):
+    """Имя файла автобэкапа с отметкой времени"""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    basename = os.path.splitext(os.path.basename(database_path))[0]
+    return os.path.join(backup_dir, f"{basename}_auto_{timestamp}.db")
+
+
+def cleanup_old_backups(backup_dir, basename, keep):
+    """Удаляет старые автобэкапы, оставляя keep последних"""
+    backups = []
+    for filename in os.listdir(backup_dir):
+        if filename.startswith(f"{basename}_auto_") and filename.endswith('.db'):
+            filepath = os.path.join(backup_dir, filename)
+            backups.append((filepath, os.path.getmtime(filepath)))
+
+    # Сортируем по времени изменения
+    backups.sort(key=lambda x: x[1], reverse=True)
+
+    removed = []
+    for filepath, _ in backups[keep:]:
+        os.remove(filepath)
+        if os.path.exists(fingerprint_path(filepath)):
+            os.remove(fingerprint_path(filepath))
+        removed.append(filepath)
+    return removed
+
+
+def export_sql(connection, filename):
+    """Экспортирует БД в SQL файл, возвращает число строк дампа"""
+    lines = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        for line in connection.iterdump():
+            f.write(f"{line}\n")
+            lines += 1
+    logger.info(f"Экспорт в {filename}: {lines} строк")
+    return lines
+
+
+def import_sql(connection, filename):
+    """Выполняет SQL скрипт из файла"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        sql_script = f.read()
+
+    cursor = connection.cursor()
+    cursor.executescript(sql_script)
+    connection.commit()
+    logger.info(f"Импортирован SQL файл {filename}")
+    return len(sql_script)
+
+
+def vacuum_database(connection):
+    """Выполняет VACUUM, возвращает размер БД до и после"""
+    size_before = database_size(connection)
+    connection.execute("VACUUM")
+    connection.commit()
+    size_after = database_size(connection)
+    logger.info(f"Вакуум: {size_before} -> {size_after} байт")
+    return size_before, size_after
+
+
+def analyze_database(connection):
+    """Обновляет статистику планировщика (ANALYZE)"""
+    connection.execute("ANALYZE")
+    connection.commit()
+    tables = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'").fetchone()[0]
+    logger.info(f"ANALYZE выполнен, таблиц: {tables}")
+    return tables
+
+
+class DatabaseService:
+    """Операции с открытой БД без привязки к интерфейсу.
+
+    Запись идет через connection, чтение - через читателя из пула
+    ConnectionManager, если он передан (методы чтения можно вызывать
+    из фоновых потоков). Быстрые запросы к схеме и планы (table_columns,
+    has_rowid, estimate_row_count, sort_plan) выполняются на connection:
+    их вызывает UI-поток, и ждать, пока фоновые задачи вернут читателя
+    в пул, он не должен.
+    """
+
+    def __init__(self, connection, connections=None):
+        self.connection = connection
+        self.connections = connections
+
+    @contextmanager
+    def reader(self):
+        """Соединение для чтения: из пула или основное"""
+        if self.connections:
+            with self.connections.reader() as connection:
+                register_functions(connection)
+                yield connection
+        else:
+            register_functions(self.connection)
+            yield self.connection
+
+    # Схема
+
+    def list_tables(self):
+        """Имена пользовательских таблиц"""
+        cursor = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+        return [row[0] for row in cursor.fetchall()]
+
+    def table_columns(self, table_name):
+        """Колонки таблицы (PRAGMA table_info)"""
+        cursor = self.connection.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+        return [ColumnInfo(*row) for row in cursor.fetchall()]
+
+    def table_structure(self, table_name):
+        """SQL создания, колонки и индексы таблицы"""
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table_name,))
+        row = cursor.fetchone()
+
+        indexes = []
+        cursor.execute(f"PRAGMA index_list({quote_identifier(table_name)})")
+        for index in cursor.fetchall():
+            index_name, unique = index[1], bool(index[2])
+            cursor.execute(f"PRAGMA index_info({quote_identifier(index_name)})")
+            indexes.append(IndexInfo(index_name, [info[2] for info in cursor.fetchall()], unique))
+
+        return TableStructure(table_name, row[0] if row else None,
+                              self.table_columns(table_name), indexes)
+
+    def create_table(self, table_name, fields):
+        """Создает таблицу, возвращает выполненный SQL"""
+        sql = build_create_table_sql(table_name, fields)
+        self.connection.execute(sql)
+        self.connection.commit()
+        logger.info(f"Создана таблица {table_name}: {sql}")
+        return sql
+
+    def drop_table(self, table_name):
+        """Удаляет таблицу"""
+        self.connection.execute(f"DROP TABLE {quote_identifier(table_name)}")
+        self.connection.commit()
+        logger.info(f"Удалена таблица {table_name}")
+
+    # Чтение данных
+
+    def iter_rows(self, table_name, where_clause="", params=(), batch_size=500):
+        """Итератор по строкам таблицы, читает порциями"""
+        sql = f"SELECT * FROM {quote_identifier(table_name)}{where_clause}"
+        with self.reader() as connection:
+            cursor = connection.execute(sql, list(params))
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+            finally:
+                cursor.close()
+
+    def has_rowid(self, table_name):
+        """Есть ли у таблицы rowid (нет у WITHOUT ROWID и представлений)"""
+        try:
+            self.connection.execute(f"SELECT rowid FROM {quote_identifier(table_name)} LIMIT 0")
+            return True
+        except sqlite3.OperationalError:
+            return False
+    
+    def fetch_page(self, table_name, where_clause="", params=(), limit=1000, offset=0, order_clause="",
+                   with_rowid=False, select_sql="*"):
+        """Страница строк таблицы.
+        
+        with_rowid - первым значением строки идет rowid, select_sql - список
+        колонок (например, build_preview_select для сокращенных значений).
+        """
+        sql = self.page_sql(table_name, where_clause, order_clause, with_rowid, select_sql)
+        with self.reader() as connection:
+            logger.debug("Выполняем запрос %s", sql)
+            cursor = connection.execute(sql, list(params) + [limit + 1, offset])
+            rows = cursor.fetchall()
+            cursor.close()
+        return Page(rows[:limit], offset, len(rows) > limit)
+
+    @staticmethod
+    def page_sql(table_name, where_clause="", order_clause="", with_rowid=False, select_sql="*"):
+        """SELECT страницы таблицы (параметры: условия, LIMIT и OFFSET)"""
+        columns_sql = f"rowid, {select_sql}" if with_rowid else select_sql
+        return (f"SELECT {columns_sql} FROM {quote_identifier(table_name)}"
+                f"{where_clause}{order_clause} LIMIT ? OFFSET ?")
+    
+    def fetch_row(self, table_name, rowid, select_sql="*"):
+        """Строка таблицы по rowid или None, если ее нет"""
+        return self.connection.execute(
+            f"SELECT {select_sql} FROM {quote_identifier(table_name)} WHERE rowid = ?", (rowid,)).fetchone()
+    
+    def fetch_row_for_edit(self, table_name, rowid, max_chars=EDIT_TEXT_CHARS):
+        """Строка для редактора: BLOB и текст длиннее max_chars заменяются на LargeValue.
+        
+        Большие значения не читаются: typeof() и length() берут тип и длину
+        из заголовка записи.
+        """
+        parts = []
+        for col in self.table_columns(table_name):
+            name = quote_identifier(col.name)
+            parts.append(f"typeof({name}), length({name}), "
+                         f"CASE WHEN typeof({name}) = 'blob' OR "
+                         f"(typeof({name}) = 'text' AND length({name}) > ?) THEN NULL ELSE {name} END")
+        row = self.connection.execute(
+            f"SELECT {', '.join(parts)} FROM {quote_identifier(table_name)} WHERE rowid = ?",
+            [max_chars] * len(parts) + [rowid]).fetchone()
+        if row is None:
+            return None
+        
+        values = []
+        for i in range(0, len(row), 3):
+            value_type, size, value = row[i:i + 3]
+            if value_type == 'blob' or (value_type == 'text' and size > max_chars):
+                values.append(LargeValue(value_type, size))
+            else:
+                values.append(value)
+        return values
+    
+    def fetch_value(self, table_name, column_name, rowid):
+        """Полное значение одной ячейки"""
+        row = self.connection.execute(
+            f"SELECT {quote_identifier(column_name)} FROM {quote_identifier(table_name)} WHERE rowid = ?",
+            (rowid,)).fetchone()
+        return row[0] if row else None
+    
+    def iter_blob(self, table_name, column_name, rowid, chunk_size=BLOB_CHUNK_SIZE, offset=0):
+        """BLOB блоками через читателя"""
+        with self.reader() as connection:
+            yield from iter_blob(connection, table_name, column_name, rowid, chunk_size, offset)
+    
+    def export_blob(self, table_name, column_name, rowid, filename):
+        """Сохраняет значение ячейки в файл через читателя"""
+        with self.reader() as connection:
+            return export_blob(connection, table_name, column_name, rowid, filename)
+    
+    def import_blob(self, table_name, column_name, rowid, filename):
+        """Загружает файл в ячейку BLOB"""
+        return import_blob(self.connection, table_name, column_name, rowid, filename)
+    
+    def read_blob(self, table_name, column_name, rowid, size, offset=0):
+        """Первые size байт BLOB (для просмотра)"""
+        chunks = self.iter_blob(table_name, column_name, rowid, size, offset)
+        try:
+            return next(chunks, b'')
+        finally:
+            chunks.close()
+    
+    def estimate_row_count(self, table_name):
+        """Быстрая оценка числа строк без COUNT(*)"""
+        return estimate_row_count(self.connection, table_name)
+
+    def count_rows(self, table_name):
+        """Точное число строк (COUNT(*) - полный проход по таблице или индексу)"""
+        with self.reader() as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM {quote_identifier(table_name)}").fetchone()[0]
+
+    def table_overview(self):
+        """Оценка числа строк и размер на диске для всех таблиц"""
+        with self.reader() as connection:
+            names = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")]
+            sizes = table_sizes(connection)
+            return [TableInfo(name, estimate_row_count(connection, name), sizes.get(name))
+                    for name in names]
+
+    def sort_plan(self, table_name, order_clause, where_clause="", params=(),
+                  with_rowid=False, select_sql="*"):
+        """План сортировки: нужен ли временный B-tree (индекс не подходит).
+        
+        План строится для того же запроса, что выполнит fetch_page
+        с этими with_rowid и select_sql.
+        
+        EXPLAIN не проверяет версию схемы: соединение могло не увидеть новый
+        индекс. Поэтому сначала выполняется сам запрос с LIMIT 0 (соединение
+        перечитывает схему), а в текст EXPLAIN входит schema_version, чтобы
+        не взять из кэша операторов план, подготовленный для старой схемы.
+        """
+        sql = self.page_sql(table_name, where_clause, order_clause, with_rowid, select_sql)
+        connection = self.connection
+        register_functions(connection)
+        connection.execute(sql, list(params) + [0, 0]).fetchall()
+        version = connection.execute("PRAGMA schema_version").fetchone()[0]
+        details = [row[-1] for row in connection.execute(
+            f"EXPLAIN QUERY PLAN /* schema {version} */ {sql}", list(params) + [1, 0]).fetchall()]
+        temp_btree = any('TEMP B-TREE' in detail and 'ORDER BY' in detail for detail in details)
+        logger.debug("План сортировки %s%s: %s", table_name, order_clause, details)
+        return SortPlan(temp_btree, self.estimate_row_count(table_name) if temp_btree else None, details)
+
+    def execute_query(self, sql, read_only=False):
+        """Выполняет произвольный запрос.
+
+        При read_only запрос идет через читателя и не фиксирует транзакцию.
+        """
+        if read_only:
+            with self.reader() as connection:
+                cursor = connection.execute(sql)
+                columns = [d[0] for d in cursor.description] if cursor.description else []
+                rows = cursor.fetchall() if columns else []
+                cursor.close()
+            return QueryResult(columns, rows, len(rows))
+
+        cursor = self.connection.execute(sql)
+        columns = [d[0] for d in cursor.description] if cursor.description else []
+        rows = cursor.fetchall() if columns else []
+        self.connection.commit()
+        return QueryResult(columns, rows, cursor.rowcount)
+
+    # Операции с записями
+
+    def insert_record(self, table_name, values):
+        """Добавляет запись (values: имя колонки -> значение), возвращает rowid"""
+        names = list(values)
+        placeholders = ', '.join(['?' for _ in names])
+        columns_sql = ', '.join(quote_identifier(name) for name in names)
+        cursor = self.connection.execute(
+            f"INSERT INTO {quote_identifier(table_name)} ({columns_sql}) VALUES ({placeholders})",
+            [values[name] for name in names])
+        self.connection.commit()
+        return cursor.lastrowid
+
+    def update_record(self, table_name, original_values, values):
+        """Изменяет запись, найденную по значениям всех колонок"""
+        column_names = [col.name for col in self.table_columns(table_name)]
+        names = list(values)
+        set_sql = ', '.join(f"{quote_identifier(name)} = ?" for name in names)
+        where_clause, where_values = build_match_condition(column_names, original_values)
+        cursor = self.connection.execute(
+            f"UPDATE {quote_identifier(table_name)} SET {set_sql} WHERE {where_clause}",
+            [values[name] for name in names] + where_values)
+        self.connection.commit()
+        return cursor.rowcount
+
+    def delete_record(self, table_name, original_values):
+        """Удаляет запись, найденную по значениям всех колонок"""
+        column_names = [col.name for col in self.table_columns(table_name)]
+        where_clause, where_values = build_match_condition(column_names, original_values)
+        cursor = self.connection.execute(
+            f"DELETE FROM {quote_identifier(table_name)} WHERE {where_clause}", where_values)
+        self.connection.commit()
+        return cursor.rowcount
+    
+    def update_record_by_rowid(self, table_name, rowid, values):
+        """Изменяет запись по rowid (поиск по первичному ключу, без сравнения всех колонок)"""
+        names = list(values)
+        if not names:
+            return 0
+        set_sql = ', '.join(f"{quote_identifier(name)} = ?" for name in names)
+        cursor = self.connection.execute(
+            f"UPDATE {quote_identifier(table_name)} SET {set_sql} WHERE rowid = ?",
+            [values[name] for name in names] + [rowid])
+        self.connection.commit()
+        return cursor.rowcount
+    
+    def delete_records_by_rowid(self, table_name, rowids):
+        """Удаляет записи по rowid одной транзакцией, возвращает число удаленных"""
+        deleted = 0
+        with self.connection:
+            for rowid in rowids:
+                deleted += self.connection.execute(
+                    f"DELETE FROM {quote_identifier(table_name)} WHERE rowid = ?", (rowid,)).rowcount
+        return deleted
+
+    # Операции с файлом БД
+
+    def backup(self, database_path, backup_path):
+        return backup_database(self.connection, database_path, backup_path)
+    
+    def restore(self, backup_path):
+        return restore_database(self.connection, backup_path)
+    
+    def auto_backup(self, database_path, backup_dir, compact=False):
+        return auto_backup(self.connection, database_path, backup_dir, compact)
+    
+    def compact_backup(self, backup_path):
+        return vacuum_into(self.connection, backup_path)
+
+    def export_sql(self, filename):
+        with self.reader() as connection:
+            return export_sql(connection, filename)
+
+    def import_sql(self, filename):
+        return import_sql(self.connection, filename)
+
+    def vacuum(self):
+        return vacuum_database(self.connection)
+
+    def analyze(self):
+        return analyze_database(self.connection)
@@ -10,13 +10,29 @@ import sqlite3
 import logging
 import traceback
 
+from db_connection import PRAGMA_PROFILES, PROFILE_DESCRIPTIONS
+from settings_store import SEARCH_MODES
+from db_service import DatabaseService, FieldSpec, LargeValue, build_create_table_sql
+from log_utils import LOG_LEVELS, set_log_level, format_count, format_size, format_hex_dump
+from background import run_in_background
+from metrics import metrics
+from profiling import profiler
+from query_cache import query_cache
+from global_search import GlobalSearch, DEFAULT_HIT_LIMIT
+from maintenance import MaintenanceJob, JobCancelled, analyze_storage
+from sql_trace import entry_suffix
+
 # Получаем логгер
 logger = logging.getLogger('db_manager.dialogs')
 
+# Сколько байт BLOB показывается при просмотре
+BLOB_PREVIEW_BYTES = 4096
+
 
 class TableStructureDialog:
     def __init__(self, parent, connection, table_name):
         self.connection = connection
+        self.service = DatabaseService(connection)
         self.table_name = table_name
         
         self.dialog = tk.Toplevel(parent)
@@ -63,38 +79,26 @@ class TableStructureDialog:
     
     def load_structure(self):
         try:
-            cursor = self.connection.cursor()
+            structure = self.service.table_structure(self.table_name)
             
             # Информация о таблице
-            cursor.execute(f"SELECT sql FROM sqlite_master WHERE name='{self.table_name}'")
-            sql = cursor.fetchone()
-            if sql:
-                self.info_text.insert(tk.END, f"CREATE TABLE:\n{sql[0]}")
+            if structure.sql:
+                self.info_text.insert(tk.END, f"CREATE TABLE:\n{structure.sql}")
             
             # Поля таблицы
-            cursor.execute(f"PRAGMA table_info({self.table_name})")
-            columns = cursor.fetchall()
-            
-            for col in columns:
-                cid, name, col_type, notnull, default, pk = col
-                null_text = "NO" if notnull else "YES"
-                pk_text = "YES" if pk else "NO"
-                default_text = str(default) if default is not None else ""
+            for col in structure.columns:
+                null_text = "NO" if col.notnull else "YES"
+                pk_text = "YES" if col.pk else "NO"
+                default_text = str(col.default) if col.default is not None else ""
                 
-                self.fields_tree.insert('', 'end', text=name,
-                                      values=(col_type, null_text, default_text, pk_text))
+                self.fields_tree.insert('', 'end', text=col.name,
+                                      values=(col.type, null_text, default_text, pk_text))
             
             # Индексы
-            cursor.execute(f"PRAGMA index_list({self.table_name})")
-            indexes = cursor.fetchall()
-            
-            if indexes:
-                for index in indexes:
-                    cursor.execute(f"PRAGMA index_info({index[1]})")
-                    index_info = cursor.fetchall()
-                    columns_list = [info[2] for info in index_info]
+            if structure.indexes:
+                for index in structure.indexes:
                     self.indexes_text.insert(tk.END, 
-                                           f"{index[1]}: {', '.join(columns_list)}\n")
+                                           f"{index.name}: {', '.join(index.columns)}\n")
             else:
                 self.indexes_text.insert(tk.END, "Индексы не найдены")
                 
@@ -103,10 +107,15 @@ class TableStructureDialog:
 
 
 class EditRecordDialog:
-    def __init__(self, parent, connection, table_name, values=None):
+    def __init__(self, parent, connection, table_name, values=None, rowid=None):
         self.connection = connection
+        self.service = DatabaseService(connection)
         self.table_name = table_name
         self.original_values = values
+        # rowid редактируемой записи; после сохранения - rowid добавленной записи
+        self.rowid = rowid
+        # Колонки с незагруженными значениями (LargeValue) при сохранении не меняются
+        self.large_fields = set()
         self.result = False
         
         self.dialog = tk.Toplevel(parent)
@@ -151,9 +160,7 @@ class EditRecordDialog:
     
     def load_fields(self):
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(f"PRAGMA table_info({self.table_name})")
-            columns = cursor.fetchall()
+            columns = self.service.table_columns(self.table_name)
             
             for i, col in enumerate(columns):
                 cid, name, col_type, notnull, default, pk = col
@@ -172,14 +179,19 @@ class EditRecordDialog:
                 
                 # Поле ввода
                 var = tk.StringVar()
+                large_value = None
                 
                 # Заполняем существующими значениями
                 if self.original_values and i < len(self.original_values):
                     value = self.original_values[i]
-                    if value is not None:
+                    if isinstance(value, LargeValue):
+                        large_value = value
+                    elif value is not None:
                         var.set(str(value))
                 
-                if col_type.upper() in ['TEXT', 'BLOB']:
+                if large_value:
+                    self.add_large_field(row_frame, name, large_value)
+                elif col_type.upper() in ['TEXT', 'BLOB']:
                     entry = tk.Text(row_frame, height=3, width=30)
                     entry.insert('1.0', var.get())
                     entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
@@ -196,21 +208,67 @@ class EditRecordDialog:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось загрузить поля: {str(e)}")
     
+    def add_large_field(self, row_frame, name, large_value):
+        """Поле с BLOB или длинным текстом: значение читается только по кнопке"""
+        self.large_fields.add(name)
+        holder = ttk.Frame(row_frame)
+        holder.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        
+        if large_value.type == 'blob':
+            ttk.Label(holder, text=f"BLOB, {format_size(large_value.size)}",
+                      foreground='gray').pack(side=tk.LEFT)
+            ttk.Button(holder, text="Просмотр",
+                       command=lambda: self.show_blob(name)).pack(side=tk.LEFT, padx=2)
+        else:
+            ttk.Label(holder, text=f"Текст, {format_count(large_value.size)} симв.",
+                      foreground='gray').pack(side=tk.LEFT)
+            ttk.Button(holder, text="Открыть полностью",
+                       command=lambda: self.open_full_text(holder, name)).pack(side=tk.LEFT, padx=2)
+    
+    def open_full_text(self, holder, name):
+        """Загружает длинный текст в поле редактирования"""
+        try:
+            value = self.service.fetch_value(self.table_name, name, self.rowid)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить значение: {str(e)}")
+            return
+        
+        for child in holder.winfo_children():
+            child.destroy()
+        entry = tk.Text(holder, height=3, width=30)
+        entry.insert('1.0', value or '')
+        entry.pack(fill=tk.X, expand=True)
+        self.field_vars[name] = ('text', entry)
+        self.large_fields.discard(name)
+    
+    def show_blob(self, name):
+        """Начало BLOB в шестнадцатеричном виде (читается не больше BLOB_PREVIEW_BYTES)"""
+        try:
+            data = self.service.read_blob(self.table_name, name, self.rowid, BLOB_PREVIEW_BYTES)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать BLOB: {str(e)}")
+            return
+        
+        window = tk.Toplevel(self.dialog)
+        window.title(f"{self.table_name}.{name} - первые {format_size(len(data))}")
+        window.geometry("640x400")
+        text = scrolledtext.ScrolledText(window, font=('Courier', 9), wrap=tk.NONE)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.insert('1.0', format_hex_dump(data))
+        text.config(state=tk.DISABLED)
+    
     def save_record(self):
         try:
             # Получаем значения полей
-            values = []
-            field_names = []
-            
-            cursor = self.connection.cursor()
-            cursor.execute(f"PRAGMA table_info({self.table_name})")
-            columns = cursor.fetchall()
+            values = {}
             
-            for col in columns:
-                name = col[1]
-                field_names.append(name)
+            for col in self.service.table_columns(self.table_name):
+                name = col.name
                 
-                if name in self.field_vars:
+                if name in self.large_fields:
+                    # Значение не загружалось - оставляем как есть
+                    continue
+                elif name in self.field_vars:
                     field_type, widget = self.field_vars[name]
                     if field_type == 'text':
                         value = widget.get('1.0', tk.END).strip()
@@ -218,39 +276,23 @@ class EditRecordDialog:
                         value = widget.get().strip()
                     
                     # Обработка пустых значений
-                    if not value:
-                        values.append(None)
-                    else:
-                        values.append(value)
+                    values[name] = value if value else None
                 else:
-                    values.append(None)
+                    values[name] = None
             
             # Выполняем INSERT или UPDATE
             if self.original_values:  # Редактирование
-                # Формируем UPDATE запрос
-                set_parts = []
-                for i, name in enumerate(field_names):
-                    set_parts.append(f"{name} = ?")
-                
-                # WHERE условие по всем полям оригинальной записи
-                where_parts = []
-                where_values = []
-                for i, (name, orig_val) in enumerate(zip(field_names, self.original_values)):
-                    if orig_val is None:
-                        where_parts.append(f"{name} IS NULL")
+                with metrics.measure('edit_record') as measurement:
+                    if self.rowid is not None:
+                        measurement.rows = self.service.update_record_by_rowid(self.table_name, self.rowid, values)
                     else:
-                        where_parts.append(f"{name} = ?")
-                        where_values.append(orig_val)
-                
-                sql = f"UPDATE {self.table_name} SET {', '.join(set_parts)} WHERE {' AND '.join(where_parts)}"
-                cursor.execute(sql, values + where_values)
-                
+                        # Без rowid запись ищется по всем полям оригинальной записи
+                        measurement.rows = self.service.update_record(self.table_name, self.original_values, values)
             else:  # Добавление
-                placeholders = ', '.join(['?' for _ in values])
-                sql = f"INSERT INTO {self.table_name} ({', '.join(field_names)}) VALUES ({placeholders})"
-                cursor.execute(sql, values)
+                with metrics.measure('add_record') as measurement:
+                    self.rowid = self.service.insert_record(self.table_name, values)
+                    measurement.rows = 1
             
-            self.connection.commit()
             self.result = True
             self.dialog.destroy()
             
@@ -259,8 +301,11 @@ class EditRecordDialog:
 
 
 class SQLQueryDialog:
-    def __init__(self, parent, connection):
+    def __init__(self, parent, connection, connections=None):
         self.connection = connection
+        # Пул читателей: SELECT выполняются в фоне и не мешают записи
+        self.connections = connections
+        self.service = DatabaseService(connection, connections)
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("SQL запрос")
@@ -321,42 +366,27 @@ class SQLQueryDialog:
             messagebox.showwarning("Предупреждение", "Введите SQL запрос")
             return
         
+        # Очищаем предыдущий результат
+        for item in self.result_tree.get_children():
+            self.result_tree.delete(item)
+        
+        is_select = query.upper().strip().startswith('SELECT')
+        if is_select and self.connections:
+            self.execute_select_in_background(query)
+            return
+        
         try:
-            cursor = self.connection.cursor()
-            
-            # Очищаем предыдущий результат
-            for item in self.result_tree.get_children():
-                self.result_tree.delete(item)
-            
             # Выполняем запрос
-            cursor.execute(query)
+            with profiler.profile('query'), metrics.measure('query') as measurement:
+                result = self.service.execute_query(query)
+                measurement.rows = len(result.rows) if is_select else max(result.rowcount, 0)
             
             # Если это SELECT запрос
-            if query.upper().strip().startswith('SELECT'):
-                # Получаем описание колонок
-                columns = [description[0] for description in cursor.description] if cursor.description else []
-                
-                if columns:
-                    # Настраиваем колонки
-                    self.result_tree['columns'] = columns
-                    self.result_tree['show'] = 'headings'
-                    
-                    for col in columns:
-                        self.result_tree.heading(col, text=col)
-                        self.result_tree.column(col, width=100)
-                    
-                    # Загружаем данные
-                    rows = cursor.fetchall()
-                    for row in rows:
-                        self.result_tree.insert('', 'end', values=row)
-                    
-                    self.status_var.set(f"Найдено записей: {len(rows)}")
-                else:
-                    self.status_var.set("Запрос выполнен, данных нет")
+            if is_select:
+                self.show_result(result.columns, result.rows)
             else:
                 # Для других запросов (INSERT, UPDATE, DELETE)
-                self.connection.commit()
-                affected_rows = cursor.rowcount
+                affected_rows = result.rowcount
                 self.status_var.set(f"Запрос выполнен. Затронуто строк: {affected_rows}")
                 
                 # Очищаем отображение колонок
@@ -364,8 +394,65 @@ class SQLQueryDialog:
                 self.result_tree['show'] = 'tree'
                 
         except Exception as e:
-            messagebox.showerror("Ошибка SQL", f"Ошибка выполнения запроса:\n{str(e)}")
-            self.status_var.set(f"Ошибка: {str(e)}")
+            self.show_error(e)
+    
+    def cache_scope(self):
+        """Файл и версия данных БД для кэша результатов"""
+        return self.connections.filename, self.connections.data_version()
+    
+    def execute_select_in_background(self, query):
+        """Выполняет SELECT на соединении только для чтения (повторные - из кэша)"""
+        service = self.service
+        measurement = metrics.begin('query')
+        
+        cached = query_cache.get(self.cache_scope(), query)
+        if cached is not None:
+            measurement.finish(rows=len(cached.rows))
+            self.show_result(cached.columns, cached.rows)
+            self.status_var.set(f"Найдено записей: {len(cached.rows)} (из кэша)")
+            return
+        
+        def task():
+            return service.execute_query(query, read_only=True)
+        
+        def on_done(result):
+            measurement.finish(rows=len(result.rows))
+            query_cache.put(self.cache_scope(), query, (), result)
+            if self.dialog.winfo_exists():
+                self.show_result(result.columns, result.rows)
+        
+        def on_error(e):
+            measurement.finish(error=True)
+            if self.dialog.winfo_exists():
+                self.show_error(e)
+        
+        task, on_done, on_error = profiler.wrap_background('query', task, on_done, on_error)
+        self.status_var.set("Выполняется запрос...")
+        run_in_background(self.dialog, task, on_done, on_error)
+    
+    def show_result(self, columns, rows):
+        """Отображает результат SELECT"""
+        if columns:
+            # Настраиваем колонки
+            self.result_tree['columns'] = columns
+            self.result_tree['show'] = 'headings'
+            
+            for col in columns:
+                self.result_tree.heading(col, text=col)
+                self.result_tree.column(col, width=100)
+            
+            # Загружаем данные
+            for row in rows:
+                self.result_tree.insert('', 'end', values=row)
+            
+            self.status_var.set(f"Найдено записей: {len(rows)}")
+        else:
+            self.status_var.set("Запрос выполнен, данных нет")
+    
+    def show_error(self, e):
+        """Показывает ошибку выполнения запроса"""
+        messagebox.showerror("Ошибка SQL", f"Ошибка выполнения запроса:\n{str(e)}")
+        self.status_var.set(f"Ошибка: {str(e)}")
     
     def clear_query(self):
         self.query_text.delete('1.0', tk.END)
@@ -408,13 +495,521 @@ class SQLQueryDialog:
             messagebox.showerror("Ошибка", f"Не удалось сохранить результат: {str(e)}")
 
 
+class PerformanceDialog:
+    """Статистика операций: число вызовов, время p50/p95, строки и байты"""
+    
+    COLUMNS = (
+        ('name', "Операция", 140),
+        ('calls', "Вызовов", 70),
+        ('errors', "Ошибок", 60),
+        ('p50', "p50, мс", 80),
+        ('p95', "p95, мс", 80),
+        ('max', "Макс, мс", 80),
+        ('total', "Всего, с", 80),
+        ('rows', "Строк", 90),
+        ('bytes', "Байт", 110),
+    )
+    REFRESH_MS = 1000
+    
+    def __init__(self, parent, registry):
+        self.registry = registry
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Производительность")
+        self.dialog.geometry("850x400")
+        self.dialog.transient(parent)
+        
+        self.setup_ui()
+        self.auto_refresh()
+        
+    def setup_ui(self):
+        # Панель инструментов
+        toolbar = ttk.Frame(self.dialog)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(toolbar, text="Обновить", command=self.refresh).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Сбросить", command=self.reset).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Сохранить JSON", command=self.save_json).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Закрыть", command=self.dialog.destroy).pack(side=tk.RIGHT, padx=2)
+        
+        # Таблица статистики
+        self.stats_tree = ttk.Treeview(self.dialog, columns=[c[0] for c in self.COLUMNS], show='headings')
+        for name, title, width in self.COLUMNS:
+            self.stats_tree.heading(name, text=title)
+            self.stats_tree.column(name, width=width, anchor=tk.W if name == 'name' else tk.E)
+        self.stats_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.dialog, textvariable=self.status_var).pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+    
+    def auto_refresh(self):
+        """Пока окно открыто, статистика обновляется раз в секунду"""
+        if self.dialog.winfo_exists():
+            self.refresh()
+            self.dialog.after(self.REFRESH_MS, self.auto_refresh)
+    
+    def refresh(self):
+        """Перечитывает статистику"""
+        for item in self.stats_tree.get_children():
+            self.stats_tree.delete(item)
+        
+        summary = self.registry.summary()
+        for op in summary:
+            self.stats_tree.insert('', 'end', values=(
+                op.name, op.calls, op.errors,
+                f"{op.p50 * 1000:.1f}", f"{op.p95 * 1000:.1f}", f"{op.max * 1000:.1f}",
+                f"{op.total:.2f}", format_count(op.rows), format_count(op.bytes)))
+        
+        started = self.registry.started.strftime('%H:%M:%S')
+        self.status_var.set(f"Операций: {len(summary)}, статистика с {started}")
+    
+    def reset(self):
+        self.registry.reset()
+        self.refresh()
+    
+    def save_json(self):
+        from tkinter import filedialog
+        filename = filedialog.asksaveasfilename(
+            title="Сохранить статистику",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if filename:
+            if self.registry.dump(filename):
+                messagebox.showinfo("Успех", f"Статистика сохранена в: {filename}")
+            else:
+                messagebox.showwarning("Предупреждение", "Нет данных для сохранения")
+
+
+class SQLTraceDialog:
+    """Журнал SQL: последние запросы и группы одинаковых по форме запросов"""
+    
+    MAX_LOG_ROWS = 1000
+    
+    def __init__(self, parent, tracer, main_app):
+        self.tracer = tracer
+        self.main_app = main_app
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Журнал SQL")
+        self.dialog.geometry("900x500")
+        self.dialog.transient(parent)
+        
+        self.setup_ui()
+        self.refresh()
+        
+    def setup_ui(self):
+        # Панель инструментов
+        toolbar = ttk.Frame(self.dialog)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(toolbar, text="Обновить", command=self.refresh).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Очистить", command=self.clear).pack(side=tk.LEFT, padx=2)
+        self.file_var = tk.BooleanVar(value=self.main_app.settings.get('sql_trace_file'))
+        ttk.Checkbutton(toolbar, text="Записывать в logs/sql_trace.log", variable=self.file_var,
+                       command=self.toggle_file).pack(side=tk.LEFT, padx=10)
+        ttk.Button(toolbar, text="Закрыть", command=self.dialog.destroy).pack(side=tk.RIGHT, padx=2)
+        
+        notebook = ttk.Notebook(self.dialog)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Группы запросов одинаковой формы
+        shapes_frame = ttk.Frame(notebook)
+        notebook.add(shapes_frame, text="По форме запроса")
+        self.shapes_tree = self.create_tree(shapes_frame, (
+            ('count', "Выполнений", 90), ('total', "Всего, мс", 90),
+            ('avg', "Среднее, мс", 90), ('max', "Макс, мс", 90), ('sql', "Запрос", 500)))
+        
+        # Последние запросы
+        log_frame = ttk.Frame(notebook)
+        notebook.add(log_frame, text="Последние запросы")
+        self.log_tree = self.create_tree(log_frame, (
+            ('time', "Время", 100), ('connection', "Соединение", 90),
+            ('ms', "мс", 70), ('sql', "Запрос", 600)))
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.dialog, textvariable=self.status_var).pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+    
+    def create_tree(self, parent, columns):
+        tree = ttk.Treeview(parent, columns=[c[0] for c in columns], show='headings')
+        for name, title, width in columns:
+            tree.heading(name, text=title)
+            tree.column(name, width=width, anchor=tk.W if name == 'sql' else tk.E)
+        v_scroll = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=v_scroll.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+    
+    def refresh(self):
+        for tree in (self.shapes_tree, self.log_tree):
+            for item in tree.get_children():
+                tree.delete(item)
+        
+        for group in self.tracer.summary():
+            self.shapes_tree.insert('', 'end', values=(
+                group.count, f"{group.total * 1000:.1f}",
+                f"{group.total * 1000 / group.count:.2f}", f"{group.max * 1000:.1f}", group.shape))
+        
+        entries = self.tracer.recent()
+        for entry in reversed(entries[-self.MAX_LOG_ROWS:]):
+            self.log_tree.insert('', 'end', values=(
+                entry.timestamp.strftime('%H:%M:%S.%f')[:-3], entry.connection,
+                f"{entry.seconds * 1000:.2f}", " ".join(entry.sql.split()) + entry_suffix(entry)))
+        
+        if self.main_app.settings.get('sql_trace'):
+            self.status_var.set(f"Запросов в журнале: {len(entries)}")
+        else:
+            self.status_var.set(f"Запросов в журнале: {len(entries)}. "
+                                "Трассировка выключена (Инструменты -> Трассировка SQL)")
+    
+    def clear(self):
+        self.tracer.clear()
+        self.refresh()
+    
+    def toggle_file(self):
+        self.main_app.settings.set('sql_trace_file', self.file_var.get())
+        self.main_app.settings.save()
+        self.main_app.apply_sql_trace()
+
+
+class GlobalSearchDialog:
+    """Поиск по всем таблицам: совпадения появляются по мере нахождения"""
+    
+    POLL_MS = 100
+    
+    def __init__(self, parent, main_app):
+        self.main_app = main_app
+        self.search = None
+        self.search_term = ''
+        self.hits = {}
+        self.measurement = None
+        self._poll_id = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Поиск по всей базе данных")
+        self.dialog.geometry("800x500")
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.setup_ui()
+        
+    def setup_ui(self):
+        toolbar = ttk.Frame(self.dialog)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(toolbar, text="Искать:").pack(side=tk.LEFT, padx=2)
+        self.term_var = tk.StringVar()
+        entry = ttk.Entry(toolbar, textvariable=self.term_var, width=40)
+        entry.pack(side=tk.LEFT, padx=2)
+        entry.bind('<Return>', lambda e: self.start())
+        entry.focus_set()
+        ttk.Button(toolbar, text="Найти", command=self.start).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Стоп", command=self.stop).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Закрыть", command=self.close).pack(side=tk.RIGHT, padx=2)
+        
+        result_frame = ttk.Frame(self.dialog)
+        result_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        columns = (('table', "Таблица", 150), ('rowid', "rowid", 80),
+                   ('column', "Колонка", 120), ('snippet', "Фрагмент", 420))
+        self.result_tree = ttk.Treeview(result_frame, columns=[c[0] for c in columns], show='headings')
+        for name, title, width in columns:
+            self.result_tree.heading(name, text=title)
+            self.result_tree.column(name, width=width, anchor=tk.E if name == 'rowid' else tk.W)
+        v_scroll = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.result_tree.yview)
+        self.result_tree.configure(yscrollcommand=v_scroll.set)
+        self.result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.result_tree.bind('<Double-1>', self.open_hit)
+        
+        self.status_var = tk.StringVar()
+        self.status_var.set(f"Двойной щелчок открывает строку. Предел: {format_count(DEFAULT_HIT_LIMIT)} совпадений")
+        ttk.Label(self.dialog, textvariable=self.status_var).pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+    
+    def start(self):
+        """Запускает новый поиск, предыдущий останавливается"""
+        term = self.term_var.get().strip()
+        if not term:
+            return
+        if not self.main_app.connections:
+            messagebox.showwarning("Предупреждение", "Сначала откройте базу данных")
+            return
+        
+        self.stop()
+        self.finish_measurement()
+        for item in self.result_tree.get_children():
+            self.result_tree.delete(item)
+        self.hits = {}
+        
+        self.search_term = term
+        self.search = GlobalSearch(self.main_app.connections, term)
+        self.measurement = metrics.begin('global_search')
+        try:
+            self.search.start()
+        except Exception as e:
+            self.measurement.finish(error=True)
+            self.measurement = None
+            messagebox.showerror("Ошибка", f"Не удалось начать поиск: {str(e)}")
+            self.search = None
+            return
+        self.poll()
+    
+    def poll(self):
+        """Переносит найденные совпадения в таблицу результатов"""
+        self._poll_id = None
+        search = self.search
+        if not search or not self.dialog.winfo_exists():
+            return
+        
+        for hit in search.take():
+            item = self.result_tree.insert('', 'end', values=(
+                hit.table, '' if hit.rowid is None else hit.rowid, hit.column, hit.snippet))
+            self.hits[item] = hit
+        
+        status = (f"Найдено: {format_count(len(self.hits))}, "
+                  f"таблиц просмотрено: {search.tables_done} из {len(search.tables)}")
+        if search.done and not search.take(1):
+            self.finish_measurement()
+            if search.hit_count >= search.limit:
+                status += " - достигнут предел совпадений"
+            elif search.stopped:
+                status += " - остановлено"
+            if search.errors:
+                status += f", ошибок: {len(search.errors)}"
+            self.status_var.set(status)
+            self.search = None
+            return
+        
+        self.status_var.set(status + "...")
+        self._poll_id = self.dialog.after(self.POLL_MS, self.poll)
+    
+    def stop(self):
+        if self.search:
+            self.search.cancel()
+    
+    def finish_measurement(self):
+        """Фиксирует замер поиска с числом найденных совпадений (в том числе прерванного)"""
+        if self.measurement:
+            self.measurement.finish(rows=len(self.hits))
+            self.measurement = None
+    
+    def open_hit(self, event):
+        """Открывает таблицу с найденной строкой в главном окне"""
+        selection = self.result_tree.selection()
+        if selection and selection[0] in self.hits:
+            self.main_app.show_search_hit(self.hits[selection[0]], self.search_term)
+    
+    def close(self):
+        self.stop()
+        self.finish_measurement()
+        if self._poll_id:
+            self.dialog.after_cancel(self._poll_id)
+        self.dialog.destroy()
+
+
+class ProgressDialog:
+    """Прогресс долгой операции обслуживания (MaintenanceJob) с кнопкой отмены.
+    
+    Операция выполняется в фоне, окно только опрашивает job.progress;
+    по завершении операции вызывающий код закрывает окно через close().
+    """
+    
+    POLL_MS = 200
+    
+    def __init__(self, parent, job, modal=False):
+        self.job = job
+        self._poll_id = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title(job.title)
+        self.dialog.geometry("420x130")
+        self.dialog.resizable(False, False)
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        self.status_var = tk.StringVar(value=job.status)
+        ttk.Label(self.dialog, textvariable=self.status_var).pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.progress_bar = ttk.Progressbar(self.dialog, mode='determinate', maximum=100)
+        self.progress_bar.pack(fill=tk.X, padx=10, pady=5)
+        self.cancel_button = ttk.Button(self.dialog, text="Отмена", command=self.cancel)
+        self.cancel_button.pack(pady=5)
+        if modal:
+            self.dialog.grab_set()
+        
+        self.poll()
+    
+    def poll(self):
+        """Обновляет полосу прогресса"""
+        percent = int(self.job.progress * 100)
+        self.progress_bar['value'] = percent
+        if not self.job.cancelled:
+            self.status_var.set(f"{self.job.status} - {percent}%")
+        self._poll_id = self.dialog.after(self.POLL_MS, self.poll)
+    
+    def cancel(self):
+        """Запрашивает отмену, окно закроется после остановки операции"""
+        self.job.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_var.set("Отмена...")
+    
+    def close(self):
+        if self._poll_id:
+            self.dialog.after_cancel(self._poll_id)
+            self._poll_id = None
+        self.dialog.destroy()
+
+
+class StorageDialog:
+    """Анализ места: страницы, данные, служебные байты, пустое место и
+    фрагментация каждой таблицы и индекса.
+    
+    Проход по всем страницам выполняется в фоне один раз; результат
+    хранится в main_app.storage_report до изменения данных БД.
+    """
+    
+    COLUMNS = (
+        ('name', "Объект", 180),
+        ('type', "Тип", 70),
+        ('table', "Таблица", 140),
+        ('pages', "Страниц", 80),
+        ('size', "Размер", 90),
+        ('payload', "Данные", 90),
+        ('overhead', "Служебные", 90),
+        ('unused', "Пусто", 90),
+        ('fragmentation', "Фрагм., %", 80),
+    )
+    TYPE_NAMES = {'table': "таблица", 'index': "индекс"}
+    POLL_MS = 200
+    
+    def __init__(self, parent, main_app):
+        self.main_app = main_app
+        self.job = None
+        self._poll_id = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Анализ места")
+        self.dialog.geometry("950x500")
+        self.dialog.transient(parent)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.setup_ui()
+        self.load()
+        
+    def setup_ui(self):
+        toolbar = ttk.Frame(self.dialog)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(toolbar, text="Обновить", command=lambda: self.load(force=True)).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="Закрыть", command=self.close).pack(side=tk.RIGHT, padx=2)
+        self.progress_bar = ttk.Progressbar(toolbar, mode='determinate', maximum=100, length=200)
+        self.progress_bar.pack(side=tk.LEFT, padx=10)
+        
+        self.summary_var = tk.StringVar()
+        ttk.Label(self.dialog, textvariable=self.summary_var).pack(fill=tk.X, padx=5)
+        
+        tree_frame = ttk.Frame(self.dialog)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.storage_tree = ttk.Treeview(tree_frame, columns=[c[0] for c in self.COLUMNS], show='headings')
+        for name, title, width in self.COLUMNS:
+            self.storage_tree.heading(name, text=title)
+            self.storage_tree.column(name, width=width,
+                                     anchor=tk.W if name in ('name', 'type', 'table') else tk.E)
+        v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.storage_tree.yview)
+        self.storage_tree.configure(yscrollcommand=v_scroll.set)
+        self.storage_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(self.dialog, textvariable=self.status_var).pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+    
+    def load(self, force=False):
+        """Показывает сохраненный анализ или запускает новый"""
+        if self.job or not self.main_app.connections:
+            return
+        scope = self.main_app.storage_scope()
+        cached = self.main_app.storage_report
+        if not force and cached and cached[0] == scope:
+            self.show(cached[1])
+            self.status_var.set("Данные не менялись после анализа, показан сохраненный результат")
+            return
+        
+        connections = self.main_app.connections
+        job = self.job = MaintenanceJob("Анализ места")
+        measurement = metrics.begin('storage_analysis')
+        
+        def task():
+            with connections.background_writer('storage') as connection:
+                return analyze_storage(connection, job)
+        
+        def on_done(report):
+            self.job = None
+            measurement.finish(rows=report.page_count)
+            # Результат сохраняется, только если данные не менялись во время анализа
+            if connections is self.main_app.connections and self.main_app.storage_scope() == scope:
+                self.main_app.storage_report = (scope, report)
+            if self.dialog.winfo_exists():
+                self.show(report)
+                self.status_var.set(f"Анализ выполнен за {report.seconds:.1f} с")
+        
+        def on_error(e):
+            self.job = None
+            if isinstance(e, JobCancelled):
+                measurement.finish()
+                return
+            measurement.finish(error=True)
+            if self.dialog.winfo_exists():
+                self.status_var.set("Ошибка анализа")
+                messagebox.showerror("Ошибка", f"Не удалось проанализировать БД: {str(e)}", parent=self.dialog)
+        
+        self.status_var.set("Чтение страниц БД...")
+        # Опрос результата идет через главное окно: диалог могут закрыть раньше
+        run_in_background(self.main_app.root, task, on_done, on_error)
+        self.poll()
+    
+    def poll(self):
+        """Обновляет полосу прогресса, пока идет анализ"""
+        job = self.job
+        self.progress_bar['value'] = int(job.progress * 100) if job else 100
+        if job:
+            self._poll_id = self.dialog.after(self.POLL_MS, self.poll)
+        else:
+            self._poll_id = None
+    
+    def show(self, report):
+        """Заполняет таблицу объектов и сводку по файлу"""
+        for item in self.storage_tree.get_children():
+            self.storage_tree.delete(item)
+        for item in report.objects:
+            self.storage_tree.insert('', 'end', values=(
+                item.name, self.TYPE_NAMES.get(item.type, item.type), item.table,
+                format_count(item.pages), format_size(item.size), format_size(item.payload),
+                format_size(item.overhead), format_size(item.unused),
+                f"{item.fragmentation * 100:.1f}"))
+        
+        file_size = report.page_count * report.page_size
+        unused = sum(item.unused for item in report.objects)
+        self.summary_var.set(
+            f"Файл: {format_size(file_size)}, страниц: {format_count(report.page_count)} "
+            f"по {format_size(report.page_size)}; свободных страниц: {format_count(report.freelist_count)} "
+            f"({format_size(report.freelist_count * report.page_size)}); "
+            f"пусто внутри страниц: {format_size(unused)}")
+    
+    def close(self):
+        if self.job:
+            self.job.cancel()
+        if self._poll_id:
+            self.dialog.after_cancel(self._poll_id)
+        self.dialog.destroy()
+
+
 class SettingsDialog:
     def __init__(self, parent, main_app):
         self.main_app = main_app
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Настройки")
-        self.dialog.geometry("400x300")
+        self.dialog.geometry("450x510")
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
@@ -449,6 +1044,92 @@ class SettingsDialog:
         ttk.Entry(path_entry_frame, textvariable=self.backup_path_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
         ttk.Button(path_entry_frame, text="Обзор", command=self.browse_backup_dir).pack(side=tk.RIGHT, padx=2)
         
+        # Автообновление
+        refresh_frame = ttk.LabelFrame(general_frame, text="Обновление данных")
+        refresh_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.auto_refresh_var = tk.BooleanVar(value=self.main_app.settings.get('auto_refresh'))
+        ttk.Checkbutton(refresh_frame, text="Обновлять при изменении БД другими программами",
+                       variable=self.auto_refresh_var).pack(anchor=tk.W, padx=5, pady=5)
+        
+        cache_frame = ttk.Frame(refresh_frame)
+        cache_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(cache_frame, text="Кэш страниц таблиц, МБ:").pack(side=tk.LEFT)
+        self.row_cache_var = tk.StringVar(value=str(self.main_app.settings.get('row_cache_mb')))
+        tk.Spinbox(cache_frame, from_=0, to=4096, increment=16,
+                   textvariable=self.row_cache_var, width=8).pack(side=tk.LEFT, padx=5)
+        ttk.Label(cache_frame, text="запросов, МБ:").pack(side=tk.LEFT)
+        self.query_cache_var = tk.StringVar(value=str(self.main_app.settings.get('query_cache_mb')))
+        tk.Spinbox(cache_frame, from_=0, to=4096, increment=16,
+                   textvariable=self.query_cache_var, width=8).pack(side=tk.LEFT, padx=5)
+        
+        # Логирование
+        log_frame = ttk.LabelFrame(general_frame, text="Журнал")
+        log_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        log_level_frame = ttk.Frame(log_frame)
+        log_level_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(log_level_frame, text="Уровень логирования:").pack(side=tk.LEFT)
+        self.log_level_var = tk.StringVar(value=self.main_app.settings.get('log_level'))
+        ttk.Combobox(log_level_frame, textvariable=self.log_level_var, values=LOG_LEVELS,
+                     state="readonly", width=12).pack(side=tk.LEFT, padx=5)
+        
+        # Вкладка "Производительность" - настройки текущей БД
+        perf_frame = ttk.Frame(notebook)
+        notebook.add(perf_frame, text="Производительность")
+        
+        current_db = self.main_app.current_db
+        settings = self.main_app.settings
+        
+        profile_frame = ttk.LabelFrame(perf_frame, text="Профиль соединения для текущей БД")
+        profile_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        profile = settings.get_db(current_db, 'pragma_profile') if current_db else ''
+        self.profile_var = tk.StringVar(value=profile)
+        profile_combo = ttk.Combobox(profile_frame, textvariable=self.profile_var,
+                                     values=list(PRAGMA_PROFILES), state="readonly", width=25)
+        profile_combo.pack(anchor=tk.W, padx=5, pady=5)
+        
+        self.profile_info_var = tk.StringVar(value=PROFILE_DESCRIPTIONS.get(profile, ''))
+        ttk.Label(profile_frame, textvariable=self.profile_info_var,
+                 foreground='gray').pack(anchor=tk.W, padx=5, pady=2)
+        profile_combo.bind('<<ComboboxSelected>>', lambda e: self.profile_info_var.set(
+            PROFILE_DESCRIPTIONS.get(self.profile_var.get(), '')))
+        
+        # Таблица данных и поиск
+        grid_frame = ttk.LabelFrame(perf_frame, text="Таблица данных")
+        grid_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        page_frame = ttk.Frame(grid_frame)
+        page_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Label(page_frame, text="Записей на странице:", width=22).pack(side=tk.LEFT)
+        self.page_size_var = tk.StringVar(
+            value=str(settings.get_db(current_db, 'page_size')) if current_db else '')
+        page_spin = tk.Spinbox(page_frame, from_=100, to=100000, increment=100,
+                               textvariable=self.page_size_var, width=10)
+        page_spin.pack(side=tk.LEFT, padx=5)
+        
+        search_frame = ttk.Frame(grid_frame)
+        search_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Label(search_frame, text="Режим поиска:", width=22).pack(side=tk.LEFT)
+        search_mode = settings.get_db(current_db, 'search_mode') if current_db else ''
+        self.search_mode_var = tk.StringVar(value=SEARCH_MODES.get(search_mode, ''))
+        search_combo = ttk.Combobox(search_frame, textvariable=self.search_mode_var,
+                                    values=list(SEARCH_MODES.values()), state="readonly", width=15)
+        search_combo.pack(side=tk.LEFT, padx=5)
+        
+        keep_frame = ttk.Frame(grid_frame)
+        keep_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Label(keep_frame, text="Хранить автобэкапов:", width=22).pack(side=tk.LEFT)
+        self.backup_keep_var = tk.StringVar(
+            value=str(settings.get_db(current_db, 'backup_keep')) if current_db else '')
+        keep_spin = tk.Spinbox(keep_frame, from_=1, to=1000, textvariable=self.backup_keep_var, width=10)
+        keep_spin.pack(side=tk.LEFT, padx=5)
+        
+        if not current_db:
+            for widget in (profile_combo, page_spin, search_combo, keep_spin):
+                widget.config(state=tk.DISABLED)
+            self.profile_info_var.set("Откройте базу данных, чтобы изменить ее настройки")
+        
         # Кнопки
         buttons_frame = ttk.Frame(self.dialog)
         buttons_frame.pack(fill=tk.X, padx=10, pady=5)
@@ -463,14 +1144,64 @@ class SettingsDialog:
             self.backup_path_var.set(directory)
     
     def save_settings(self):
-        self.main_app.auto_backup = self.auto_backup_var.get()
-        self.main_app.backup_dir = self.backup_path_var.get()
+        import os
+        main_app = self.main_app
+        settings = main_app.settings
+        
+        # Проверяем числовые значения до изменения настроек
+        try:
+            row_cache_mb = int(self.row_cache_var.get())
+            query_cache_mb = int(self.query_cache_var.get())
+            if row_cache_mb < 0 or query_cache_mb < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Предупреждение", "Размер кэша должен быть неотрицательным числом")
+            return
+        
+        if main_app.current_db:
+            try:
+                page_size = int(self.page_size_var.get())
+                backup_keep = int(self.backup_keep_var.get())
+                if page_size < 1 or backup_keep < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("Предупреждение",
+                                     "Размер страницы и число бэкапов должны быть положительными числами")
+                return
+        
+        main_app.auto_backup = self.auto_backup_var.get()
+        main_app.backup_dir = self.backup_path_var.get()
+        settings.set('log_level', self.log_level_var.get())
+        settings.set('auto_refresh', self.auto_refresh_var.get())
+        settings.set('row_cache_mb', row_cache_mb)
+        main_app.row_cache.set_limit(row_cache_mb)
+        settings.set('query_cache_mb', query_cache_mb)
+        query_cache.set_limit(query_cache_mb)
+        set_log_level(self.log_level_var.get())
         
         # Создаем папку если не существует
-        import os
-        if not os.path.exists(self.main_app.backup_dir):
-            os.makedirs(self.main_app.backup_dir)
+        if not os.path.exists(main_app.backup_dir):
+            os.makedirs(main_app.backup_dir)
+        
+        if main_app.current_db:
+            current_db = main_app.current_db
+            settings.set_db(current_db, 'page_size', page_size)
+            settings.set_db(current_db, 'backup_keep', backup_keep)
+            for mode, title in SEARCH_MODES.items():
+                if title == self.search_mode_var.get():
+                    settings.set_db(current_db, 'search_mode', mode)
+            main_app.page_size = page_size
+            
+            # Профиль PRAGMA применяем сразу к открытому соединению
+            profile = self.profile_var.get()
+            settings.set_db(current_db, 'pragma_profile', profile)
+            if main_app.connections:
+                try:
+                    main_app.connections.set_profile(profile)
+                except sqlite3.Error as e:
+                    logger.warning(f"Не удалось применить профиль '{profile}': {e}")
         
+        settings.save()
         messagebox.showinfo("Успех", "Настройки сохранены")
         self.dialog.destroy()
 
@@ -479,6 +1210,7 @@ class CreateTableDialog:
     def __init__(self, parent, connection):
         logger.info("Инициализируем CreateTableDialog")
         self.connection = connection
+        self.service = DatabaseService(connection)
         self.result = False
         
         try:
@@ -495,7 +1227,7 @@ class CreateTableDialog:
             # Ждем закрытия диалога
             logger.debug("Ждем закрытия CreateTableDialog")
             parent.wait_window(self.dialog)
-            logger.debug(f"CreateTableDialog закрыт, результат: {self.result}")
+            logger.debug("CreateTableDialog закрыт, результат: %s", self.result)
             
         except Exception as e:
             logger.error(f"Ошибка при инициализации CreateTableDialog: {str(e)}")
@@ -554,7 +1286,7 @@ class CreateTableDialog:
         try:
             logger.debug("Создаем FieldDialog")
             field_dialog = FieldDialog(self.dialog)
-            logger.debug(f"FieldDialog завершен, результат: {field_dialog.result}")
+            logger.debug("FieldDialog завершен, результат: %s", field_dialog.result)
             
             if field_dialog.result:
                 name, field_type, allow_null, default, is_pk = field_dialog.result
@@ -563,21 +1295,21 @@ class CreateTableDialog:
                 null_text = 'YES' if allow_null else 'NO'
                 pk_text = 'YES' if is_pk else 'NO'
                 
-                logger.debug(f"Преобразованные значения: null_text='{null_text}', pk_text='{pk_text}'")
+                logger.debug("Преобразованные значения: null_text='%s', pk_text='%s'", null_text, pk_text)
                 
                 tree_values = (field_type, null_text, default, pk_text)
-                logger.debug(f"Значения для вставки в дерево: {tree_values}")
+                logger.debug("Значения для вставки в дерево: %s", tree_values)
                 
                 self.fields_tree.insert('', 'end', text=name, values=tree_values)
                 logger.info(f"Поле '{name}' успешно добавлено в дерево")
                 
                 # Проверим, что поле действительно добавилось
                 children = self.fields_tree.get_children()
-                logger.debug(f"Количество полей в дереве после добавления: {len(children)}")
+                logger.debug("Количество полей в дереве после добавления: %s", len(children))
                 
                 for child in children:
                     item_data = self.fields_tree.item(child)
-                    logger.debug(f"Поле в дереве: text='{item_data['text']}', values={item_data['values']}")
+                    logger.debug("Поле в дереве: text='%s', values=%s", item_data['text'], item_data['values'])
                     
             else:
                 logger.info("Пользователь отменил добавление поля")
@@ -597,7 +1329,7 @@ class CreateTableDialog:
         logger.info("Пользователь нажал 'Создать таблицу'")
         
         table_name = self.table_name_var.get().strip()
-        logger.debug(f"Имя таблицы: '{table_name}'")
+        logger.debug("Имя таблицы: '%s'", table_name)
         
         if not table_name:
             logger.warning("Пустое имя таблицы")
@@ -613,7 +1345,6 @@ class CreateTableDialog:
             
         try:
             fields = []
-            primary_keys = []
             
             children = self.fields_tree.get_children()
             logger.info(f"Обрабатываем {len(children)} полей")
@@ -622,7 +1353,7 @@ class CreateTableDialog:
                 field_name = self.fields_tree.item(item)['text']
                 values = self.fields_tree.item(item)['values']
                 
-                logger.debug(f"Поле {i+1}: name='{field_name}', values={values}")
+                logger.debug("Поле %s: name='%s', values=%s", i+1, field_name, values)
                 
                 if len(values) < 4:
                     logger.error(f"Некорректные данные для поля {field_name}: недостаточно значений ({len(values)})")
@@ -630,7 +1361,7 @@ class CreateTableDialog:
                     return
                     
                 field_type, allow_null, default, is_pk = values
-                logger.debug(f"Распаковка значений: type='{field_type}', null='{allow_null}', default='{default}', pk='{is_pk}'")
+                logger.debug("Распаковка значений: type='%s', null='%s', default='%s', pk='%s'", field_type, allow_null, default, is_pk)
                 
                 # Проверяем корректность имени поля
                 if not field_name or not field_name.replace('_', '').replace('-', '').isalnum():
@@ -639,36 +1370,8 @@ class CreateTableDialog:
                                          f"Некорректное имя поля: {field_name}")
                     return
                 
-                field_def = f'"{field_name}" {field_type.upper()}'
-                logger.debug(f"Базовое определение поля: {field_def}")
-                
-                if is_pk == 'YES':
-                    primary_keys.append(field_name)
-                    logger.debug(f"Поле '{field_name}' является первичным ключом")
-                    
-                    if field_type.upper() == 'INTEGER' and len([pk for pk in self.fields_tree.get_children() 
-                                                               if self.fields_tree.item(pk)['values'][3] == 'YES']) == 1:
-                        field_def += " PRIMARY KEY AUTOINCREMENT"
-                        logger.debug("Добавлен AUTOINCREMENT для единственного INTEGER PK")
-                    else:
-                        field_def += " PRIMARY KEY"
-                        logger.debug("Добавлен PRIMARY KEY")
-                
-                if allow_null == 'NO' and is_pk != 'YES':
-                    field_def += " NOT NULL"
-                    logger.debug("Добавлено NOT NULL")
-                    
-                if default and default.strip() and default.strip().upper() != 'NULL':
-                    # Экранируем строковые значения
-                    if field_type.upper() in ['TEXT', 'BLOB']:
-                        field_def += f" DEFAULT '{default.strip()}'"
-                        logger.debug(f"Добавлено DEFAULT '{default.strip()}' для {field_type}")
-                    else:
-                        field_def += f" DEFAULT {default.strip()}"
-                        logger.debug(f"Добавлено DEFAULT {default.strip()} для {field_type}")
-                    
-                fields.append(field_def)
-                logger.info(f"Финальное определение поля: {field_def}")
+                fields.append(FieldSpec(field_name, str(field_type), allow_null != 'NO',
+                                        default, is_pk == 'YES'))
             
             logger.info(f"Всего полей обработано: {len(fields)}")
             
@@ -677,14 +1380,7 @@ class CreateTableDialog:
                 messagebox.showwarning("Предупреждение", "Добавьте хотя бы одно поле")
                 return
                 
-            # Если есть составной первичный ключ
-            if len(primary_keys) > 1:
-                pk_fields = [f'"{pk}"' for pk in primary_keys]
-                pk_constraint = f'PRIMARY KEY ({", ".join(pk_fields)})'
-                fields.append(pk_constraint)
-                logger.info(f"Добавлен составной первичный ключ: {pk_constraint}")
-                
-            sql = f'CREATE TABLE "{table_name}" ({", ".join(fields)})'
+            sql = build_create_table_sql(table_name, fields)
             logger.info(f"Сгенерированный SQL: {sql}")
             
             # Показываем SQL для проверки
@@ -693,9 +1389,7 @@ class CreateTableDialog:
                 logger.info("Пользователь подтвердил создание таблицы")
                 
                 try:
-                    cursor = self.connection.cursor()
-                    cursor.execute(sql)
-                    self.connection.commit()
+                    self.service.create_table(table_name, fields)
                     
                     self.result = True
                     logger.info(f"Таблица '{table_name}' успешно создана")
@@ -740,7 +1434,7 @@ class FieldDialog:
         # Ждем закрытия диалога
         logger.debug("Ждем закрытия FieldDialog")
         parent.wait_window(self.dialog)
-        logger.debug(f"FieldDialog закрыт, финальный результат: {self.result}")
+        logger.debug("FieldDialog закрыт, финальный результат: %s", self.result)
         
     def setup_ui(self):
         # Имя поля
@@ -811,7 +1505,7 @@ NUMERIC - числовые значения (автопреобразовани
         
         try:
             name = self.name_var.get().strip()
-            logger.debug(f"Имя поля: '{name}'")
+            logger.debug("Имя поля: '%s'", name)
             
             if not name:
                 logger.warning("Пустое имя поля")
@@ -841,10 +1535,10 @@ NUMERIC - числовые значения (автопреобразовани
             default_value = self.default_var.get().strip()
             field_type = self.type_var.get()
             
-            logger.debug(f"Значения поля: type='{field_type}', default='{default_value}'")
+            logger.debug("Значения поля: type='%s', default='%s'", field_type, default_value)
         
             if default_value and field_type in ['INTEGER', 'REAL', 'NUMERIC']:
-                logger.debug(f"Проверяем значение по умолчанию '{default_value}' для типа {field_type}")
+                logger.debug("Проверяем значение по умолчанию '%s' для типа %s", default_value, field_type)
                 try:
                     if field_type == 'INTEGER':
                         int(default_value)
@@ -870,7 +1564,7 @@ NUMERIC - числовые значения (автопреобразовани
                 
             # Получаем выбранный тип
             selected_type = self.type_var.get()
-            logger.debug(f"Выбранный тип: '{selected_type}'")
+            logger.debug("Выбранный тип: '%s'", selected_type)
             
             allow_null = self.allow_null_var.get()
             is_pk = self.is_pk_var.get()
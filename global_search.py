@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск по всем таблицам БД параллельно через читателей из пула
+"""
+
+import queue
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from db_service import quote_identifier, register_functions
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.global_search')
+
+SearchHit = namedtuple('SearchHit', 'table rowid column snippet')
+
+# Сколько совпадений искать по умолчанию
+DEFAULT_HIT_LIMIT = 1000
+
+# Символов фрагмента вокруг совпадения
+SNIPPET_CHARS = 60
+
+
+def value_text(value):
+    """Значение ячейки как текст для поиска и фрагмента"""
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return str(value)
+
+
+def make_snippet(text, term, width=SNIPPET_CHARS):
+    """Фрагмент текста вокруг первого совпадения (term в нижнем регистре)"""
+    position = text.lower().find(term)
+    if position < 0:
+        position = 0
+    start = max(0, position - (width - len(term)) // 2)
+    snippet = text[start:start + width].replace('\n', ' ')
+    if start > 0:
+        snippet = '…' + snippet
+    if start + width < len(text):
+        snippet += '…'
+    return snippet
+
+
+def build_table_search(table_name, column_names, term, has_rowid):
+    """SELECT строк таблицы, где хотя бы одна колонка содержит term.
+
+    Просматриваются все колонки, как в поиске по таблице (build_search_condition):
+    объявленный тип не мешает SQLite хранить в колонке текст (STRING, DATE,
+    NUMERIC и даже INTEGER, если значение не приводится к числу).
+
+    Для ASCII используется LIKE (выполняется внутри SQLite и без учета
+    регистра латиницы), для кириллицы - lower_text, как в поиске по таблице.
+    """
+    if all(ord(char) < 128 for char in term):
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        template = "{} LIKE ? ESCAPE '\\'"
+        value = f"%{escaped}%"
+    else:
+        template = "instr(lower_text({}), ?) > 0"
+        value = term
+    quoted = [quote_identifier(name) for name in column_names]
+    select = ', '.join((['rowid'] if has_rowid else []) + quoted)
+    where = ' OR '.join(template.format(name) for name in quoted)
+    sql = f"SELECT {select} FROM {quote_identifier(table_name)} WHERE {where} LIMIT ?"
+    return sql, [value] * len(quoted)
+
+
+def table_has_rowid(connection, table_name):
+    try:
+        connection.execute(f"SELECT rowid FROM {quote_identifier(table_name)} LIMIT 0")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def search_table(connection, table_name, term, limit):
+    """Совпадения в одной таблице (SearchHit на каждую совпавшую ячейку)"""
+    term = term.strip().lower()
+    column_names = [row[1] for row in
+                    connection.execute(f"PRAGMA table_info({quote_identifier(table_name)})")]
+    if not term or not column_names or limit <= 0:
+        return
+
+    has_rowid = table_has_rowid(connection, table_name)
+    sql, params = build_table_search(table_name, column_names, term, has_rowid)
+    cursor = connection.execute(sql, params + [limit])
+    try:
+        for row in cursor:
+            rowid = row[0] if has_rowid else None
+            values = row[1:] if has_rowid else row
+            for name, value in zip(column_names, values):
+                text = value_text(value)
+                if term in text.lower():
+                    yield SearchHit(table_name, rowid, name, make_snippet(text, term))
+    finally:
+        cursor.close()
+
+
+class GlobalSearch:
+    """Поиск строки во всех таблицах.
+
+    Таблицы просматриваются параллельно (по читателю из пула на поток),
+    совпадения складываются в очередь и забираются UI-потоком через
+    take(). При достижении limit или cancel() выполняющиеся запросы
+    прерываются через Connection.interrupt().
+    """
+
+    def __init__(self, connections, term, limit=DEFAULT_HIT_LIMIT, workers=None):
+        self.connections = connections
+        self.term = term
+        self.limit = limit
+        # Один читатель оставляем для загрузки таблицы в гриде
+        self.workers = workers or max(1, connections.pool_size - 1)
+        self.tables = []
+        self.tables_done = 0
+        self.hit_count = 0
+        self.errors = []
+        self._hits = queue.Queue()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._active = set()
+        self._executor = None
+        self._futures = []
+
+    def start(self):
+        """Запускает поиск, возвращает число таблиц (вызывается из UI-потока).
+
+        Список таблиц читается через писателя: читатели пула могут быть
+        заняты загрузкой грида или подсчетом строк, и ожидание свободного
+        заморозило бы окно.
+        """
+        self.tables = [row[0] for row in self.connections.writer.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY name")]
+        logger.info(f"Поиск '{self.term}' по {len(self.tables)} таблицам, потоков: {self.workers}")
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='search')
+        self._futures = [self._executor.submit(self._search_table, table) for table in self.tables]
+        self._executor.shutdown(wait=False)
+        return len(self.tables)
+
+    @property
+    def done(self):
+        return all(future.done() for future in self._futures)
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def take(self, max_items=500):
+        """Найденные с прошлого вызова совпадения (из UI-потока)"""
+        hits = []
+        while len(hits) < max_items:
+            try:
+                hits.append(self._hits.get_nowait())
+            except queue.Empty:
+                break
+        return hits
+
+    def cancel(self):
+        """Останавливает поиск и прерывает выполняющиеся запросы"""
+        self._stop.set()
+        with self._lock:
+            for connection in self._active:
+                connection.interrupt()
+
+    def _search_table(self, table_name):
+        try:
+            if self._stop.is_set():
+                return
+            with self.connections.reader() as connection:
+                register_functions(connection)
+                with self._lock:
+                    self._active.add(connection)
+                    remaining = self.limit - self.hit_count
+                hits = search_table(connection, table_name, self.term, remaining)
+                try:
+                    self._collect(hits)
+                finally:
+                    # Курсор закрывается до возврата читателя в пул
+                    hits.close()
+                    with self._lock:
+                        self._active.discard(connection)
+        except sqlite3.OperationalError as e:
+            # Прерванный cancel() запрос ошибкой не считается
+            if not self._stop.is_set():
+                logger.warning(f"Ошибка поиска в таблице {table_name}: {e}")
+                self.errors.append((table_name, str(e)))
+        except Exception as e:
+            logger.warning(f"Ошибка поиска в таблице {table_name}: {e}")
+            self.errors.append((table_name, str(e)))
+        finally:
+            with self._lock:
+                self.tables_done += 1
+
+    def _collect(self, hits):
+        """Передает совпадения в очередь до достижения предела"""
+        for hit in hits:
+            with self._lock:
+                if self.hit_count >= self.limit:
+                    return
+                self.hit_count += 1
+                limit_reached = self.hit_count >= self.limit
+            self._hits.put(hit)
+            if limit_reached:
+                logger.info(f"Поиск '{self.term}': достигнут предел {self.limit} совпадений")
+                self.cancel()
+                return
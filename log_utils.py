@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Вспомогательные средства логирования для горячих участков кода
+"""
+
+import time
+import logging
+
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+
+
+def set_log_level(level):
+    """Меняет уровень логирования приложения на лету"""
+    level_value = getattr(logging, str(level).upper(), logging.INFO)
+    logging.getLogger().setLevel(level_value)
+    logging.getLogger('db_manager').setLevel(level_value)
+
+
+def format_count(value):
+    """Число с разделением разрядов: 1 000 000"""
+    return f"{value:,}".replace(',', ' ')
+
+
+def format_size(size):
+    """Размер в байтах в читаемом виде: 512 Б, 1.5 МБ"""
+    if size < 1024:
+        return f"{size} Б"
+    for unit in ('КБ', 'МБ', 'ГБ'):
+        size /= 1024
+        if size < 1024 or unit == 'ГБ':
+            return f"{size:.1f} {unit}"
+
+
+def format_hex_dump(data, offset=0):
+    """Шестнадцатеричный дамп: смещение, 16 байт, печатные символы"""
+    lines = []
+    for start in range(0, len(data), 16):
+        chunk = data[start:start + 16]
+        hex_part = ' '.join(f"{byte:02x}" for byte in chunk)
+        text_part = ''.join(chr(byte) if 32 <= byte < 127 else '.' for byte in chunk)
+        lines.append(f"{offset + start:08x}  {hex_part:<47}  {text_part}")
+    return '\n'.join(lines)
+
+
+class BatchLog:
+    """Сводное логирование массовых операций.
+
+    Вместо записи на каждую строку выводит одно итоговое сообщение
+    ("обработано 1 000 000 строк за 4.20 с") и, при уровне DEBUG,
+    промежуточные сообщения раз в sample_every элементов.
+
+        with BatchLog(logger, "Добавлено строк в таблицу %s", table) as batch:
+            for row in rows:
+                ...
+                batch.add()
+    """
+
+    def __init__(self, logger, message, *args, level=logging.INFO, sample_every=10000):
+        self.logger = logger
+        self.message = message
+        self.args = args
+        self.level = level
+        self.sample_every = sample_every
+        self.count = 0
+        self.started = None
+        # Проверяем уровень один раз, а не на каждом элементе
+        self._sample = sample_every and logger.isEnabledFor(logging.DEBUG)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def add(self, count=1):
+        """Учитывает обработанные элементы"""
+        self.count += count
+        if self._sample and self.count % self.sample_every < count:
+            self.logger.debug(self.message + ": %s...", *(self.args + (format_count(self.count),)))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, self.message + ": %s за %.2f с",
+                            *(self.args + (format_count(self.count), self.elapsed)))
+        return False
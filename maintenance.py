@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Долгие операции обслуживания БД (сжатая копия, вакуум) с прогрессом и отменой
+
+Операция выполняется в фоновом потоке на отдельном соединении. Прогресс
+оценивается в обработчике прогресса SQLite (set_progress_handler) и
+читается UI-потоком из job.progress; cancel() прерывает оператор -
+обработчик возвращает ненулевое значение, и SQLite откатывает его.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+import db_service
+from db_connection import checkpoint
+from sql_trace import sql_tracer, PROGRESS_STEPS
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.maintenance')
+
+# Как часто пересчитывается оценка прогресса, секунд
+PROGRESS_INTERVAL = 0.2
+
+# Инструкций виртуальной машины SQLite при VACUUM на одну ячейку B-дерева
+# и при чтении dbstat на одну страницу (замеры на SQLite 3.40, не зависят
+# от числа колонок: строки переносятся целиком)
+VACUUM_STEPS_PER_CELL = 5
+DBSTAT_STEPS_PER_PAGE = 10
+# Без dbstat объем работы VACUUM оценивается по числу страниц
+VACUUM_STEPS_PER_PAGE = 250
+
+CompactResult = namedtuple('CompactResult', 'path size_before size_after seconds')
+# unused_bytes и cells - по dbstat (None, если dbstat недоступна)
+VacuumEstimate = namedtuple('VacuumEstimate',
+                            'page_size page_count freelist_count unused_bytes cells reclaimable required')
+DiskSpace = namedtuple('DiskSpace', 'path required available')
+VacuumResult = namedtuple('VacuumResult', 'size_before size_after reclaimed seconds')
+# overhead - заголовки страниц и ячеек, указатели, внутренние страницы;
+# fragmentation - доля листовых страниц не по порядку в файле (0..1)
+ObjectStorage = namedtuple('ObjectStorage', 'name type table pages leaf_pages overflow_pages cells '
+                                            'payload overhead unused size fragmentation')
+StorageReport = namedtuple('StorageReport', 'page_size page_count freelist_count objects seconds')
+
+
+class JobCancelled(Exception):
+    """Операция отменена пользователем"""
+
+
+def database_pages(connection):
+    """Число страниц, свободных страниц и размер страницы БД"""
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    return page_count, freelist_count, page_size
+
+
+class MaintenanceJob:
+    """Состояние долгой операции: прогресс 0..1, текст этапа и отмена.
+
+    Поля пишет фоновый поток, читает UI-поток (простые присваивания).
+    """
+
+    def __init__(self, title):
+        self.title = title
+        self.progress = 0.0
+        self.status = ''
+        # Инструкций виртуальной машины, выполненных под watch()
+        self.steps = 0
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Запрашивает отмену: выполняющийся оператор будет прерван"""
+        self._cancel.set()
+
+    def check(self):
+        """Исключение JobCancelled, если запрошена отмена"""
+        if self.cancelled:
+            raise JobCancelled(f"{self.title}: отменено")
+
+    @contextmanager
+    def watch(self, connection, estimate):
+        """Обработчик прогресса на время оператора.
+
+        estimate() возвращает долю выполненной работы. Обработчик
+        трассировки SQL соединения (если подключен) вызывается как прежде
+        и восстанавливается после выхода.
+        """
+        trace = sql_tracer.trace_for(connection)
+        last = [0.0]
+        self.steps = 0
+
+        def on_progress():
+            if trace is not None:
+                trace.on_progress()
+            if self._cancel.is_set():
+                return 1
+            self.steps += PROGRESS_STEPS
+            now = time.perf_counter()
+            if now - last[0] >= PROGRESS_INTERVAL:
+                last[0] = now
+                try:
+                    self.progress = max(self.progress, min(estimate(), 0.99))
+                except OSError:
+                    pass
+            return 0
+
+        connection.set_progress_handler(on_progress, PROGRESS_STEPS)
+        try:
+            yield
+        except sqlite3.OperationalError:
+            # Прерванный отменой оператор завершается ошибкой interrupted
+            self.check()
+            raise
+        finally:
+            if trace is not None:
+                connection.set_progress_handler(trace.on_progress, PROGRESS_STEPS)
+            else:
+                connection.set_progress_handler(None, 0)
+
+
+def compact_backup(connection, backup_path, job=None):
+    """Сжатая копия БД (VACUUM INTO) с оценкой прогресса по числу страниц.
+
+    В копию попадают только используемые страницы, поэтому ее ожидаемый
+    размер - (page_count - freelist_count) * page_size, а прогресс - доля
+    уже записанного временного файла копии.
+    """
+    job = job or MaintenanceJob("Сжатая копия")
+    started = time.perf_counter()
+    page_count, freelist_count, page_size = database_pages(connection)
+    expected = max(1, (page_count - freelist_count) * page_size)
+    temp_path = backup_path + '.tmp'
+
+    def estimate():
+        return os.path.getsize(temp_path) / expected if os.path.exists(temp_path) else 0.0
+
+    job.status = f"Запись {os.path.basename(backup_path)}"
+    with job.watch(connection, estimate):
+        size = db_service.vacuum_into(connection, backup_path)
+    job.progress = 1.0
+    result = CompactResult(backup_path, page_count * page_size, size, time.perf_counter() - started)
+    logger.info(f"Сжатая копия: {result.size_before} -> {result.size_after} байт "
+                f"за {result.seconds:.1f} с")
+    return result
+
+
+def dbstat_available(connection):
+    """Есть ли в сборке SQLite виртуальная таблица dbstat"""
+    try:
+        connection.execute("SELECT 1 FROM dbstat LIMIT 0")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def estimate_vacuum(connection, job=None):
+    """Оценка VACUUM: сколько места освободится и сколько нужно для копии.
+
+    Освобождаются свободные страницы (freelist_count) и, частично, пустое
+    место внутри страниц (unused по dbstat). Чтение dbstat проходит по
+    всем страницам, поэтому выполняется в фоне с прогрессом; по числу
+    ячеек B-деревьев затем оценивается прогресс самого VACUUM.
+    """
+    job = job or MaintenanceJob("Вакуум")
+    page_count, freelist_count, page_size = database_pages(connection)
+    unused_bytes = cells = None
+    if dbstat_available(connection):
+        job.status = "Анализ страниц"
+        total_steps = max(1, page_count * DBSTAT_STEPS_PER_PAGE)
+        with job.watch(connection, lambda: job.steps / total_steps):
+            cells, unused_bytes = connection.execute(
+                "SELECT SUM(CASE WHEN pagetype = 'leaf' THEN ncell ELSE 0 END), SUM(unused) "
+                "FROM dbstat").fetchone()
+        cells, unused_bytes = cells or 0, unused_bytes or 0
+
+    used = (page_count - freelist_count) * page_size
+    return VacuumEstimate(page_size, page_count, freelist_count, unused_bytes, cells,
+                          freelist_count * page_size + (unused_bytes or 0), used)
+
+
+def sqlite_temp_dir():
+    """Каталог временных файлов SQLite (порядок поиска как в unix-сборке SQLite)"""
+    if os.name == 'nt':
+        return tempfile.gettempdir()
+    candidates = [os.environ.get('SQLITE_TMPDIR'), os.environ.get('TMPDIR'),
+                  '/var/tmp', '/usr/tmp', '/tmp', os.curdir]
+    for path in candidates:
+        if path and os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK):
+            return path
+    return os.curdir
+
+
+def check_disk_space(database_path, estimate, temp_dir=None):
+    """Свободное место для VACUUM, возвращает список DiskSpace с нехваткой.
+
+    VACUUM собирает копию БД во временном файле (temp_dir), затем
+    переписывает основной файл через WAL или журнал отката рядом с БД:
+    в обоих местах нужно около estimate.required байт, на одном
+    диске - вдвое больше.
+    """
+    temp_dir = temp_dir or sqlite_temp_dir()
+    database_dir = os.path.dirname(os.path.abspath(database_path))
+    needs = {}
+    for path in (temp_dir, database_dir):
+        device = os.stat(path).st_dev
+        if device in needs:
+            needs[device] = DiskSpace(needs[device].path, needs[device].required + estimate.required, 0)
+        else:
+            needs[device] = DiskSpace(path, estimate.required, 0)
+
+    shortages = []
+    for need in needs.values():
+        available = shutil.disk_usage(need.path).free
+        if available < need.required:
+            shortages.append(need._replace(available=available))
+    return shortages
+
+
+def vacuum(connection, job=None, estimate=None):
+    """VACUUM на отдельном соединении с прогрессом и отменой.
+
+    Временная копия пишется в файл, а не в память (temp_store=FILE):
+    профили соединений держат временные таблицы в памяти, а копия
+    большой БД там не поместится. Прогресс - доля выполненных инструкций
+    от оценки по числу ячеек. Отмена откатывает VACUUM, БД не меняется.
+    """
+    job = job or MaintenanceJob("Вакуум")
+    estimate = estimate or estimate_vacuum(connection, job)
+    if estimate.cells is not None:
+        total_steps = max(1, estimate.cells * VACUUM_STEPS_PER_CELL)
+    else:
+        total_steps = max(1, (estimate.page_count - estimate.freelist_count) * VACUUM_STEPS_PER_PAGE)
+
+    started = time.perf_counter()
+    job.check()
+    job.status = "Вакуум"
+    job.progress = 0.0
+    connection.execute("PRAGMA temp_store = FILE")
+    with job.watch(connection, lambda: job.steps / total_steps):
+        size_before, size_after = db_service.vacuum_database(connection)
+    job.status = "Освобождение WAL"
+    checkpoint(connection)
+    job.progress = 1.0
+
+    result = VacuumResult(size_before, size_after, size_before - size_after,
+                          time.perf_counter() - started)
+    logger.info(f"Вакуум: освобождено {result.reclaimed} байт за {result.seconds:.1f} с")
+    return result
+
+
+def analyze_storage(connection, job=None):
+    """Распределение места по таблицам и индексам по dbstat.
+
+    Один проход по всем страницам БД; для каждого объекта считаются
+    страницы, полезные данные (payload), служебные байты (заголовки,
+    указатели ячеек, внутренние страницы), пустое место и фрагментация -
+    доля листовых страниц, лежащих в файле не следом за предыдущей
+    (как в sqlite3_analyzer).
+    """
+    if not dbstat_available(connection):
+        raise RuntimeError("Виртуальная таблица dbstat недоступна в этой сборке SQLite")
+    job = job or MaintenanceJob("Анализ места")
+    started = time.perf_counter()
+    page_count, freelist_count, page_size = database_pages(connection)
+    schema = {row[0]: (row[1], row[2]) for row in connection.execute(
+        "SELECT name, type, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+    totals = {}
+    job.status = "Чтение страниц"
+    cursor = connection.execute(
+        "SELECT name, pageno, pagetype, ncell, payload, unused, pgsize FROM dbstat")
+    try:
+        for number, (name, pageno, pagetype, ncell, payload, unused, pgsize) in enumerate(cursor):
+            if number % 1000 == 0:
+                job.check()
+                job.progress = min(number / max(1, page_count), 0.99)
+            # pages, leaf, overflow, cells, payload, unused, size, gaps, previous leaf
+            item = totals.get(name)
+            if item is None:
+                item = totals[name] = [0, 0, 0, 0, 0, 0, 0, 0, 0]
+            item[0] += 1
+            if pagetype == 'leaf':
+                item[1] += 1
+                item[3] += ncell
+                if item[8] and pageno != item[8] + 1:
+                    item[7] += 1
+                item[8] = pageno
+            elif pagetype == 'overflow':
+                item[2] += 1
+            item[4] += payload
+            item[5] += unused
+            item[6] += pgsize
+    finally:
+        cursor.close()
+
+    objects = []
+    for name, (pages, leaf, overflow, cells, payload, unused, size, gaps, _) in totals.items():
+        object_type, table = schema.get(name, ('table', name))
+        objects.append(ObjectStorage(name, object_type, table, pages, leaf, overflow, cells,
+                                     payload, size - payload - unused, unused, size,
+                                     gaps / leaf if leaf else 0.0))
+    objects.sort(key=lambda item: item.size, reverse=True)
+    job.progress = 1.0
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Анализ места: {len(objects)} объектов, {page_count} страниц за {seconds:.1f} с")
+    return StorageReport(page_size, page_count, freelist_count, objects, seconds)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Счетчики и время выполнения операций SQLite Database Manager
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import namedtuple, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.metrics')
+
+# Сколько последних замеров каждой операции хранится для перцентилей
+SAMPLE_SIZE = 1000
+
+OperationSummary = namedtuple('OperationSummary', 'name calls errors total p50 p95 max rows bytes')
+
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class OperationStats:
+    """Накопленная статистика одной операции"""
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.durations = deque(maxlen=sample_size)
+
+    def add(self, seconds, rows=0, bytes_written=0, error=False):
+        self.calls += 1
+        self.errors += 1 if error else 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows or 0
+        self.bytes += bytes_written or 0
+        self.durations.append(seconds)
+
+
+class Measurement:
+    """Замер, который завершается позже (например, в колбэке фоновой задачи).
+
+        measurement = metrics.begin('export')
+        ...
+        measurement.finish(rows=lines, bytes_written=size)
+    """
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.finished = False
+
+    def finish(self, rows=None, bytes_written=None, error=False):
+        """Фиксирует замер; повторный вызов игнорируется"""
+        if self.finished:
+            return
+        self.finished = True
+        if rows is not None:
+            self.rows = rows
+        if bytes_written is not None:
+            self.bytes = bytes_written
+        self.registry.record(self.name, time.perf_counter() - self.started,
+                             self.rows, self.bytes, error)
+
+
+class MetricsRegistry:
+    """Потокобезопасный реестр статистики операций"""
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.started = datetime.now()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, rows=0, bytes_written=0, error=False):
+        """Учитывает одно выполнение операции"""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = OperationStats(self.sample_size)
+            stats.add(seconds, rows, bytes_written, error)
+
+    def begin(self, name):
+        """Начинает замер, который будет завершен вызовом finish()"""
+        return Measurement(self, name)
+
+    @contextmanager
+    def measure(self, name):
+        """Замер блока кода; строки и байты можно указать через measurement.rows/bytes"""
+        measurement = self.begin(name)
+        try:
+            yield measurement
+        except BaseException:
+            measurement.finish(error=True)
+            raise
+        measurement.finish()
+
+    def summary(self):
+        """Сводка по операциям, самые затратные первыми"""
+        with self._lock:
+            items = [(name, stats, list(stats.durations)) for name, stats in self._stats.items()]
+        result = [OperationSummary(name, stats.calls, stats.errors, stats.total,
+                                   percentile(durations, 0.5), percentile(durations, 0.95),
+                                   stats.max, stats.rows, stats.bytes)
+                  for name, stats, durations in items]
+        return sorted(result, key=lambda item: item.total, reverse=True)
+
+    def reset(self):
+        """Сбрасывает накопленную статистику"""
+        with self._lock:
+            self._stats.clear()
+        self.started = datetime.now()
+
+    def to_dict(self):
+        """Статистика в виде словаря для JSON"""
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'operations': [item._asdict() for item in self.summary()],
+        }
+
+    def dump(self, path):
+        """Сохраняет статистику в JSON; пустая статистика не сохраняется"""
+        if not self._stats:
+            return None
+        try:
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            logger.info(f"Статистика операций сохранена в {path}")
+            return path
+        except OSError as e:
+            logger.error(f"Не удалось сохранить статистику {path}: {e}")
+            return None
+
+
+# Общий реестр приложения
+metrics = MetricsRegistry()
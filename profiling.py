@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запись профиля (cProfile + tracemalloc) для одного действия пользователя
+
+Когда запись включена, следующее действие (загрузка таблицы, поиск, импорт,
+запрос) выполняется под профилировщиком, а рядом с логами сохраняются
+файл .prof (для pstats / snakeviz) и отчет о самых крупных выделениях памяти.
+
+cProfile, pstats и tracemalloc импортируются только при записи профиля,
+чтобы не замедлять запуск приложения.
+"""
+
+import os
+import io
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.profiling')
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+
+# Глубина стека выделений и размер отчетов
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 30
+TOP_FUNCTIONS = 30
+
+
+class ProfileCapture:
+    """Профиль одного действия; может собираться из нескольких потоков по очереди"""
+
+    def __init__(self, action, output_dir):
+        import cProfile
+        self.action = action
+        self.output_dir = output_dir
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.prof_path = None
+        self.report_path = None
+        self._started_tracemalloc = False
+        self._finished = False
+
+    def start(self):
+        """Включает профилировщик в текущем потоке и отслеживание памяти"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def run(self, func, *args, **kwargs):
+        """Выполняет func под профилировщиком"""
+        self.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.stop()
+
+    def wrap(self, func):
+        """Обертка func, выполняющая ее под профилировщиком"""
+        def wrapper(*args, **kwargs):
+            return self.run(func, *args, **kwargs)
+        return wrapper
+
+    def finish(self):
+        """Останавливает запись и сохраняет .prof и отчет о памяти"""
+        if self._finished:
+            return self.prof_path, self.report_path
+        self._finished = True
+        elapsed = time.perf_counter() - self.started
+        import tracemalloc
+
+        snapshot = None
+        peak = 0
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(self.output_dir, f"profile_{self.action}_{timestamp}")
+        self.prof_path = base + '.prof'
+        self.report_path = base + '_alloc.txt'
+
+        self.profiler.dump_stats(self.prof_path)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            f.write(self.build_report(snapshot, peak, elapsed))
+
+        logger.info(f"Профиль действия '{self.action}' сохранен: {self.prof_path}, {self.report_path}")
+        return self.prof_path, self.report_path
+
+    def build_report(self, snapshot, peak, elapsed):
+        """Текстовый отчет: крупнейшие выделения памяти и самые затратные функции"""
+        import pstats
+        import tracemalloc
+        lines = [
+            f"Действие: {self.action}",
+            f"Время: {elapsed:.3f} с",
+            f"Пик памяти (tracemalloc): {peak / 1024:.1f} КБ",
+            "",
+            f"Крупнейшие выделения памяти (top {TOP_ALLOCATIONS}):",
+        ]
+        if snapshot is not None:
+            snapshot = snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            for index, stat in enumerate(snapshot.statistics('lineno')[:TOP_ALLOCATIONS], 1):
+                frame = stat.traceback[0]
+                lines.append(f"{index:>3}. {frame.filename}:{frame.lineno}: "
+                             f"{stat.size / 1024:.1f} КБ в {stat.count} блоках")
+
+        lines.append("")
+        lines.append(f"Самые затратные функции (top {TOP_FUNCTIONS} по cumulative):")
+        stream = io.StringIO()
+        try:
+            pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        except TypeError:
+            # Профилировщик не зафиксировал ни одного вызова
+            stream.write("нет данных\n")
+        lines.append(stream.getvalue())
+        return "\n".join(lines)
+
+
+class ProfileRecorder:
+    """Переключатель "Записать профиль": профилирует одно следующее действие"""
+
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR):
+        self.output_dir = output_dir
+        self.armed = False
+        # Вызывается с ProfileCapture после сохранения профиля
+        self.on_saved = None
+
+    def arm(self):
+        self.armed = True
+        logger.info("Запись профиля включена для следующего действия")
+
+    def disarm(self):
+        self.armed = False
+
+    def take(self, action):
+        """Возвращает ProfileCapture, если запись включена (и выключает ее), иначе None"""
+        if not self.armed:
+            return None
+        self.armed = False
+        return ProfileCapture(action, self.output_dir)
+
+    def finish(self, capture):
+        """Сохраняет профиль и сообщает об этом"""
+        try:
+            capture.finish()
+        except Exception as e:
+            logger.error(f"Не удалось сохранить профиль '{capture.action}': {str(e)}")
+            return
+        if self.on_saved:
+            self.on_saved(capture)
+
+    @contextmanager
+    def profile(self, action):
+        """Профилирует блок кода, если запись включена"""
+        capture = self.take(action)
+        if capture is None:
+            yield None
+            return
+        capture.start()
+        try:
+            yield capture
+        finally:
+            capture.stop()
+            self.finish(capture)
+
+    def wrap_background(self, action, task, on_success, on_error):
+        """Оборачивает фоновую задачу и ее колбэки, если запись включена.
+
+        Задача профилируется в рабочем потоке, колбэк - в потоке интерфейса,
+        профиль сохраняется после колбэка.
+        """
+        capture = self.take(action)
+        if capture is None:
+            return task, on_success, on_error
+
+        def success(result):
+            try:
+                if on_success:
+                    capture.run(on_success, result)
+            finally:
+                self.finish(capture)
+
+        def error(e):
+            try:
+                if on_error:
+                    on_error(e)
+            finally:
+                self.finish(capture)
+
+        return capture.wrap(task), success, error
+
+
+# Общий переключатель приложения
+profiler = ProfileRecorder()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кэш результатов SELECT (ключ - нормализованный SQL, параметры и версия данных БД)
+"""
+
+import re
+import sys
+import logging
+
+from db_service import QueryResult
+from row_cache import RowCache, CompactPage
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.query_cache')
+
+# Бюджет памяти кэша по умолчанию, МБ
+DEFAULT_QUERY_CACHE_MB = 32
+
+# Строки, идентификаторы в кавычках, комментарии и пробелы
+_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(?:\s|--[^\n]*|/\*.*?\*/)+", re.S)
+
+# Результат этих функций меняется без изменения данных - такие запросы не кэшируются
+_VOLATILE = re.compile(r"\b(RANDOM|RANDOMBLOB|CHANGES|TOTAL_CHANGES|LAST_INSERT_ROWID|"
+                       r"CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP)\b|'NOW'", re.I)
+
+
+def normalize_sql(sql):
+    """SQL без комментариев, лишних пробелов и ';' в конце (строки не меняются)"""
+    def replace(match):
+        token = match.group(0)
+        if token[0] in "'\"":
+            return token
+        return ' '
+    return _TOKENS.sub(replace, sql).strip().rstrip(';').strip()
+
+
+def is_cacheable(sql):
+    """Кэшируются только SELECT / WITH без недетерминированных функций"""
+    head = sql.split(None, 1)[0].upper() if sql else ''
+    return head in ('SELECT', 'WITH') and not _VOLATILE.search(sql)
+
+
+class CachedResult:
+    """Результат запроса: строки хранятся по колонкам (CompactPage)"""
+
+    __slots__ = ('columns', 'page', 'rowcount', 'size')
+
+    def __init__(self, result):
+        self.columns = list(result.columns)
+        self.page = CompactPage(result.rows)
+        self.rowcount = result.rowcount
+        self.size = self.page.size + sys.getsizeof(self.columns) + \
+            sum(sys.getsizeof(name) for name in self.columns)
+
+    def result(self):
+        return QueryResult(self.columns, self.page.rows, self.rowcount)
+
+
+class QueryCache:
+    """LRU-кэш результатов SELECT с бюджетом памяти.
+
+    scope - (файл БД, ConnectionManager.data_version()): любая запись в БД,
+    своя или чужая, меняет версию, и все результаты сбрасываются.
+    Используется из UI-потока.
+    """
+
+    def __init__(self, max_mb=DEFAULT_QUERY_CACHE_MB):
+        self.entries = RowCache(max_mb)
+
+    @property
+    def hits(self):
+        return self.entries.hits
+
+    @property
+    def misses(self):
+        return self.entries.misses
+
+    def set_limit(self, max_mb):
+        self.entries.set_limit(max_mb)
+
+    def clear(self):
+        self.entries.clear()
+
+    @staticmethod
+    def key(sql, params=()):
+        """Ключ кэша или None, если запрос не кэшируется"""
+        normalized = normalize_sql(sql)
+        if not is_cacheable(normalized):
+            return None
+        return normalized, tuple(params)
+
+    def get(self, scope, sql, params=()):
+        """QueryResult из кэша или None"""
+        self.entries.validate(scope)
+        key = self.key(sql, params)
+        if key is None:
+            return None
+        cached = self.entries.get(key)
+        if cached is None:
+            return None
+        logger.debug("Результат запроса взят из кэша: %s", key[0])
+        return cached.result()
+
+    def put(self, scope, sql, params, result):
+        """Сохраняет результат, если версия данных не изменилась за время запроса"""
+        key = self.key(sql, params)
+        if key is None or scope != self.entries.version:
+            return
+        self.entries.put(key, CachedResult(result))
+
+
+# Общий кэш программы
+query_cache = QueryCache()
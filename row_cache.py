@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Компактный кэш страниц таблицы данных (хранение по колонкам, LRU с потолком памяти)
+"""
+
+import sys
+import logging
+from array import array
+from collections import OrderedDict
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.row_cache')
+
+# Потолок памяти кэша по умолчанию, МБ
+DEFAULT_CACHE_MB = 64
+
+
+def pack_column(values):
+    """Колонка в компактном виде.
+
+    Целые и вещественные колонки без NULL хранятся в array (8 байт на
+    значение вместо объекта Python), остальные - списком, строки
+    интернируются: повторяющиеся значения хранятся один раз.
+    """
+    if values and all(type(value) is int for value in values):
+        try:
+            return array('q', values)
+        except OverflowError:
+            # Целые больше 64 бит
+            pass
+    elif values and all(type(value) is float for value in values):
+        return array('d', values)
+    return [sys.intern(value) if type(value) is str else value for value in values]
+
+
+def column_size(column):
+    """Примерный размер колонки в байтах (общие объекты считаются один раз)"""
+    size = sys.getsizeof(column)
+    if isinstance(column, array):
+        return size
+    seen = set()
+    for value in column:
+        if id(value) not in seen:
+            seen.add(id(value))
+            size += sys.getsizeof(value)
+    return size
+
+
+class CompactPage:
+    """Страница строк, хранимая по колонкам.
+
+    Совместима с Page из db_service: rows, offset, has_next; строка по
+    индексу собирается в кортеж при обращении.
+    """
+
+    __slots__ = ('columns', 'count', 'offset', 'has_next', 'size')
+
+    def __init__(self, rows, offset=0, has_next=False):
+        self.count = len(rows)
+        width = len(rows[0]) if rows else 0
+        self.columns = [pack_column([row[i] for row in rows]) for i in range(width)]
+        self.offset = offset
+        self.has_next = has_next
+        self.size = sys.getsizeof(self) + sys.getsizeof(self.columns) + \
+            sum(column_size(column) for column in self.columns)
+
+    @classmethod
+    def from_page(cls, page):
+        return cls(page.rows, page.offset, page.has_next)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        if not self.columns:
+            return iter([()] * self.count)
+        return zip(*self.columns)
+
+    def row(self, index):
+        """Строка по номеру на странице"""
+        return tuple(column[index] for column in self.columns)
+
+    @property
+    def rows(self):
+        return list(self)
+
+
+class RowCache:
+    """LRU-кэш страниц с потолком памяти.
+
+    Кэш действителен для одной версии данных (ConnectionManager.data_version):
+    при ее изменении validate() очищает все страницы.
+    """
+
+    def __init__(self, max_mb=DEFAULT_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._pages = OrderedDict()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def set_limit(self, max_mb):
+        """Новый потолок памяти, лишние страницы вытесняются сразу"""
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._evict()
+
+    def validate(self, version):
+        """Сбрасывает кэш, если версия данных изменилась"""
+        if version != self.version:
+            if self._pages:
+                logger.debug("Версия данных изменилась, сбрасываем кэш страниц (%s)", len(self._pages))
+            self.clear()
+            self.version = version
+
+    def get(self, key):
+        """Страница из кэша или None"""
+        page = self._pages.get(key)
+        if page is None:
+            self.misses += 1
+            return None
+        self._pages.move_to_end(key)
+        self.hits += 1
+        return page
+
+    def put(self, key, page):
+        """Кладет страницу; страницы больше потолка не кэшируются"""
+        if page.size > self.max_bytes:
+            return
+        old = self._pages.pop(key, None)
+        if old is not None:
+            self.size -= old.size
+        self._pages[key] = page
+        self.size += page.size
+        self._evict()
+
+    def clear(self):
+        self._pages.clear()
+        self.size = 0
+
+    def _evict(self):
+        while self._pages and self.size > self.max_bytes:
+            _, page = self._pages.popitem(last=False)
+            self.size -= page.size
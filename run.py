@@ -2,12 +2,20 @@
 # -*- coding: utf-8 -*-
 """
 Скрипт запуска SQLite Database Manager для AstraLinux
+
+    python3 run.py                      - графический интерфейс
+    python3 run.py --timing             - вывести время до первой отрисовки окна
+    python3 run.py --headless COMMAND   - консольный режим (см. cli.py)
 """
 
 import sys
 import os
+import time
+
+# Отсчет времени запуска для --timing
+PROCESS_START = time.perf_counter()
 
-def main():
+def main(timing=False):
     """Главная функция запуска"""
     print("=" * 60)
     print("SQLite Database Manager для AstraLinux")
@@ -62,9 +70,16 @@ def main():
         sys.path.insert(0, script_dir)
         
         # Импортируем и запускаем
+        import_start = time.perf_counter()
         from db_manager import DatabaseManager
         
+        ui_start = time.perf_counter()
         app = DatabaseManager()
+        ui_done = time.perf_counter()
+        
+        if timing:
+            report_startup_timing(app.root, import_start, ui_start, ui_done)
+        
         app.run()
         
         return 0
@@ -78,8 +93,33 @@ def main():
         print(f"   python3 {main_file}")
         return 1
 
+def report_startup_timing(root, import_start, ui_start, ui_done):
+    """Выводит время до первой отрисовки окна"""
+    def on_map(event):
+        if event.widget is not root:
+            return
+        root.unbind('<Map>', bind_id)
+        root.update_idletasks()
+        painted = time.perf_counter()
+        print("⏱  Время запуска:")
+        print(f"   проверки окружения:   {import_start - PROCESS_START:.3f} с")
+        print(f"   импорт db_manager:    {ui_start - import_start:.3f} с")
+        print(f"   создание интерфейса:  {ui_done - ui_start:.3f} с")
+        print(f"   до первой отрисовки:  {painted - PROCESS_START:.3f} с")
+    
+    bind_id = root.bind('<Map>', on_map, add='+')
+
+def headless_main(argv):
+    """Консольный режим: tkinter не импортируется"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from cli import main as cli_main
+    return cli_main(argv)
+
 if __name__ == "__main__":
-    exit_code = main()
+    if len(sys.argv) > 1 and sys.argv[1] == '--headless':
+        sys.exit(headless_main(sys.argv[2:]))
+    
+    exit_code = main(timing='--timing' in sys.argv[1:])
     if exit_code != 0:
         input("\nНажмите Enter для выхода...")
     sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище настроек SQLite Database Manager (JSON в каталоге конфигурации)
+"""
+
+import os
+import json
+import logging
+
+from db_connection import DEFAULT_PROFILE
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.settings')
+
+
+# Общие настройки по умолчанию
+DEFAULT_SETTINGS = {
+    'auto_backup': True,
+    'log_level': 'INFO',
+    'sql_trace': False,
+    'sql_trace_file': False,
+    'auto_refresh': True,
+    'row_cache_mb': 64,
+    'query_cache_mb': 32,
+    'backup_dir': os.path.join(os.path.expanduser("~"), "db_backups"),
+    'recent_files': [],
+    'databases': {},
+}
+
+# Настройки отдельной БД по умолчанию
+DEFAULT_DB_SETTINGS = {
+    'page_size': 1000,
+    'pragma_profile': DEFAULT_PROFILE,
+    'backup_keep': 10,
+    'search_mode': 'contains',
+}
+
+# Режимы поиска в таблице
+SEARCH_MODES = {
+    'contains': "Содержит",
+    'prefix': "Начинается с",
+    'exact': "Совпадает",
+}
+
+MAX_RECENT_FILES = 10
+
+
+def default_settings_path():
+    """Путь к файлу настроек в каталоге конфигурации пользователя"""
+    config_dir = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(config_dir, "db_manager", "settings.json")
+
+
+class SettingsStore:
+    """Настройки программы и отдельных БД, сохраняемые между запусками.
+
+    Файл читается при первом обращении, запись атомарная (через временный файл).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_settings_path()
+        self._data = None
+
+    @property
+    def data(self):
+        """Содержимое настроек, загружается лениво"""
+        if self._data is None:
+            self._data = self.load()
+        return self._data
+
+    def load(self):
+        """Читает файл настроек, при ошибке возвращает значения по умолчанию"""
+        data = json.loads(json.dumps(DEFAULT_SETTINGS))
+        if not os.path.exists(self.path):
+            return data
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if isinstance(stored, dict):
+                data.update(stored)
+            logger.info(f"Настройки загружены из {self.path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать настройки {self.path}: {e}")
+        return data
+
+    def save(self):
+        """Сохраняет настройки на диск"""
+        if self._data is None:
+            return
+        try:
+            settings_dir = os.path.dirname(self.path)
+            if not os.path.exists(settings_dir):
+                os.makedirs(settings_dir)
+
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            logger.debug(f"Настройки сохранены в {self.path}")
+        except OSError as e:
+            logger.error(f"Не удалось сохранить настройки {self.path}: {e}")
+
+    def get(self, key):
+        """Возвращает общую настройку"""
+        return self.data.get(key, DEFAULT_SETTINGS.get(key))
+
+    def set(self, key, value):
+        """Изменяет общую настройку"""
+        self.data[key] = value
+
+    def get_db(self, filename, key):
+        """Возвращает настройку отдельной БД"""
+        db_settings = self.data['databases'].get(os.path.abspath(filename), {})
+        return db_settings.get(key, DEFAULT_DB_SETTINGS[key])
+
+    def set_db(self, filename, key, value):
+        """Изменяет настройку отдельной БД"""
+        db_settings = self.data['databases'].setdefault(os.path.abspath(filename), {})
+        db_settings[key] = value
+
+    def add_recent_file(self, filename):
+        """Добавляет файл в начало списка недавних"""
+        filename = os.path.abspath(filename)
+        recent = [f for f in self.get('recent_files') if f != filename]
+        recent.insert(0, filename)
+        self.set('recent_files', recent[:MAX_RECENT_FILES])
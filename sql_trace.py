@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Трассировка SQL: какие запросы выполняет программа и сколько они длятся
+
+Текст запроса приходит из Connection.set_trace_callback в момент запуска
+оператора. Соединения открываются с фабрикой TracedConnection: ее execute,
+executemany, executescript, commit и rollback отмечают конец вызова, так что
+время короткого оператора - от запуска до возврата из вызова (или до запуска
+следующего оператора того же вызова, например после неявного BEGIN).
+SELECT продолжает выполняться при чтении строк курсора - это время
+добавляет обработчик прогресса SQLite (каждые PROGRESS_STEPS инструкций).
+
+executemany записывается в журнал одной записью с числом выполнений.
+"""
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import namedtuple, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Получаем логгер
+logger = logging.getLogger('db_manager.sql_trace')
+
+DEFAULT_CAPACITY = 5000
+PROGRESS_STEPS = 1000
+# Длинные запросы (например, с BLOB-литералами) обрезаются
+MAX_SQL_LENGTH = 2000
+
+TraceEntry = namedtuple('TraceEntry', 'timestamp connection sql seconds count')
+ShapeSummary = namedtuple('ShapeSummary', 'shape count total max')
+
+_STRING_RE = re.compile(r"[xX]?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(sql):
+    """Форма запроса: литералы заменены на ?, пробелы нормализованы"""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _LIST_RE.sub('(?, ...)', shape)
+    shape = _SPACE_RE.sub(' ', shape).strip()
+    return shape.rstrip(';').rstrip()
+
+
+def entry_suffix(entry):
+    """Пометка для записи executemany: число выполнений"""
+    return f" [×{entry.count}]" if entry.count != 1 else ""
+
+
+class ConnectionTrace:
+    """Состояние трассировки одного соединения"""
+
+    def __init__(self, tracer, label):
+        self.tracer = tracer
+        self.label = label
+        # [sql, время запуска, начало, последняя отметка, номер вызова, выполнений]
+        self.current = None
+        self._calls = 0
+        self._active_call = None
+        self._batch = None
+
+    def on_statement(self, sql):
+        """Колбэк set_trace_callback: запуск очередного оператора"""
+        now = time.perf_counter()
+        if self._batch is not None:
+            # Выполнения executemany (и неявный BEGIN) входят в одну запись
+            if sql.split(None, 1)[:1] == self._batch:
+                self.current[5] += 1
+            return
+        current = self.current
+        if current is not None and self._active_call is not None and current[4] == self._active_call:
+            # Предыдущий оператор того же вызова закончился, когда начался этот
+            current[3] = now
+        self.flush()
+        self.current = [sql, datetime.now(), now, now, self._active_call, 1]
+
+    @contextmanager
+    def call(self):
+        """Вызов execute / commit: после возврата оператор отмечается завершенным"""
+        self._calls += 1
+        call_id = self._active_call = self._calls
+        try:
+            yield
+        finally:
+            self._active_call = None
+            current = self.current
+            if current is not None and current[4] == call_id:
+                current[3] = time.perf_counter()
+
+    @contextmanager
+    def batch(self, sql):
+        """executemany: одна запись на все выполнения оператора"""
+        self.flush()
+        now = time.perf_counter()
+        self.current = [sql, datetime.now(), now, now, None, 0]
+        self._batch = sql.split(None, 1)[:1]
+        try:
+            yield
+        finally:
+            self._batch = None
+            self.current[3] = time.perf_counter()
+            self.flush()
+
+    def on_progress(self):
+        """Обработчик прогресса: отмечает, что оператор еще выполняется"""
+        current = self.current
+        if current is not None:
+            current[3] = time.perf_counter()
+        return 0
+
+    def flush(self):
+        """Записывает завершенный оператор в журнал"""
+        current = self.current
+        if current is None:
+            return
+        self.current = None
+        sql, timestamp, started, last_seen, _, count = current
+        self.tracer.add(TraceEntry(timestamp, self.label, sql[:MAX_SQL_LENGTH], last_seen - started, count))
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Курсор, сообщающий трассировке соединения о своих вызовах"""
+
+    def execute(self, sql, parameters=()):
+        trace = self.connection.trace
+        if trace is None:
+            return super().execute(sql, parameters)
+        with trace.call():
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        trace = self.connection.trace
+        if trace is None:
+            return super().executemany(sql, seq_of_parameters)
+        with trace.batch(sql):
+            return super().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        trace = self.connection.trace
+        if trace is None:
+            return super().executescript(script)
+        with trace.call():
+            return super().executescript(script)
+
+
+class TracedConnection(sqlite3.Connection):
+    """Фабрика соединений (sqlite3.connect(..., factory=TracedConnection)).
+
+    Пока трассировка не подключена (trace = None), вызовы идут напрямую.
+    """
+
+    trace = None
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute* в C не вызывают cursor(), поэтому повторены здесь
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        if self.trace is None:
+            return super().commit()
+        with self.trace.call():
+            return super().commit()
+
+    def rollback(self):
+        if self.trace is None:
+            return super().rollback()
+        with self.trace.call():
+            return super().rollback()
+
+
+class SQLTracer:
+    """Кольцевой буфер выполненных запросов с необязательной записью в файл"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, path=None):
+        self.entries = deque(maxlen=capacity)
+        self.path = None
+        self._file = None
+        self._attached = {}
+        self._lock = threading.Lock()
+        if path:
+            self.set_file(path)
+
+    def attach(self, connection, label):
+        """Включает трассировку соединения"""
+        trace = ConnectionTrace(self, label)
+        connection.set_trace_callback(trace.on_statement)
+        connection.set_progress_handler(trace.on_progress, PROGRESS_STEPS)
+        if isinstance(connection, TracedConnection):
+            connection.trace = trace
+        with self._lock:
+            self._attached[id(connection)] = trace
+        return trace
+
+    def trace_for(self, connection):
+        """ConnectionTrace соединения или None, если трассировка не подключена"""
+        with self._lock:
+            return self._attached.get(id(connection))
+    
+    def detach(self, connection):
+        """Отключает трассировку соединения"""
+        with self._lock:
+            trace = self._attached.pop(id(connection), None)
+        if trace is None:
+            return
+        trace.flush()
+        if isinstance(connection, TracedConnection):
+            connection.trace = None
+        try:
+            connection.set_trace_callback(None)
+            connection.set_progress_handler(None, 0)
+        except Exception:
+            # Соединение уже закрыто
+            pass
+
+    def flush(self):
+        """Записывает последние операторы всех соединений"""
+        with self._lock:
+            traces = list(self._attached.values())
+        for trace in traces:
+            trace.flush()
+
+    def add(self, entry):
+        self.entries.append(entry)
+        if self._file is not None:
+            with self._lock:
+                try:
+                    self._file.write(f"{entry.timestamp.isoformat(sep=' ', timespec='milliseconds')}\t"
+                                     f"{entry.connection}\t{entry.seconds * 1000:.3f} мс\t"
+                                     f"{_SPACE_RE.sub(' ', entry.sql)}{entry_suffix(entry)}\n")
+                    self._file.flush()
+                except (OSError, ValueError) as e:
+                    logger.error(f"Ошибка записи трассировки SQL в {self.path}: {e}")
+                    self._file = None
+
+    def set_file(self, path):
+        """Включает запись в файл (path=None - отключает)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            if path:
+                try:
+                    self._file = open(path, 'a', encoding='utf-8')
+                except OSError as e:
+                    logger.error(f"Не удалось открыть файл трассировки SQL {path}: {e}")
+                    self.path = None
+
+    def close(self):
+        self.flush()
+        self.set_file(None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def recent(self):
+        """Записи журнала, новые последними"""
+        self.flush()
+        return list(self.entries)
+
+    def summary(self):
+        """Группировка по форме запроса, самые затратные первыми"""
+        groups = {}
+        for entry in self.recent():
+            shape = statement_shape(entry.sql)
+            count, total, longest = groups.get(shape, (0, 0.0, 0.0))
+            groups[shape] = (count + entry.count, total + entry.seconds, max(longest, entry.seconds))
+        result = [ShapeSummary(shape, count, total, longest)
+                  for shape, (count, total, longest) in groups.items()]
+        return sorted(result, key=lambda item: (item.total, item.count), reverse=True)
+
+
+# Общий трассировщик приложения
+sql_tracer = SQLTracer()
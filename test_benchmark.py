@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест генератора синтетических БД и набора замеров
+"""
+
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import tempfile
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark
+
+
+def table_digest(path):
+    conn = sqlite3.connect(path)
+    digest = hashlib.sha1()
+    for row in conn.execute(f"SELECT * FROM {benchmark.TABLE_NAME} ORDER BY id"):
+        digest.update(repr(row).encode('utf-8'))
+    conn.close()
+    return digest.hexdigest()
+
+
+def test_generator_is_deterministic():
+    """Одинаковый seed дает одинаковые данные"""
+    print("🔧 Тестирование детерминированности генератора...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for shape in benchmark.SHAPES:
+            first = benchmark.generate_database(os.path.join(tmp, f"a_{shape}.db"), shape, 300)
+            second = benchmark.generate_database(os.path.join(tmp, f"b_{shape}.db"), shape, 300)
+            assert table_digest(first) == table_digest(second), shape
+
+            conn = sqlite3.connect(first)
+            count = conn.execute(f"SELECT COUNT(*) FROM {benchmark.TABLE_NAME}").fetchone()[0]
+            conn.close()
+            assert count == 300
+    print("✅ Генератор детерминирован")
+
+
+def test_run_benchmarks_report():
+    """Отчет содержит все операции для каждой формы таблицы"""
+    print("🔧 Тестирование отчета замеров...")
+    operations = {'open', 'table_list', 'grid_load', 'grid_load_deep', 'search',
+                  'edit', 'delete', 'backup', 'export', 'import'}
+    with tempfile.TemporaryDirectory() as tmp:
+        report = benchmark.run_benchmarks([200], ['narrow', 'blob'], tmp, repeat=2)
+        json.dumps(report, ensure_ascii=False)
+
+        for shape in ('narrow', 'blob'):
+            found = {r['operation'] for r in report['results'] if r['shape'] == shape}
+            assert found == operations, found
+        assert all(len(r['seconds']) == 2 for r in report['results'])
+
+        lines = benchmark.compare_reports(report, report)
+        assert len(lines) == len(report['results'])
+    print("✅ Отчет замеров корректен")
+
+
+def test_keep_db_reuse():
+    """--keep-db: замеры не меняют данные, а испорченная БД создается заново"""
+    print("🔧 Тестирование переиспользования баз...")
+    with tempfile.TemporaryDirectory() as tmp:
+        benchmark.run_benchmarks([200], ['narrow'], tmp, repeat=2, keep_db=True)
+        path = os.path.join(tmp, "bench_narrow_200.db")
+        generated = os.path.join(tmp, "generated.db")
+        benchmark.generate_database(generated, 'narrow', 200)
+        assert table_digest(path) == table_digest(generated)
+        assert benchmark.database_intact(path, 200)
+
+        # Прерванный прогон мог оставить БД без изменяемой строки
+        conn = sqlite3.connect(path)
+        conn.execute(f"DELETE FROM {benchmark.TABLE_NAME} WHERE id = ?", (benchmark.target_rowid(200),))
+        conn.commit()
+        conn.close()
+        assert not benchmark.database_intact(path, 200)
+
+        report = benchmark.run_benchmarks([200], ['narrow'], tmp, repeat=2, keep_db=True)
+        operations = {r['operation'] for r in report['results']}
+        assert {'edit', 'delete'} <= operations, operations
+        assert table_digest(path) == table_digest(generated)
+    print("✅ Базы переиспользуются без потери замеров")
+
+
+def test_parse_rows():
+    assert benchmark.parse_rows('10k') == 10000
+    assert benchmark.parse_rows('1M') == 1000000
+    assert benchmark.parse_rows('2500') == 2500
+
+
+if __name__ == "__main__":
+    test_generator_is_deterministic()
+    test_run_benchmarks_report()
+    test_keep_db_reuse()
+    test_parse_rows()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест обнаружения изменений БД другими программами
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+from change_monitor import ChangeMonitor, ChangeState
+
+
+def external_write(db_path, sql):
+    other = sqlite3.connect(db_path)
+    other.execute(sql)
+    other.commit()
+    other.close()
+
+
+def test_change_monitor():
+    """Внешние изменения обнаруживаются, собственные - нет, в простое SQL не выполняется"""
+    print("🔧 Тестирование обнаружения внешних изменений...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'watched.db')
+        manager = ConnectionManager(db_path)
+        manager.writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        manager.writer.commit()
+
+        monitor = ChangeMonitor(manager)
+        statements = []
+        manager.writer.set_trace_callback(statements.append)
+
+        # Простой: только os.stat, без запросов к БД
+        for _ in range(5):
+            assert monitor.check() is None
+        assert statements == []
+
+        # Собственная запись программы изменением не считается
+        manager.writer.execute("INSERT INTO items (name) VALUES ('свое')")
+        manager.writer.commit()
+        assert monitor.check() is None
+
+        external_write(db_path, "INSERT INTO items (name) VALUES ('чужое')")
+        assert monitor.check() == ChangeState(True, False)
+        assert monitor.check() is None
+
+        external_write(db_path, "CREATE TABLE other (id INTEGER)")
+        assert monitor.check() == ChangeState(True, True)
+
+        # Запись программы через фоновое соединение подтверждается явно
+        with manager.background_writer() as connection:
+            connection.execute("INSERT INTO other VALUES (1)")
+            connection.commit()
+        monitor.acknowledge()
+        assert monitor.check() is None
+
+        manager.writer.set_trace_callback(None)
+        manager.close()
+    print("✅ Внешние изменения обнаруживаются")
+
+
+if __name__ == "__main__":
+    test_change_monitor()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест консольного режима (run.py --headless)
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import shutil
+import subprocess
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_PY = os.path.join(SCRIPT_DIR, "run.py")
+
+
+def run_headless(*args):
+    """Запускает run.py --headless и разбирает JSON ответ"""
+    env = dict(os.environ, XDG_CONFIG_HOME=os.path.join(tempfile.gettempdir(), "db_manager_cli_test"))
+    result = subprocess.run([sys.executable, RUN_PY, '--headless'] + list(args),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                            universal_newlines=True)
+    return result.returncode, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_headless_commands():
+    """Проверяем export, import, backup, vacuum и analyze без GUI"""
+    print("🔧 Тестирование консольного режима...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, "source.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}",) for i in range(100)])
+        conn.commit()
+        conn.close()
+
+        sql_path = os.path.join(test_dir, "dump.sql")
+        code, report = run_headless('export', db_path, sql_path)
+        assert code == 0 and report['status'] == 'ok', report
+        assert 'seconds' in report and report['lines'] > 100
+        print(f"   ✅ export: {report['seconds']} с")
+
+        copy_path = os.path.join(test_dir, "copy.db")
+        code, report = run_headless('import', copy_path, sql_path)
+        assert code == 0, report
+        conn = sqlite3.connect(copy_path)
+        count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        conn.close()
+        assert count == 100, f"После импорта {count} записей"
+        print(f"   ✅ import: {report['seconds']} с")
+
+        backup_dir = os.path.join(test_dir, "backups")
+        code, report = run_headless('backup', db_path, '--backup-dir', backup_dir, '--keep', '1')
+        assert code == 0 and os.path.exists(report['destination']), report
+        assert not report['skipped']
+        code, report = run_headless('backup', db_path, '--backup-dir', backup_dir, '--keep', '1')
+        assert code == 0 and report['skipped'] and os.path.exists(report['destination']), report
+        print(f"   ✅ backup: {report['seconds']} с, повторный пропущен")
+        
+        compact_path = os.path.join(test_dir, "compact.db")
+        code, report = run_headless('backup', db_path, compact_path, '--compact')
+        assert code == 0 and report['bytes'] == os.path.getsize(compact_path), report
+        print(f"   ✅ backup --compact: {report['seconds']} с")
+
+        for command in ('vacuum', 'analyze'):
+            code, report = run_headless(command, db_path)
+            assert code == 0 and report['status'] == 'ok', report
+            if command == 'vacuum':
+                assert report['bytes_reclaimed'] == report['bytes_before'] - report['bytes_after']
+            print(f"   ✅ {command}: {report['seconds']} с")
+
+        code, report = run_headless('vacuum', os.path.join(test_dir, "missing.db"))
+        assert code == 1 and report['status'] == 'error'
+        print("   ✅ Ошибка возвращается в JSON с кодом 1")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_no_tkinter_import():
+    """Консольный режим не должен импортировать tkinter"""
+    print("🔧 Проверка отсутствия импорта tkinter...")
+
+    code = "import sys; sys.path.insert(0, %r); import cli; print('tkinter' in sys.modules)" % SCRIPT_DIR
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE,
+                            universal_newlines=True)
+    assert result.stdout.strip() == 'False', "cli импортирует tkinter"
+    print("   ✅ tkinter не импортируется")
+
+
+if __name__ == "__main__":
+    test_headless_commands()
+    test_no_tkinter_import()
+    print("\n🎯 Тест консольного режима завершен")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест профилей соединения PRAGMA
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import shutil
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import connect, checkpoint, apply_pragma_profile, PRAGMA_PROFILES, ConnectionManager
+
+
+def test_pragma_profiles():
+    """Проверяем, что каждый профиль применяется к соединению"""
+    print("🔧 Тестирование профилей соединения...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        for profile, pragmas in PRAGMA_PROFILES.items():
+            db_path = os.path.join(test_dir, f"{profile.replace(' ', '_')}.db")
+            conn = connect(db_path, profile)
+
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            assert journal_mode == 'wal', f"{profile}: journal_mode={journal_mode}"
+
+            expected = dict(pragmas)
+            cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+            assert cache_size == expected['cache_size'], f"{profile}: cache_size={cache_size}"
+
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+            assert busy_timeout == expected['busy_timeout'], f"{profile}: busy_timeout={busy_timeout}"
+
+            print(f"   ✅ Профиль '{profile}' применен")
+            conn.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_checkpoint_before_copy():
+    """Проверяем, что после checkpoint копия файла содержит все данные"""
+    print("🔧 Тестирование checkpoint перед копированием...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, "source.db")
+        copy_path = os.path.join(test_dir, "copy.db")
+
+        conn = connect(db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO items (name) VALUES (?)", [("a",), ("b",), ("c",)])
+        conn.commit()
+
+        checkpoint(conn)
+        shutil.copy2(db_path, copy_path)
+        conn.close()
+
+        copy_conn = connect(copy_path)
+        count = copy_conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        copy_conn.close()
+
+        assert count == 3, f"В копии {count} записей вместо 3"
+        print("   ✅ Копия содержит все записи")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_reader_pool():
+    """Проверяем, что читатели не блокируются открытой транзакцией записи"""
+    print("🔧 Тестирование пула читателей...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        # Символы, которые нужно экранировать в URI mode=ro
+        db_path = os.path.join(test_dir, "пул #1 50%.db")
+        manager = ConnectionManager(db_path, pool_size=2)
+        writer = manager.writer
+        writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        writer.execute("INSERT INTO items (name) VALUES ('committed')")
+        writer.commit()
+
+        # Незавершенная транзакция записи
+        writer.execute("INSERT INTO items (name) VALUES ('pending')")
+        assert writer.in_transaction
+
+        with manager.reader() as reader:
+            count = reader.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            assert count == 1, f"Читатель видит {count} записей вместо 1"
+            print("   ✅ Читатель не заблокирован писателем")
+
+            try:
+                reader.execute("INSERT INTO items (name) VALUES ('ro')")
+                assert False, "Читатель смог выполнить запись"
+            except sqlite3.OperationalError:
+                print("   ✅ Читатель открыт только для чтения")
+
+        writer.commit()
+
+        # Профиль читателя запрещает запись и без URI mode=ro
+        plain = sqlite3.connect(db_path)
+        for profile in PRAGMA_PROFILES:
+            apply_pragma_profile(plain, profile, read_only=True)
+            assert plain.execute("PRAGMA query_only").fetchone()[0] == 1
+            try:
+                plain.execute("INSERT INTO items (name) VALUES ('plain')")
+                assert False, f"Читатель с профилем {profile} смог выполнить запись"
+            except sqlite3.OperationalError:
+                pass
+        plain.close()
+        print("   ✅ query_only в профиле читателя")
+
+        # Пул переиспользует соединения и не превышает лимит
+        first = manager.acquire_reader()
+        second = manager.acquire_reader()
+        manager.release_reader(first)
+        third = manager.acquire_reader()
+        assert third is first, "Соединение не вернулось в пул"
+        manager.release_reader(second)
+        manager.release_reader(third)
+        print("   ✅ Пул переиспользует соединения")
+
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    test_pragma_profiles()
+    test_checkpoint_before_copy()
+    test_reader_pool()
+    print("\n🎯 Тест профилей соединения завершен")
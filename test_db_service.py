@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест слоя DatabaseService без графического интерфейса
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+import shutil
+import threading
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+from db_service import (DatabaseService, FieldSpec, ColumnFilter, build_create_table_sql,
+                        build_search_condition, build_filter_condition, build_order_clause,
+                        combine_conditions, quote_identifier, build_preview_select, LargeValue,
+                        import_blob, database_fingerprint, read_fingerprint, fingerprint_path,
+                        latest_auto_backup, cleanup_old_backups, backup_database)
+
+
+def test_create_table_sql():
+    """Проверяем генерацию CREATE TABLE"""
+    print("🔧 Тестирование генерации CREATE TABLE...")
+
+    sql = build_create_table_sql('users', [
+        FieldSpec('id', 'INTEGER', False, '', True),
+        FieldSpec('name', 'TEXT', False, '', False),
+        FieldSpec('city', 'TEXT', True, "O'Hare", False),
+        FieldSpec('age', 'INTEGER', True, 0, False),
+    ])
+    assert '"id" INTEGER PRIMARY KEY AUTOINCREMENT' in sql
+    assert '"name" TEXT NOT NULL' in sql
+    assert "DEFAULT 'O''Hare'" in sql
+    assert '"age" INTEGER DEFAULT 0' in sql
+    print("   ✅ Одиночный первичный ключ")
+
+    sql = build_create_table_sql('products', [
+        FieldSpec('category_id', 'INTEGER', False, '', True),
+        FieldSpec('product_id', 'INTEGER', False, '', True),
+        FieldSpec('price', 'REAL', False, '0.0', False),
+    ])
+    assert 'PRIMARY KEY ("category_id", "product_id")' in sql
+    assert sql.count('PRIMARY KEY') == 1
+    sqlite3.connect(':memory:').execute(sql)
+    print("   ✅ Составной первичный ключ")
+
+    assert quote_identifier('a"b') == '"a""b"'
+
+
+def test_record_crud():
+    """Проверяем добавление, изменение, удаление и чтение записей"""
+    print("🔧 Тестирование операций с записями...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "crud.db"))
+        service = DatabaseService(manager.writer, manager)
+        service.create_table('people', [
+            FieldSpec('id', 'INTEGER', False, '', True),
+            FieldSpec('name', 'TEXT', False, '', False),
+            FieldSpec('note', 'TEXT', True, '', False),
+        ])
+        assert 'people' in service.list_tables()
+        assert [c.name for c in service.table_columns('people')] == ['id', 'name', 'note']
+
+        for name in ('Иван', 'Мария', 'Пётр'):
+            service.insert_record('people', {'name': name, 'note': None})
+
+        changed = service.update_record('people', [2, 'Мария', None],
+                                        {'id': 2, 'name': 'Мария', 'note': 'изменено'})
+        assert changed == 1
+        deleted = service.delete_record('people', [3, 'Пётр', None])
+        assert deleted == 1
+
+        rows = list(service.iter_rows('people', batch_size=1))
+        assert rows == [(1, 'Иван', None), (2, 'Мария', 'изменено')], rows
+        print("   ✅ INSERT / UPDATE / DELETE")
+
+        where, params = build_search_condition(['name', 'note'], 'МАР')
+        page = service.fetch_page('people', where, params, limit=10)
+        assert [row[1] for row in page.rows] == ['Мария'] and not page.has_next
+        print("   ✅ Поиск без учета регистра для кириллицы")
+
+        page = service.fetch_page('people', limit=1)
+        assert len(page.rows) == 1 and page.has_next
+
+        result = service.execute_query("SELECT COUNT(*) AS total FROM people", read_only=True)
+        assert result.columns == ['total'] and result.rows == [(2,)]
+        print("   ✅ Постраничное чтение и запросы через читателя")
+
+        structure = service.table_structure('people')
+        assert structure.sql.startswith('CREATE TABLE')
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_sorted_pages():
+    """Сортировка на стороне SQLite и предупреждение о временном B-tree"""
+    print("🔧 Тестирование сортировки...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "sort.db"))
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, price REAL, name TEXT)")
+        manager.writer.execute("CREATE INDEX idx_items_price ON items (price)")
+        manager.writer.executemany("INSERT INTO items (price, name) VALUES (?, ?)",
+                                   [((i * 37) % 100, f"item {i}") for i in range(100)])
+        manager.writer.commit()
+
+        assert build_order_clause(None) == ""
+        assert build_order_clause('price', True) == ' ORDER BY "price" DESC'
+
+        page = service.fetch_page('items', limit=3, order_clause=build_order_clause('price', True))
+        assert [row[1] for row in page.rows] == [99, 98, 97] and page.has_next
+        page = service.fetch_page('items', limit=3, offset=3, order_clause=build_order_clause('price'))
+        assert [row[1] for row in page.rows] == [3, 4, 5]
+
+        # По индексированной колонке сортировка без временного B-tree
+        plan = service.sort_plan('items', build_order_clause('price'))
+        assert not plan.temp_btree, plan.details
+        plan = service.sort_plan('items', build_order_clause('name', True))
+        assert plan.temp_btree and plan.estimated_rows == 100, plan
+
+        # Грид выбирает сокращенные значения под именами колонок: сортировка
+        # должна идти по колонке таблицы и по индексу, а не по псевдониму
+        select_sql = build_preview_select(service.table_columns('items'), max_chars=10)
+        order_clause = build_order_clause('name', table_name='items')
+        assert order_clause == ' ORDER BY "items"."name"'
+        assert service.sort_plan('items', order_clause, with_rowid=True, select_sql=select_sql).temp_btree
+        manager.writer.execute("CREATE INDEX idx_items_name ON items (name)")
+        manager.writer.execute("INSERT INTO items (price, name) VALUES (1, ?)", ("a" + "z" * 200,))
+        manager.writer.execute("INSERT INTO items (price, name) VALUES (1, ?)", ("a" + "y" * 200,))
+        manager.writer.commit()
+        details = [row[-1] for row in manager.writer.execute(
+            f"EXPLAIN QUERY PLAN SELECT rowid, {select_sql} FROM items{order_clause} LIMIT 3")]
+        assert not any('TEMP B-TREE' in detail for detail in details), details
+        assert any('idx_items_name' in detail for detail in details), details
+        # Читатели пула видят новый индекс, хотя тот же план строился до него
+        assert not service.sort_plan('items', order_clause, with_rowid=True, select_sql=select_sql).temp_btree
+        # План строится по запросу грида: сортировка по псевдониму видна как временный B-tree
+        plan = service.sort_plan('items', build_order_clause('name'), with_rowid=True, select_sql=select_sql)
+        assert plan.temp_btree, plan.details
+        page = service.fetch_page('items', limit=2, order_clause=order_clause, select_sql=select_sql)
+        assert [row[2] for row in page.rows] == ["a" + "y" * 9 + "…", "a" + "z" * 9 + "…"]
+        
+        manager.writer.execute("ANALYZE")
+        manager.writer.commit()
+        assert service.estimate_row_count('items') == 102
+        print("   ✅ ORDER BY через постраничную загрузку")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_metadata_with_busy_pool():
+    """Запросы к схеме из UI-потока не ждут читателя, когда пул занят фоном"""
+    print("🔧 Тестирование метаданных при занятом пуле...")
+    
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "busy.db"), pool_size=2)
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        manager.writer.execute("CREATE TABLE codes (code TEXT PRIMARY KEY) WITHOUT ROWID")
+        manager.writer.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}",) for i in range(50)])
+        manager.writer.commit()
+        
+        # Фоновые задачи держат всех читателей; при ошибке они вернутся через 3 с,
+        # и тест упадет по времени, а не зависнет
+        readers = [manager.acquire_reader() for _ in range(manager.pool_size)]
+        
+        def release_readers():
+            while readers:
+                manager.release_reader(readers.pop())
+        
+        release = threading.Timer(3, release_readers)
+        release.start()
+        started = time.perf_counter()
+        assert service.has_rowid('items') and not service.has_rowid('codes')
+        assert service.estimate_row_count('items') == 50
+        where, params = build_search_condition(['name'], 'item 1')
+        assert service.sort_plan('items', build_order_clause('name', table_name='items'),
+                                 where, params).temp_btree
+        elapsed = time.perf_counter() - started
+        release.cancel()
+        release.join()
+        release_readers()
+        assert elapsed < 1, elapsed
+        print("   ✅ Пул не нужен для схемы и планов")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_column_filters():
+    """Фильтры по колонкам компилируются в параметризованный WHERE"""
+    print("🔧 Тестирование фильтров по колонкам...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "filters.db"))
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, "
+                               "amount REAL, created TEXT, note TEXT)")
+        manager.writer.execute("CREATE INDEX idx_orders_customer ON orders (customer_id)")
+        manager.writer.executemany(
+            "INSERT INTO orders (customer_id, amount, created, note) VALUES (?, ?, ?, ?)",
+            [(i % 10, i * 1.5, f"2024-01-{i % 28 + 1:02d} 12:00:00", None if i % 3 else "срочно")
+             for i in range(100)])
+        manager.writer.commit()
+        types = {col.name: col.type for col in service.table_columns('orders')}
+
+        def select(*filters):
+            where, params = build_filter_condition(filters, types)
+            return service.fetch_page('orders', where, params, limit=1000).rows
+
+        where, params = build_filter_condition([ColumnFilter('customer_id', 'eq', '7', '')], types)
+        assert where == ' WHERE "customer_id" = ?' and params == [7]
+        assert len(select(ColumnFilter('customer_id', 'eq', '7', ''))) == 10
+
+        plan = service.execute_query(f"EXPLAIN QUERY PLAN SELECT * FROM orders{where}".replace('?', '7'),
+                                     read_only=True)
+        assert any('idx_orders_customer' in row[-1] for row in plan.rows), plan.rows
+
+        assert len(select(ColumnFilter('amount', 'between', '15', '30'))) == 11
+        assert len(select(ColumnFilter('customer_id', 'in', '1, 2,3', ''))) == 30
+        assert len(select(ColumnFilter('note', 'null', '', ''))) == 66
+        assert len(select(ColumnFilter('note', 'not_null', '', ''),
+                          ColumnFilter('customer_id', 'eq', '0', ''))) == 4
+        assert len(select(ColumnFilter('note', 'like', 'сроч%', ''))) == 34
+        # Конец диапазона дат включительно, даже если в значении есть время
+        assert len(select(ColumnFilter('created', 'date_between', '2024-01-27', '2024-01-28'))) == 6
+
+        for bad in (ColumnFilter('amount', 'gt', '', ''),
+                    ColumnFilter('created', 'date_between', '27.01.2024', ''),
+                    ColumnFilter('note', 'in', ' , ', '')):
+            try:
+                build_filter_condition([bad], types)
+                assert False, bad
+            except ValueError:
+                pass
+
+        # Поиск и фильтры объединяются через AND
+        where, params = combine_conditions(build_search_condition(['note'], 'СРОЧНО'),
+                                           build_filter_condition([ColumnFilter('customer_id', 'lt', '5', '')], types))
+        assert where.startswith(' WHERE (') and ') AND (' in where
+        assert len(service.fetch_page('orders', where, params, limit=1000).rows) == 17
+        print("   ✅ =, между, в списке, пусто, LIKE, диапазон дат")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_table_overview():
+    """Оценки числа строк, размеры таблиц и версия данных для кэша точных COUNT(*)"""
+    print("🔧 Тестирование сводки по таблицам...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, "overview.db")
+        manager = ConnectionManager(db_path)
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE big (id INTEGER PRIMARY KEY, payload TEXT)")
+        manager.writer.execute("CREATE INDEX idx_big_payload ON big (payload)")
+        manager.writer.execute("CREATE TABLE small (code TEXT PRIMARY KEY, value INTEGER) WITHOUT ROWID")
+        manager.writer.executemany("INSERT INTO big (payload) VALUES (?)", [("x" * 200,)] * 2000)
+        manager.writer.executemany("INSERT INTO small VALUES (?, ?)", [(str(i), i) for i in range(5)])
+        manager.writer.commit()
+
+        overview = {info.name: info for info in service.table_overview()}
+        assert overview['big'].estimated_rows == 2000
+        # WITHOUT ROWID без ANALYZE оценить нельзя
+        assert overview['small'].estimated_rows is None
+        assert overview['big'].size > overview['small'].size > 0
+        assert service.count_rows('small') == 5
+
+        # Явные разреженные ключи: диапазон rowid не влезает в файл - оценки нет,
+        # а после ANALYZE берется sqlite_stat1
+        manager.writer.execute("CREATE TABLE hashed (id INTEGER PRIMARY KEY, value TEXT)")
+        manager.writer.executemany("INSERT INTO hashed VALUES (?, 'x')", [(-2 ** 62,), (7,), (2 ** 62,)])
+        manager.writer.commit()
+        assert service.estimate_row_count('hashed') is None
+        manager.writer.execute("ANALYZE hashed")
+        manager.writer.commit()
+        assert service.estimate_row_count('hashed') == 3
+
+        # Частичный индекс покрывает часть строк - оценка по всей таблице
+        manager.writer.execute("CREATE INDEX idx_big_short ON big (id) WHERE id <= 10")
+        manager.writer.execute("ANALYZE big")
+        manager.writer.commit()
+        stats = manager.writer.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = 'big'").fetchall()
+        assert ('idx_big_short', '10 1') in stats, stats
+        assert service.estimate_row_count('big') == 2000
+
+        version = manager.data_version()
+        assert manager.data_version() == version
+        manager.writer.execute("DELETE FROM big WHERE id > 1000")
+        manager.writer.commit()
+        assert manager.data_version() != version
+
+        # Изменения из другого соединения тоже меняют версию
+        version = manager.data_version()
+        other = sqlite3.connect(db_path)
+        other.execute("INSERT INTO small VALUES ('x', 1)")
+        other.commit()
+        other.close()
+        assert manager.data_version() != version
+        assert service.count_rows('small') == 6
+        print("   ✅ Оценки, размеры и data_version")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_rowid_records():
+    """Правка и удаление по rowid, строки страницы с rowid"""
+    print("🔧 Тестирование правки записей по rowid...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "rowid.db"))
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE notes (title TEXT, price REAL)")
+        manager.writer.execute("CREATE TABLE codes (code TEXT PRIMARY KEY, value INTEGER) WITHOUT ROWID")
+        manager.writer.commit()
+        assert service.has_rowid('notes')
+        assert not service.has_rowid('codes')
+
+        # Одинаковые строки различаются только rowid
+        rowids = [service.insert_record('notes', {'title': 'дубль', 'price': 0.1})
+                  for _ in range(3)]
+        assert service.update_record_by_rowid('notes', rowids[1], {'title': 'второй', 'price': 2.5}) == 1
+        assert service.fetch_row('notes', rowids[1]) == ('второй', 2.5)
+        assert service.fetch_row('notes', 999) is None
+
+        page = service.fetch_page('notes', limit=10, with_rowid=True)
+        assert [row[0] for row in page.rows] == rowids
+        assert page.rows[1][1:] == ('второй', 2.5)
+
+        assert service.delete_records_by_rowid('notes', [rowids[0], rowids[2], 999]) == 2
+        assert service.fetch_page('notes', limit=10).rows == [('второй', 2.5)]
+        print("   ✅ UPDATE / DELETE по rowid")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_large_values():
+    """Сокращенные значения в гриде, LargeValue в редакторе, чтение BLOB блоками"""
+    print("🔧 Тестирование больших значений...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "large.db"))
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, name TEXT, body TEXT, data BLOB)")
+        payload = bytes(range(256)) * 4096
+        rowid = service.insert_record('files', {'name': 'архив', 'body': 'я' * 20000, 'data': payload})
+        columns = service.table_columns('files')
+
+        select_sql = build_preview_select(columns, max_chars=10)
+        page = service.fetch_page('files', limit=10, with_rowid=True, select_sql=select_sql)
+        assert page.rows == [(rowid, rowid, 'архив', 'я' * 10 + '…', f'[BLOB, {len(payload)} байт]')], page.rows
+
+        values = service.fetch_row_for_edit('files', rowid)
+        assert values == [rowid, 'архив', LargeValue('text', 20000), LargeValue('blob', len(payload))]
+        assert service.fetch_value('files', 'body', rowid) == 'я' * 20000
+
+        # Изменение без больших колонок их не трогает
+        service.update_record_by_rowid('files', rowid, {'id': rowid, 'name': 'новое'})
+        assert service.fetch_value('files', 'data', rowid) == payload
+
+        chunks = list(service.iter_blob('files', 'data', rowid, chunk_size=100000))
+        assert len(chunks) == 11 and b''.join(chunks) == payload
+        assert service.read_blob('files', 'data', rowid, 4, offset=256) == bytes(range(4))
+
+        # Текст и BLOB в числовых колонках тоже сокращаются, числа остаются числами
+        manager.writer.execute("CREATE TABLE mixed (id INTEGER PRIMARY KEY, amount REAL, code INTEGER)")
+        manager.writer.executemany("INSERT INTO mixed (amount, code) VALUES (?, ?)",
+                                   [(1.5, 42), ('x' * 50, payload)])
+        manager.writer.commit()
+        select_sql = build_preview_select(service.table_columns('mixed'), max_chars=10)
+        page = service.fetch_page('mixed', limit=10, select_sql=select_sql)
+        assert page.rows == [(1, 1.5, 42), (2, 'x' * 10 + '…', f'[BLOB, {len(payload)} байт]')], page.rows
+        print("   ✅ BLOB и длинный текст загружаются по запросу")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_blob_files():
+    """BLOB из файла и в файл блоками через отдельное соединение"""
+    print("🔧 Тестирование загрузки BLOB из файла...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        manager = ConnectionManager(os.path.join(test_dir, "blobs.db"))
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, name TEXT, data BLOB)")
+        rowid = service.insert_record('files', {'name': 'отчет', 'data': None})
+
+        source = os.path.join(test_dir, "source.bin")
+        payload = os.urandom(3 * 1024 * 1024 + 17)
+        with open(source, 'wb') as f:
+            f.write(payload)
+
+        # Фоновое соединение открывается в рабочем потоке
+        result = []
+
+        def worker():
+            with manager.background_writer('blob') as connection:
+                result.append(import_blob(connection, 'files', 'data', rowid, source, chunk_size=65536))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert result == [len(payload)]
+        assert service.fetch_row_for_edit('files', rowid)[2] == LargeValue('blob', len(payload))
+
+        target = os.path.join(test_dir, "target.bin")
+        assert service.export_blob('files', 'data', rowid, target) == len(payload)
+        with open(target, 'rb') as f:
+            assert f.read() == payload
+
+        # Несуществующая запись - ошибка, данные не меняются
+        try:
+            service.import_blob('files', 'data', 999, source)
+            assert False, "Ожидалась ошибка"
+        except ValueError:
+            pass
+        print("   ✅ BLOB записан и прочитан блоками")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_auto_backup_fingerprint():
+    """Автобэкап пропускается, пока отпечаток БД совпадает с последней копией"""
+    print("🔧 Тестирование пропуска лишних автобэкапов...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, "shop.db")
+        backup_dir = os.path.join(test_dir, "backups")
+        os.makedirs(backup_dir)
+        manager = ConnectionManager(db_path)
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE goods (id INTEGER PRIMARY KEY, name TEXT)")
+        manager.writer.executemany("INSERT INTO goods (name) VALUES (?)", [(f"товар {i}",) for i in range(5000)])
+        manager.writer.commit()
+
+        first = service.auto_backup(db_path, backup_dir)
+        assert first and os.path.exists(first)
+        assert read_fingerprint(first) == database_fingerprint(db_path)
+        assert service.auto_backup(db_path, backup_dir) is None
+
+        # Изменение данных дает новую копию
+        service.insert_record('goods', {'name': 'новый'})
+        older = os.path.join(backup_dir, "shop_auto_20000101_000000.db")
+        os.rename(first, older)
+        os.rename(fingerprint_path(first), fingerprint_path(older))
+        second = service.auto_backup(db_path, backup_dir)
+        assert second and read_fingerprint(second) != read_fingerprint(older)
+        assert latest_auto_backup(backup_dir, 'shop') == second
+
+        removed = cleanup_old_backups(backup_dir, 'shop', 1)
+        assert len(removed) == 1 and sorted(os.listdir(backup_dir)) == sorted(
+            [os.path.basename(second), os.path.basename(fingerprint_path(second))])
+
+        # Правка, пока читатель не дает выполнить checkpoint: основной файл
+        # не меняется, новые данные только в WAL - копия все равно нужна
+        with manager.reader() as reader:
+            reader.execute("BEGIN")
+            reader.execute("SELECT COUNT(*) FROM goods").fetchone()
+            service.insert_record('goods', {'name': 'при открытом читателе'})
+            os.rename(second, older)
+            os.rename(fingerprint_path(second), fingerprint_path(older))
+            second = service.auto_backup(db_path, backup_dir)
+            reader.execute("COMMIT")
+        assert second and read_fingerprint(second) != read_fingerprint(older)
+        print("   ✅ Неизмененная БД не копируется повторно")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_backup_with_open_reader():
+    """Копия включает транзакции из WAL, даже если читатель мешает checkpoint"""
+    print("🔧 Тестирование копии при открытом читателе...")
+    
+    test_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(test_dir, "live.db")
+        manager = ConnectionManager(db_path)
+        manager.writer.execute("CREATE TABLE goods (id INTEGER PRIMARY KEY, name TEXT)")
+        manager.writer.executemany("INSERT INTO goods (name) VALUES (?)", [(f"товар {i}",) for i in range(5000)])
+        manager.writer.commit()
+        
+        with manager.reader() as reader:
+            # Открытая транзакция чтения удерживает старый снимок в WAL
+            reader.execute("BEGIN")
+            assert reader.execute("SELECT COUNT(*) FROM goods").fetchone()[0] == 5000
+            manager.writer.execute("INSERT INTO goods (name) VALUES ('новый')")
+            manager.writer.commit()
+            
+            backup_path = os.path.join(test_dir, "copy.db")
+            size = backup_database(manager.writer, db_path, backup_path)
+            reader.execute("COMMIT")
+        
+        copy = sqlite3.connect(backup_path)
+        assert copy.execute("SELECT COUNT(*) FROM goods").fetchone()[0] == 5001
+        copy.close()
+        assert size == os.path.getsize(backup_path) and not os.path.exists(backup_path + '.tmp')
+        print("   ✅ Копия содержит все зафиксированные записи")
+        manager.close()
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_restore_with_pending_wal():
+    """Восстановление заменяет данные открытой БД, хотя читатель держит WAL"""
+    print("🔧 Тестирование восстановления открытой БД...")
+    
+    test_dir = tempfile.mkdtemp()
+    try:
+        backup_path = os.path.join(test_dir, "backup.db")
+        backup = sqlite3.connect(backup_path)
+        backup.execute("PRAGMA page_size = 8192")
+        backup.execute("CREATE TABLE goods (id INTEGER PRIMARY KEY, name TEXT)")
+        backup.executemany("INSERT INTO goods (name) VALUES (?)", [(f"из копии {i}",) for i in range(10)])
+        backup.commit()
+        backup.close()
+        
+        db_path = os.path.join(test_dir, "live.db")
+        manager = ConnectionManager(db_path)
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE live_only (id INTEGER PRIMARY KEY, name TEXT)")
+        manager.writer.executemany("INSERT INTO live_only (name) VALUES (?)", [("живая",)] * 200)
+        manager.writer.commit()
+        
+        reader = manager.acquire_reader()
+        reader.execute("BEGIN")
+        assert reader.execute("SELECT COUNT(*) FROM live_only").fetchone()[0] == 200
+        assert os.path.getsize(db_path + '-wal') > 0
+        service.restore(backup_path)
+        reader.execute("COMMIT")
+        manager.release_reader(reader)
+        manager.close()
+        
+        restored = sqlite3.connect(db_path)
+        tables = [row[0] for row in restored.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        assert tables == ['goods'], tables
+        assert restored.execute("SELECT COUNT(*) FROM goods").fetchone()[0] == 10
+        assert restored.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+        restored.close()
+        assert not os.path.exists(db_path + '.restore')
+        print("   ✅ После переоткрытия - содержимое копии")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    test_create_table_sql()
+    test_record_crud()
+    test_sorted_pages()
+    test_metadata_with_busy_pool()
+    test_column_filters()
+    test_table_overview()
+    test_rowid_records()
+    test_large_values()
+    test_blob_files()
+    test_auto_backup_fingerprint()
+    test_backup_with_open_reader()
+    test_restore_with_pending_wal()
+    print("\n🎯 Тест DatabaseService завершен")
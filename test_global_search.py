@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест поиска по всем таблицам
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+from db_service import DatabaseService, ColumnFilter, build_filter_condition, describe_filter
+from global_search import GlobalSearch, SearchHit, make_snippet
+
+
+def create_database(path, tables=20, rows=200):
+    manager = ConnectionManager(path)
+    writer = manager.writer
+    for t in range(tables):
+        writer.execute(f"CREATE TABLE t{t:02d} (id INTEGER PRIMARY KEY, name TEXT, amount REAL, data BLOB)")
+        writer.executemany(f"INSERT INTO t{t:02d} (name, amount, data) VALUES (?, ?, ?)",
+                           [(f"клиент {t}-{i}", i * 1.5, None) for i in range(rows)])
+    writer.execute("CREATE TABLE codes (code TEXT PRIMARY KEY, note TEXT) WITHOUT ROWID")
+    writer.execute("INSERT INTO codes VALUES ('CUST-4711', 'Заказчик ООО Ромашка')")
+    writer.execute("INSERT INTO t07 (name, data) VALUES ('Ромашка', ?)", ("Договор ромашка".encode(),))
+    writer.commit()
+    return manager
+
+
+def run_search(search, timeout=30, start=True):
+    if start:
+        search.start()
+    hits = []
+    deadline = time.time() + timeout
+    while not search.done and time.time() < deadline:
+        hits.extend(search.take())
+        time.sleep(0.01)
+    hits.extend(search.take())
+    return hits
+
+
+def test_helpers():
+    """Фрагменты вокруг совпадения"""
+    assert make_snippet("a" * 100 + "Найдено" + "b" * 100, "найдено", width=20).startswith("…aaaaaa")
+    assert make_snippet("коротко", "кор") == "коротко"
+
+
+def test_global_search():
+    """Совпадения во всех таблицах, кириллица без учета регистра, WITHOUT ROWID"""
+    print("🔧 Тестирование поиска по всем таблицам...")
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = create_database(os.path.join(tmp, 'many.db'))
+
+        hits = run_search(GlobalSearch(manager, "РОМАШКА"))
+        assert SearchHit('codes', None, 'note', 'Заказчик ООО Ромашка') in hits
+        assert SearchHit('t07', 201, 'name', 'Ромашка') in hits
+        assert SearchHit('t07', 201, 'data', 'Договор ромашка') in hits
+        assert len(hits) == 3, hits
+
+        hits = run_search(GlobalSearch(manager, "cust-47"))
+        assert [hit.table for hit in hits] == ['codes']
+
+        # Текст в колонках с числовым affinity (STRING, DATE) тоже находится
+        manager.writer.execute("CREATE TABLE people (id INTEGER PRIMARY KEY, email STRING, born DATE)")
+        manager.writer.execute("INSERT INTO people (email, born) VALUES ('bob@example.com', '2024-05-17')")
+        manager.writer.commit()
+        hits = run_search(GlobalSearch(manager, "bob@example"))
+        assert hits == [SearchHit('people', 1, 'email', 'bob@example.com')], hits
+        hits = run_search(GlobalSearch(manager, "2024-05"))
+        assert hits == [SearchHit('people', 1, 'born', '2024-05-17')], hits
+
+        # Фильтр для открытия найденной строки в гриде
+        where, params = build_filter_condition([ColumnFilter('rowid', 'eq', 201, '')])
+        service = DatabaseService(manager.writer, manager)
+        page = service.fetch_page('t07', where, params)
+        assert [row[1] for row in page.rows] == ['Ромашка']
+        assert describe_filter(ColumnFilter('rowid', 'eq', 201, '')) == "rowid = 201"
+
+        # Предел совпадений останавливает остальные таблицы
+        search = GlobalSearch(manager, "клиент", limit=50, workers=3)
+        hits = run_search(search)
+        assert len(hits) == 50 and search.stopped and not search.errors
+        assert search.tables_done == len(search.tables)
+
+        # Запуск не ждет читателя, даже если пул занят целиком
+        readers = [manager.acquire_reader() for _ in range(manager.pool_size)]
+        search = GlobalSearch(manager, "ромашка")
+        started = time.perf_counter()
+        assert search.start() == len(search.tables)
+        assert time.perf_counter() - started < 1
+        for reader in readers:
+            manager.release_reader(reader)
+        hits = run_search(search, start=False)
+        assert len(hits) == 3, hits
+
+        # После остановки читатели пула снова работают
+        assert service.fetch_page('t00', limit=1).rows
+        manager.close()
+    print("✅ Поиск по всем таблицам работает")
+
+
+if __name__ == "__main__":
+    test_helpers()
+    test_global_search()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест сводного логирования горячих участков
+"""
+
+import os
+import sys
+import logging
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_utils import BatchLog, format_count, format_size, format_hex_dump
+
+
+class ListHandler(logging.Handler):
+    """Собирает записи лога в список"""
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_logger(level):
+    test_logger = logging.getLogger('db_manager.test_log_volume')
+    test_logger.handlers = []
+    test_logger.propagate = False
+    handler = ListHandler()
+    test_logger.addHandler(handler)
+    test_logger.setLevel(level)
+    return test_logger, handler
+
+
+def test_single_summary_record():
+    """Миллион операций дает одну запись в лог на уровне INFO"""
+    print("🔧 Тестирование сводной записи...")
+
+    test_logger, handler = make_logger(logging.INFO)
+    with BatchLog(test_logger, "Вставлено строк в таблицу %s", "big") as batch:
+        for _ in range(1000000):
+            batch.add()
+
+    assert len(handler.records) == 1, f"Записей в логе: {len(handler.records)}"
+    message = handler.records[0].getMessage()
+    assert "1 000 000" in message and "big" in message, message
+    print(f"   ✅ {message}")
+
+
+def test_sampled_debug_records():
+    """На уровне DEBUG пишется только каждая sample_every-я операция"""
+    print("🔧 Тестирование выборочных записей...")
+
+    test_logger, handler = make_logger(logging.DEBUG)
+    with BatchLog(test_logger, "Обработано строк", sample_every=1000) as batch:
+        for _ in range(10000):
+            batch.add()
+        batch.add(2500)
+
+    # 10 промежуточных + 1 на пакет из 2500 + итог
+    assert len(handler.records) == 12, f"Записей в логе: {len(handler.records)}"
+    assert format_count(12500) == "12 500"
+    print("   ✅ Промежуточные записи ограничены")
+
+
+def test_format_size():
+    """Размер в байтах, КБ и МБ для дерева таблиц"""
+    assert format_size(512) == "512 Б"
+    assert format_size(1536 * 1024) == "1.5 МБ"
+
+
+def test_format_hex_dump():
+    """Шестнадцатеричный просмотр BLOB: смещение, байты и печатные символы"""
+    line = format_hex_dump(b"AB\x00", offset=16)
+    assert line == "00000010  41 42 00" + " " * 39 + "  AB."
+
+
+if __name__ == "__main__":
+    test_single_summary_record()
+    test_sampled_debug_records()
+    test_format_size()
+    test_format_hex_dump()
+    print("\n🎯 Тест логирования завершен")
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест долгих операций обслуживания БД
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+from sql_trace import sql_tracer
+from maintenance import (MaintenanceJob, JobCancelled, compact_backup, database_pages,
+                         estimate_vacuum, check_disk_space, vacuum, analyze_storage)
+
+
+def create_fragmented(path, rows=20000):
+    """БД, в которой после удаления половины строк много свободных страниц"""
+    manager = ConnectionManager(path)
+    writer = manager.writer
+    writer.execute("CREATE TABLE docs (id INTEGER PRIMARY KEY, body TEXT)")
+    writer.executemany("INSERT INTO docs (body) VALUES (?)", [("текст " * 40,) for _ in range(rows)])
+    writer.commit()
+    writer.execute("DELETE FROM docs WHERE id % 2 = 0")
+    writer.commit()
+    return manager
+
+
+def test_compact_backup():
+    """VACUUM INTO на фоновом соединении: копия меньше БД, прогресс доходит до 1"""
+    print("🔧 Тестирование сжатой копии...")
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = create_fragmented(os.path.join(tmp, 'docs.db'))
+        page_count, freelist_count, page_size = database_pages(manager.writer)
+        assert freelist_count > 0
+
+        target = os.path.join(tmp, 'docs_compact.db')
+        job = MaintenanceJob("Сжатая копия")
+        result = {}
+
+        def worker():
+            with manager.background_writer('compact') as connection:
+                result['value'] = compact_backup(connection, target, job)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        compacted = result['value']
+        assert job.progress == 1.0 and compacted.path == target
+        assert compacted.size_before == page_count * page_size
+        assert compacted.size_after == os.path.getsize(target) < compacted.size_before
+        assert not os.path.exists(target + '.tmp')
+
+        copy = sqlite3.connect(target)
+        assert copy.execute("SELECT COUNT(*) FROM docs").fetchone()[0] == 10000
+        assert copy.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        copy.close()
+        manager.close()
+        print(f"   ✅ {compacted.size_before} -> {compacted.size_after} байт")
+
+
+def test_cancel():
+    """Отмена прерывает VACUUM INTO, временный файл удаляется, трассировка восстанавливается"""
+    print("🔧 Тестирование отмены...")
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = create_fragmented(os.path.join(tmp, 'docs.db'), rows=2000)
+        connection = manager.writer
+        trace = sql_tracer.attach(connection, 'writer')
+
+        target = os.path.join(tmp, 'cancelled.db')
+        job = MaintenanceJob("Сжатая копия")
+        job.cancel()
+        try:
+            compact_backup(connection, target, job)
+            assert False, "Ожидалась отмена"
+        except JobCancelled:
+            pass
+        assert not os.path.exists(target) and not os.path.exists(target + '.tmp')
+
+        # Соединение работает, обработчик трассировки снова на месте
+        assert connection.execute("SELECT COUNT(*) FROM docs").fetchone()[0] == 1000
+        assert sql_tracer.trace_for(connection) is trace
+        sql_tracer.detach(connection)
+        manager.close()
+    print("✅ Отмена работает")
+
+
+class CancelDuringStatement(MaintenanceJob):
+    """Отмена по первому вызову обработчика прогресса - посреди оператора"""
+    
+    @property
+    def steps(self):
+        return self._steps
+    
+    @steps.setter
+    def steps(self, value):
+        self._steps = value
+        if value:
+            self.cancel()
+
+
+def test_vacuum():
+    """Оценка освобождаемого места, проверка диска, VACUUM и его отмена"""
+    print("🔧 Тестирование вакуума...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'docs.db')
+        manager = create_fragmented(db_path)
+        connection = manager.writer
+        size = os.path.getsize(db_path)
+        
+        estimate = estimate_vacuum(connection)
+        assert estimate.freelist_count > 0 and estimate.cells > 0
+        assert estimate.reclaimable >= estimate.freelist_count * estimate.page_size
+        assert check_disk_space(db_path, estimate, temp_dir=tmp) == []
+        
+        # На одном диске нужно место и для временной копии, и для WAL
+        huge = estimate._replace(required=10 ** 18)
+        [need] = check_disk_space(db_path, huge, temp_dir=tmp)
+        assert need.required == 2 * 10 ** 18 and need.available < need.required
+        
+        # Отмена откатывает VACUUM
+        job = CancelDuringStatement("Вакуум")
+        try:
+            vacuum(connection, job, estimate)
+            assert False, "Ожидалась отмена"
+        except JobCancelled:
+            pass
+        assert job.steps > 0
+        assert connection.execute("PRAGMA freelist_count").fetchone()[0] == estimate.freelist_count
+        
+        job = MaintenanceJob("Вакуум")
+        result = vacuum(connection, job, estimate)
+        assert job.progress == 1.0 and result.reclaimed > 0
+        assert result.size_before - result.size_after == result.reclaimed
+        assert connection.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert connection.execute("SELECT COUNT(*) FROM docs").fetchone()[0] == 10000
+        manager.close()
+        assert os.path.getsize(db_path) < size
+        print(f"   ✅ Оценка {estimate.reclaimable}, освобождено {result.reclaimed} байт")
+
+
+def test_storage_analysis():
+    """Место по таблицам и индексам складывается в размер файла"""
+    print("🔧 Тестирование анализа места...")
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = create_fragmented(os.path.join(tmp, 'docs.db'))
+        connection = manager.writer
+        connection.execute("CREATE INDEX docs_body ON docs (body)")
+        connection.execute("CREATE TABLE scratch (data BLOB)")
+        connection.execute("INSERT INTO scratch VALUES (zeroblob(100000))")
+        connection.commit()
+        connection.execute("DELETE FROM scratch")
+        connection.commit()
+        
+        report = analyze_storage(connection)
+        objects = {item.name: item for item in report.objects}
+        assert set(objects) == {'sqlite_schema', 'docs', 'docs_body', 'scratch'}
+        assert objects['docs_body'].type == 'index' and objects['docs_body'].table == 'docs'
+        assert objects['docs'].cells == 10000
+        assert report.objects[0].size >= report.objects[-1].size
+        for item in report.objects:
+            assert item.payload + item.overhead + item.unused == item.size
+            assert item.size == item.pages * report.page_size and 0 <= item.fragmentation <= 1
+        # Удаленный BLOB ушел в свободные страницы
+        assert report.freelist_count >= 100000 // report.page_size
+        assert sum(item.pages for item in report.objects) + report.freelist_count == report.page_count
+        
+        job = MaintenanceJob("Анализ места")
+        job.cancel()
+        try:
+            analyze_storage(connection, job)
+            assert False, "Ожидалась отмена"
+        except JobCancelled:
+            pass
+        manager.close()
+        print(f"   ✅ Объектов: {len(report.objects)}, страниц: {report.page_count}")
+
+
+if __name__ == "__main__":
+    test_compact_backup()
+    test_cancel()
+    test_vacuum()
+    test_storage_analysis()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест статистики операций
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import MetricsRegistry, percentile
+
+
+def test_percentile():
+    """Перцентили по методу ближайшего ранга"""
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.5) == 0.0
+
+
+def test_registry_summary():
+    """Вызовы, ошибки, строки и байты суммируются по операциям"""
+    print("🔧 Тестирование реестра статистики...")
+    registry = MetricsRegistry()
+    for i in range(1, 21):
+        registry.record('load_table_data', i / 1000, rows=100)
+    registry.record('backup', 0.5, bytes_written=4096)
+
+    with registry.measure('query') as measurement:
+        measurement.rows = 3
+    try:
+        with registry.measure('query'):
+            raise ValueError("ошибка")
+    except ValueError:
+        pass
+
+    measurement = registry.begin('export')
+    measurement.finish(rows=10, bytes_written=2048)
+    measurement.finish(rows=99)  # повторный вызов игнорируется
+
+    summary = {item.name: item for item in registry.summary()}
+    load = summary['load_table_data']
+    assert load.calls == 20 and load.rows == 2000
+    assert load.p50 == 0.010 and load.p95 == 0.019 and load.max == 0.020
+    assert summary['backup'].bytes == 4096
+    assert summary['query'].calls == 2 and summary['query'].errors == 1
+    assert summary['query'].rows == 3
+    assert summary['export'].calls == 1 and summary['export'].rows == 10
+    assert registry.summary()[0].name == 'backup'
+    print("✅ Статистика собирается корректно")
+
+
+def test_dump_json():
+    """Статистика сохраняется в JSON, пустая не сохраняется"""
+    registry = MetricsRegistry()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logs', 'metrics.json')
+        assert registry.dump(path) is None
+        assert not os.path.exists(path)
+
+        registry.record('vacuum', 1.25)
+        assert registry.dump(path) == path
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        assert data['operations'][0]['name'] == 'vacuum'
+        assert data['operations'][0]['calls'] == 1
+
+    registry.reset()
+    assert registry.summary() == []
+
+
+if __name__ == "__main__":
+    test_percentile()
+    test_registry_summary()
+    test_dump_json()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест записи профиля одного действия
+"""
+
+import os
+import sys
+import pstats
+import tempfile
+import subprocess
+import threading
+import tracemalloc
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profiling import ProfileRecorder
+
+
+def allocate_rows(count):
+    return [("строка", i, str(i) * 10) for i in range(count)]
+
+
+def test_profile_only_when_armed():
+    """Без включенной записи действие не профилируется"""
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = ProfileRecorder(tmp)
+        with recorder.profile('load_table_data') as capture:
+            allocate_rows(10)
+        assert capture is None
+        assert os.listdir(tmp) == []
+
+
+def test_profile_block():
+    """Профиль блока сохраняется в .prof и отчет о памяти, запись выключается"""
+    print("🔧 Тестирование записи профиля...")
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = ProfileRecorder(tmp)
+        saved = []
+        recorder.on_saved = saved.append
+        recorder.arm()
+
+        with recorder.profile('import') as capture:
+            allocate_rows(20000)
+
+        assert not recorder.armed
+        assert saved == [capture]
+        assert os.path.exists(capture.prof_path)
+        assert not tracemalloc.is_tracing()
+
+        stats = pstats.Stats(capture.prof_path)
+        assert any(func[2] == 'allocate_rows' for func in stats.stats)
+
+        with open(capture.report_path, encoding='utf-8') as f:
+            report = f.read()
+        assert "Действие: import" in report
+        assert "Крупнейшие выделения памяти" in report
+        assert "test_profiling.py" in report
+    print("✅ Профиль блока записан")
+
+
+def test_profile_background_task():
+    """Фоновая задача и ее колбэк попадают в один профиль"""
+    print("🔧 Тестирование профиля фоновой задачи...")
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = ProfileRecorder(tmp)
+        recorder.arm()
+        results = []
+
+        task, on_success, on_error = recorder.wrap_background(
+            'search', lambda: allocate_rows(1000), results.append, None)
+
+        # Задача выполняется в рабочем потоке, колбэк - в текущем
+        worker_result = []
+        thread = threading.Thread(target=lambda: worker_result.append(task()))
+        thread.start()
+        thread.join()
+        on_success(worker_result[0])
+
+        assert len(results) == 1 and len(results[0]) == 1000
+        files = sorted(os.listdir(tmp))
+        assert len(files) == 2
+        assert files[0].startswith('profile_search_') and files[0].endswith('.prof')
+        assert files[1].endswith('_alloc.txt')
+    print("✅ Профиль фоновой задачи записан")
+
+
+def test_startup_imports():
+    """Импорт db_manager не загружает диалоги, профилировщики и urllib.request и не создает лог"""
+    print("🔧 Тестирование импортов при запуске...")
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    log_dir = os.path.join(package_dir, 'logs')
+    logs_before = sorted(os.listdir(log_dir)) if os.path.exists(log_dir) else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        code = ("import sys; import db_manager; "
+                "print(' '.join(sorted(m for m in ('dialogs', 'cProfile', 'pstats', 'tracemalloc', "
+                "'urllib.request') "
+                "if m in sys.modules)))")
+        env = dict(os.environ, PYTHONPATH=package_dir)
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=tmp, env=env,
+                                         universal_newlines=True)
+        assert output.strip() == '', output
+        assert os.listdir(tmp) == []
+
+    logs_after = sorted(os.listdir(log_dir)) if os.path.exists(log_dir) else None
+    assert logs_after == logs_before
+    print("✅ Тяжелые модули загружаются по требованию")
+
+
+if __name__ == "__main__":
+    test_profile_only_when_armed()
+    test_profile_block()
+    test_profile_background_task()
+    test_startup_imports()
+    print("\n🎉 Все тесты пройдены!")
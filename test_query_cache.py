@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест кэша результатов SELECT
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+from db_service import DatabaseService
+from query_cache import QueryCache, normalize_sql, is_cacheable
+
+
+def test_normalize_sql():
+    """Комментарии и пробелы не влияют на ключ, строки сохраняются"""
+    assert normalize_sql("SELECT  *\n FROM t -- все\n WHERE a = 'x  y';") == "SELECT * FROM t WHERE a = 'x  y'"
+    assert normalize_sql("/* отчет */ select 1") == "select 1"
+    assert is_cacheable("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not is_cacheable("SELECT random()")
+    assert not is_cacheable("SELECT date('now')")
+    assert not is_cacheable("DELETE FROM t")
+    assert QueryCache.key("SELECT ? ;", [2]) == ("SELECT ?", (2,))
+
+
+def test_cache_invalidation():
+    """Повтор без изменений - из кэша, своя или чужая запись сбрасывает кэш"""
+    print("🔧 Тестирование кэша запросов...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'report.db')
+        manager = ConnectionManager(db_path)
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE sales (region TEXT, amount REAL)")
+        manager.writer.executemany("INSERT INTO sales VALUES (?, ?)",
+                                   [(f"регион {i % 5}", i * 1.5) for i in range(1000)])
+        manager.writer.commit()
+
+        cache = QueryCache(max_mb=8)
+        sql = "SELECT region, SUM(amount) FROM sales GROUP BY region"
+
+        def scope():
+            return db_path, manager.data_version()
+
+        assert cache.get(scope(), sql) is None
+        result = service.execute_query(sql, read_only=True)
+        cache.put(scope(), sql, (), result)
+
+        cached = cache.get(scope(), "SELECT region, SUM(amount)\nFROM sales GROUP BY region;")
+        assert cached.columns == result.columns and cached.rows == result.rows
+        assert cache.hits == 1
+
+        # Собственная запись
+        service.insert_record('sales', {'region': 'новый', 'amount': 1.0})
+        assert cache.get(scope(), sql) is None
+
+        # Запись другой программой
+        cache.put(scope(), sql, (), service.execute_query(sql, read_only=True))
+        assert cache.get(scope(), sql) is not None
+        other = sqlite3.connect(db_path)
+        other.execute("DELETE FROM sales WHERE region = 'новый'")
+        other.commit()
+        other.close()
+        assert cache.get(scope(), sql) is None
+
+        # Результат, полученный до изменения данных, не сохраняется
+        old_scope = scope()
+        result = service.execute_query(sql, read_only=True)
+        service.insert_record('sales', {'region': 'еще', 'amount': 2.0})
+        cache.get(old_scope, sql)
+        cache.put(scope(), sql, (), result)
+        assert cache.get(scope(), sql) is None
+
+        manager.close()
+    print("✅ Кэш сбрасывается при изменении данных")
+
+
+if __name__ == "__main__":
+    test_normalize_sql()
+    test_cache_invalidation()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест компактного кэша страниц таблицы данных
+"""
+
+import os
+import sys
+from array import array
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_service import Page
+from row_cache import CompactPage, RowCache, pack_column
+
+
+def make_rows(count, start=0):
+    return [(i, i * 0.5, f"город {i % 3}", None if i % 2 else b"\x00") for i in range(start, start + count)]
+
+
+def test_compact_page():
+    """Колонки хранятся в array и интернированных строках, строки восстанавливаются"""
+    print("🔧 Тестирование компактной страницы...")
+    rows = make_rows(1000)
+    page = CompactPage.from_page(Page(rows, 2000, True))
+
+    assert isinstance(page.columns[0], array) and page.columns[0].typecode == 'q'
+    assert isinstance(page.columns[1], array) and page.columns[1].typecode == 'd'
+    assert page.columns[2][0] is page.columns[2][3]
+    assert list(page) == rows and page.rows == rows
+    assert page.row(7) == rows[7] and len(page) == 1000
+    assert page.offset == 2000 and page.has_next
+
+    # Большие целые и NULL остаются объектами Python
+    assert pack_column([1, 2 ** 70]) == [1, 2 ** 70]
+    assert pack_column([1, None]) == [1, None]
+    assert list(CompactPage([(), ()])) == [(), ()]
+    print(f"   ✅ 1000 строк занимают {page.size} байт")
+
+
+def test_lru_eviction():
+    """Старые страницы вытесняются по потолку памяти, смена версии сбрасывает кэш"""
+    print("🔧 Тестирование вытеснения страниц...")
+    pages = [CompactPage(make_rows(1000, i * 1000)) for i in range(4)]
+    cache = RowCache(max_mb=pages[0].size * 2.5 / (1024 * 1024))
+    cache.validate(1)
+
+    for i, page in enumerate(pages[:2]):
+        cache.put(i, page)
+    assert cache.get(0) is pages[0]
+    cache.put(2, pages[2])
+    # Вытеснена давно не использованная страница 1
+    assert cache.get(1) is None and cache.get(0) is pages[0] and len(cache) == 2
+    assert cache.size <= cache.max_bytes
+
+    cache.validate(1)
+    assert len(cache) == 2
+    cache.validate(2)
+    assert len(cache) == 0 and cache.size == 0
+
+    cache.set_limit(0)
+    cache.put(3, pages[3])
+    assert len(cache) == 0
+    print(f"   ✅ Попаданий: {cache.hits}, промахов: {cache.misses}")
+
+
+if __name__ == "__main__":
+    test_compact_page()
+    test_lru_eviction()
+    print("\n🎉 Все тесты пройдены!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест хранилища настроек
+"""
+
+import os
+import sys
+import tempfile
+import shutil
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from settings_store import SettingsStore, DEFAULT_DB_SETTINGS, MAX_RECENT_FILES
+
+
+def test_settings_roundtrip():
+    """Проверяем, что настройки переживают перезапуск"""
+    print("🔧 Тестирование сохранения настроек...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(test_dir, "config", "settings.json")
+        db_path = os.path.join(test_dir, "big.db")
+
+        store = SettingsStore(path)
+        assert store.get_db(db_path, 'page_size') == DEFAULT_DB_SETTINGS['page_size']
+        store.set('auto_backup', False)
+        store.set_db(db_path, 'page_size', 5000)
+        store.set_db(db_path, 'pragma_profile', 'read-only analytics')
+        store.save()
+        assert os.path.exists(path), "Файл настроек не создан"
+
+        reloaded = SettingsStore(path)
+        assert reloaded.get('auto_backup') is False
+        assert reloaded.get_db(db_path, 'page_size') == 5000
+        assert reloaded.get_db(db_path, 'pragma_profile') == 'read-only analytics'
+        assert reloaded.get_db(db_path, 'search_mode') == DEFAULT_DB_SETTINGS['search_mode']
+        print("   ✅ Настройки БД восстановлены после перезапуска")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_recent_files():
+    """Проверяем список недавних файлов"""
+    print("🔧 Тестирование недавних файлов...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        store = SettingsStore(os.path.join(test_dir, "settings.json"))
+        for i in range(MAX_RECENT_FILES + 3):
+            store.add_recent_file(os.path.join(test_dir, f"{i}.db"))
+        store.add_recent_file(os.path.join(test_dir, "5.db"))
+
+        recent = store.get('recent_files')
+        assert len(recent) == MAX_RECENT_FILES
+        assert recent[0] == os.path.join(test_dir, "5.db")
+        assert recent.count(os.path.join(test_dir, "5.db")) == 1
+        print("   ✅ Недавние файлы без повторов и с ограничением длины")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_corrupted_settings():
+    """Проверяем, что поврежденный файл не мешает запуску"""
+    print("🔧 Тестирование поврежденного файла настроек...")
+
+    test_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(test_dir, "settings.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("{не json")
+
+        store = SettingsStore(path)
+        assert store.get('auto_backup') is True
+        print("   ✅ Используются настройки по умолчанию")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+if __name__ == "__main__":
+    test_settings_roundtrip()
+    test_recent_files()
+    test_corrupted_settings()
+    print("\n🎯 Тест хранилища настроек завершен")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тест трассировки SQL
+"""
+
+import os
+import sys
+import tempfile
+
+# Добавляем путь к модулям
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_connection import ConnectionManager
+from db_service import DatabaseService
+from sql_trace import SQLTracer, statement_shape
+
+
+def test_statement_shape():
+    """Литералы заменяются, пробелы нормализуются"""
+    assert statement_shape("SELECT * FROM t WHERE a = 1 AND b = 'x''y'") == \
+        "SELECT * FROM t WHERE a = ? AND b = ?"
+    assert statement_shape("DELETE FROM t WHERE id IN (1, 2, 3);") == \
+        "DELETE FROM t WHERE id IN (?, ...)"
+    assert statement_shape("SELECT int_1,\n  -2.5e3 FROM t2") == "SELECT int_1, ? FROM t2"
+
+
+def test_trace_connection_manager():
+    """Трассировка видит PRAGMA, правку записей и запросы читателей"""
+    print("🔧 Тестирование трассировки SQL...")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'trace.db')
+        log_path = os.path.join(tmp, 'sql_trace.log')
+        tracer = SQLTracer(capacity=1000, path=log_path)
+
+        manager = ConnectionManager(db_path, tracer=tracer)
+        service = DatabaseService(manager.writer, manager)
+        manager.writer.execute("CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT)")
+        for i in range(20):
+            service.insert_record('people', {'name': f"Имя {i}"})
+        service.delete_record('people', [1, "Имя 0"])
+        service.fetch_page('people', limit=5)
+        # Тяжелый запрос, чтобы обработчик прогресса успел сработать
+        manager.writer.execute(
+            "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 200000) "
+            "SELECT sum(x) FROM n").fetchone()
+        manager.writer.execute("SELECT 1").fetchone()
+
+        entries = tracer.recent()
+        sqls = [entry.sql for entry in entries]
+        assert any(sql.startswith("PRAGMA journal_mode") for sql in sqls)
+        assert any(sql.startswith("DELETE FROM") for sql in sqls)
+        assert any(entry.connection.startswith('reader') for entry in entries)
+
+        heavy = [entry for entry in entries if 'RECURSIVE' in entry.sql][0]
+        assert heavy.seconds > 0
+
+        summary = {group.shape: group for group in tracer.summary()}
+        insert_shape = 'INSERT INTO "people" ("name") VALUES (?)'
+        assert summary[insert_shape].count == 20, list(summary)
+
+        # Отключение трассировки
+        manager.set_tracer(None)
+        count = len(tracer.recent())
+        manager.writer.execute("SELECT 2").fetchone()
+        assert len(tracer.recent()) == count
+
+        manager.close()
+        tracer.close()
+        with open(log_path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == count
+        assert "\twriter\t" in lines[0]
+    print("✅ Трассировка SQL работает")
+
+
+def test_short_statements_and_batches():
+    """Короткие операторы получают ненулевое время, executemany - одну запись"""
+    print("🔧 Тестирование времени коротких операторов...")
+    with tempfile.TemporaryDirectory() as tmp:
+        tracer = SQLTracer(capacity=100)
+        manager = ConnectionManager(os.path.join(tmp, 'short.db'), tracer=tracer)
+        manager.writer.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER)")
+        manager.writer.executemany("INSERT INTO items (value) VALUES (?)", [(i,) for i in range(20000)])
+        manager.writer.commit()
+        manager.writer.execute("UPDATE items SET value = value + 1 WHERE id = 7")
+        manager.writer.commit()
+
+        entries = tracer.recent()
+        inserts = [entry for entry in entries if entry.sql.startswith("INSERT")]
+        assert len(inserts) == 1 and inserts[0].count == 20000, inserts
+        assert inserts[0].seconds > 0
+        updates = [entry for entry in entries if entry.sql.startswith("UPDATE")]
+        assert len(updates) == 1 and updates[0].seconds > 0, updates
+        commits = [entry for entry in entries if entry.sql.startswith("COMMIT")]
+        assert commits and all(entry.seconds > 0 for entry in commits), commits
+
+        summary = {group.shape: group for group in tracer.summary()}
+        assert summary["INSERT INTO items (value) VALUES (?)"].count == 20000
+        manager.close()
+    print("✅ Короткие операторы и пакеты замеряются")
+
+
+if __name__ == "__main__":
+    test_statement_shape()
+    test_trace_connection_manager()
+    test_short_statements_and_batches()
+    print("\n🎉 Все тесты пройдены!")